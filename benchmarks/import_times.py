@@ -0,0 +1,137 @@
+import argparse
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cold-start import report for roi-tool.py. Starts a fresh interpreter with
+# python -X importtime, imports Streamlit, then renders the page once through
+# Streamlit's AppTest harness, and reports the time spent importing modules
+# for that first render, grouped by top-level package, next to the Streamlit
+# import itself and the wall time of the render. Results are written as JSON
+# so the cold-start cost can be tracked over time and compared between runs.
+#
+#     python benchmarks/import_times.py -o imports.json
+#     python benchmarks/import_times.py --compare imports.json
+
+APP_SCRIPT = os.path.join(ROOT, "roi-tool.py")
+APP_TIMEOUT = 120
+DEFAULT_TOP = 15
+MARKER = "--- first render ---"
+
+# Modules the first render should not need; the report flags any that it
+# imports anyway (Streamlit may import some of them itself, beforehand)
+DEFERRED_PACKAGES = ("pandas", "plotly.express", "fpdf", "PIL", "roi_batch")
+
+PROBE = f"""
+import sys, time
+start = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+streamlit_seconds = time.perf_counter() - start
+sys.path.insert(0, {ROOT!r})
+print({MARKER!r}, file=sys.stderr, flush=True)
+start = time.perf_counter()
+at = AppTest.from_file({APP_SCRIPT!r}, default_timeout={APP_TIMEOUT}).run()
+render_seconds = time.perf_counter() - start
+if at.exception:
+    raise SystemExit(at.exception[0].message)
+print({MARKER!r}, file=sys.stderr, flush=True)
+print(streamlit_seconds, render_seconds)
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(lines):
+    # (self microseconds, cumulative microseconds, depth, module) per
+    # -X importtime line
+    for line in lines:
+        match = IMPORT_LINE.match(line)
+        if match:
+            yield int(match[1]), int(match[2]), len(match[3]) // 2, match[4]
+
+
+def measure():
+    # Runs the probe in a fresh interpreter and returns the report dict
+    process = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], capture_output=True, text=True,
+                             cwd=ROOT, env=dict(os.environ, ROI_TIMINGS="0"))
+    if process.returncode != 0:
+        raise RuntimeError(f"the first render failed: {process.stderr.strip().splitlines()[-1:]}")
+    stderr = process.stderr.splitlines()
+    first, last = stderr.index(MARKER), len(stderr) - 1 - stderr[::-1].index(MARKER)
+    streamlit_seconds, render_seconds = process.stdout.split()
+    before = list(parse_importtime(stderr[:first]))
+    during = list(parse_importtime(stderr[first + 1:last]))
+    packages = {}
+    for self_us, _, _, module in during:
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return {
+        "python": platform.python_version(),
+        "streamlit_import_ms": round(float(streamlit_seconds) * 1000, 1),
+        "streamlit_import_self_ms": round(sum(self_us for self_us, _, _, _ in before) / 1000, 1),
+        "first_render_ms": round(float(render_seconds) * 1000, 1),
+        "first_render_import_ms": round(sum(packages.values()) / 1000, 1),
+        "first_render_modules": len(during),
+        "packages_ms": {name: round(us / 1000, 1) for name, us in
+                        sorted(packages.items(), key=lambda item: item[1], reverse=True)},
+        "deferred_imported": [name for name in DEFERRED_PACKAGES
+                              if any(module == name or module.startswith(name + ".") for _, _, _, module in during)],
+    }
+
+
+def compare(report, baseline):
+    # Lines comparing the headline numbers and each package against baseline
+    lines = []
+    for key in ("streamlit_import_ms", "first_render_ms", "first_render_import_ms"):
+        lines.append(f"{key:<36} {baseline[key]:>9,.1f} -> {report[key]:>9,.1f} ms")
+    names = sorted(set(report["packages_ms"]) | set(baseline["packages_ms"]),
+                   key=lambda name: -max(report["packages_ms"].get(name, 0), baseline["packages_ms"].get(name, 0)))
+    for name in names[:DEFAULT_TOP]:
+        before, after = baseline["packages_ms"].get(name, 0.0), report["packages_ms"].get(name, 0.0)
+        lines.append(f"  {name:<34} {before:>9,.1f} -> {after:>9,.1f} ms")
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the import cost of a cold start of roi-tool.py.")
+    parser.add_argument("-o", "--output", help="JSON file for the report")
+    parser.add_argument("--compare", metavar="BASELINE", help="report JSON of an earlier run to compare against")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP,
+                        help=f"packages to list by import time (default {DEFAULT_TOP})")
+    args = parser.parse_args(argv)
+
+    try:
+        baseline = None
+        if args.compare is not None:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        report = measure()
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Streamlit import: {report['streamlit_import_ms']:,.1f} ms")
+    print(f"First render: {report['first_render_ms']:,.1f} ms, of which {report['first_render_import_ms']:,.1f} ms"
+          f" importing {report['first_render_modules']} modules")
+    for name, ms in list(report["packages_ms"].items())[:args.top]:
+        print(f"  {name:<34} {ms:>9,.1f} ms")
+    if report["deferred_imported"]:
+        print(f"Imported although not needed for the first render: {', '.join(report['deferred_imported'])}")
+    if baseline is not None:
+        print("\nChange from the baseline:")
+        print("\n".join(compare(report, baseline)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import roi_api  # noqa: E402
+import roi_engine  # noqa: E402
+
+# Load generator for roi_api.py. Opens --connections keep-alive connections,
+# each sending requests back to back for --duration seconds, and reports the
+# request rate, the scenario rate, latency percentiles and how the server
+# batched the single-scenario requests. Request bodies are random scenarios
+# encoded up front, so the generator spends its time on the connections.
+#
+#     python benchmarks/load_api.py --start-server
+#     python benchmarks/load_api.py --port 8502 --connections 128 --duration 30
+#     python benchmarks/load_api.py --start-server --batch-size 100
+
+DEFAULT_CONNECTIONS = 64
+DEFAULT_DURATION = 10.0
+DEFAULT_WARMUP = 1.0
+REQUEST_POOL = 1000
+SEED = 42
+SERVER_START_TIMEOUT = 30
+
+
+def random_scenarios(count, seed=SEED):
+    # count scenario objects spread over every edition and realistic inputs;
+    # the optional fields are left to the server's defaults
+    rng = np.random.default_rng(seed)
+    return [
+        {
+            "devices": int(rng.integers(10, 20_000)),
+            "applications": int(rng.integers(10, 3000)),
+            "updates_per_app": int(rng.integers(1, 12)),
+            "hours_per_update": round(rng.uniform(0.5, 8.0), 2),
+            "hourly_rate": round(rng.uniform(20.0, 120.0), 2),
+            "automation_efficiency": round(rng.uniform(50.0, 99.0), 1),
+            "edition": roi_engine.EDITIONS[rng.integers(0, len(roi_engine.EDITIONS))],
+            "implementation_cost": round(rng.uniform(0.0, 100_000.0), 2),
+            "bandwidth_savings": round(rng.uniform(0.0, 20_000.0), 2),
+        }
+        for _ in range(count)
+    ]
+
+
+def encode_request(method, path, host, document=None):
+    body = b"" if document is None else json.dumps(document).encode()
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+    return (head + f"Content-Length: {len(body)}\r\n\r\n").encode("latin-1") + body
+
+
+def request_pool(host, batch_size, seed=SEED):
+    # Encoded requests to cycle through: single scenarios, or batches of
+    # batch_size scenarios when batch_size is set
+    if not batch_size:
+        return [encode_request("POST", "/v1/scenario", host, scenario)
+                for scenario in random_scenarios(REQUEST_POOL, seed)]
+    scenarios = random_scenarios(max(REQUEST_POOL, batch_size), seed)
+    return [encode_request("POST", "/v1/scenarios", host, {"scenarios": scenarios[i:i + batch_size]})
+            for i in range(0, len(scenarios) - batch_size + 1, batch_size)]
+
+
+async def read_response(reader):
+    # Status and body of the next response on a connection
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split(" ", 2)[1])
+    length = 0
+    for line in lines[1:]:
+        name, _, value = line.partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+async def get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(encode_request("GET", path, host))
+        status, body = await read_response(reader)
+        if status != 200:
+            raise RuntimeError(f"GET {path} returned {status}: {body.decode(errors='replace')}")
+        return json.loads(body)
+    finally:
+        writer.close()
+
+
+async def run_connection(host, port, requests, offset, warmup_end, deadline, latencies, errors):
+    # Sends requests back to back until the deadline; latencies and errors
+    # are only recorded for requests sent after the warmup
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        i = offset
+        while True:
+            start = time.perf_counter()
+            if start >= deadline:
+                return
+            writer.write(requests[i % len(requests)])
+            i += 1
+            status, _ = await read_response(reader)
+            if start >= warmup_end:
+                latencies.append(time.perf_counter() - start)
+                if status != 200:
+                    errors[status] = errors.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, connections, duration, warmup=DEFAULT_WARMUP, batch_size=0, seed=SEED):
+    # Runs the load and returns a summary dict
+    requests = request_pool(host, batch_size, seed)
+    await get_json(host, port, "/v1/health")
+    latencies, errors = [], {}
+    start = time.perf_counter()
+    warmup_end, deadline = start + warmup, start + warmup + duration
+    before = None
+
+    async def snapshot():
+        nonlocal before
+        await asyncio.sleep(warmup)
+        before = await get_json(host, port, "/v1/health")
+
+    await asyncio.gather(snapshot(), *[
+        run_connection(host, port, requests, i * len(requests) // connections, warmup_end, deadline, latencies, errors)
+        for i in range(connections)])
+    after = await get_json(host, port, "/v1/health")
+    elapsed = max(time.perf_counter() - warmup_end, 1e-9)
+    batches = after["batches"] - before["batches"]
+    batched = after["batched_scenarios"] - before["batched_scenarios"]
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+    return {
+        "endpoint": "/v1/scenarios" if batch_size else "/v1/scenario",
+        "batch_size": batch_size or 1,
+        "connections": connections,
+        "seconds": round(elapsed, 3),
+        "requests": len(latencies),
+        "errors": errors,
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "scenarios_per_second": round(len(latencies) * (batch_size or 1) / elapsed, 1),
+        "latency_ms": {"p50": round(quantiles[49] * 1000, 3), "p90": round(quantiles[89] * 1000, 3),
+                       "p99": round(quantiles[98] * 1000, 3), "max": round(max(latencies, default=0) * 1000, 3)},
+        "server_batches": batches,
+        "mean_server_batch": round(batched / batches, 1) if batches else 0,
+        "catalog_version": after["catalog_version"],
+    }
+
+
+def start_server(host, port, window_ms=None, max_batch_size=None):
+    # Starts roi_api.py in a child process and waits until it answers
+    command = [sys.executable, os.path.join(ROOT, "roi_api.py"), "--host", host, "--port", str(port)]
+    if window_ms is not None:
+        command += ["--batch-window-ms", str(window_ms)]
+    if max_batch_size is not None:
+        command += ["--max-batch-size", str(max_batch_size)]
+    server = subprocess.Popen(command)
+    give_up = time.monotonic() + SERVER_START_TIMEOUT
+    while True:
+        try:
+            asyncio.run(get_json(host, port, "/v1/health"))
+            return server
+        except OSError:
+            if server.poll() is not None or time.monotonic() > give_up:
+                server.kill()
+                raise RuntimeError("roi_api.py did not start")
+            time.sleep(0.1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the Endpoint Central ROI API.")
+    parser.add_argument("--host", default=roi_api.DEFAULT_HOST, help=f"API host (default {roi_api.DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=roi_api.DEFAULT_PORT,
+                        help=f"API port (default {roi_api.DEFAULT_PORT})")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help=f"concurrent keep-alive connections (default {DEFAULT_CONNECTIONS})")
+    parser.add_argument("--duration", type=float, default=DEFAULT_DURATION,
+                        help=f"measured seconds after the warmup (default {DEFAULT_DURATION:g})")
+    parser.add_argument("--warmup", type=float, default=DEFAULT_WARMUP,
+                        help=f"unmeasured seconds at the start (default {DEFAULT_WARMUP:g})")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="send batches of this many scenarios to /v1/scenarios instead of single scenarios")
+    parser.add_argument("--start-server", action="store_true",
+                        help="start roi_api.py on --host and --port for the run and stop it afterwards")
+    parser.add_argument("--batch-window-ms", type=float, help="batch window for a server started here")
+    parser.add_argument("--max-batch-size", type=int, help="maximum batch size for a server started here")
+    parser.add_argument("-o", "--output", help="also write the summary to this JSON file")
+    args = parser.parse_args(argv)
+    if args.connections < 1:
+        parser.error("--connections must be at least 1")
+    if args.duration <= 0 or args.warmup < 0:
+        parser.error("--duration must be positive and --warmup at least 0")
+    if args.batch_size < 0 or args.batch_size > roi_api.MAX_BATCH_SCENARIOS:
+        parser.error(f"--batch-size must be between 0 and {roi_api.MAX_BATCH_SCENARIOS}")
+
+    server = None
+    try:
+        if args.start_server:
+            server = start_server(args.host, args.port, args.batch_window_ms, args.max_batch_size)
+        summary = asyncio.run(run_load(args.host, args.port, args.connections, args.duration,
+                                       warmup=args.warmup, batch_size=args.batch_size))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(summary, f, indent=2)
+                f.write("\n")
+    except (OSError, RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    latency = summary["latency_ms"]
+    print(f"{summary['requests']:,} requests to {summary['endpoint']} over {summary['connections']} connections"
+          f" in {summary['seconds']:.1f}s: {summary['requests_per_second']:,.0f} requests/s,"
+          f" {summary['scenarios_per_second']:,.0f} scenarios/s")
+    print(f"latency p50 {latency['p50']:.2f} ms, p90 {latency['p90']:.2f} ms, p99 {latency['p99']:.2f} ms,"
+          f" max {latency['max']:.2f} ms")
+    if summary["server_batches"]:
+        print(f"server batches: {summary['server_batches']:,}, {summary['mean_server_batch']:.1f} scenarios each")
+    if summary["errors"]:
+        print(f"errors: {summary['errors']}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
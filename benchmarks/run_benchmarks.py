@@ -0,0 +1,359 @@
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+
+import numpy as np
+import plotly.io
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import roi_catalog  # noqa: E402
+import roi_charts  # noqa: E402
+import roi_engine  # noqa: E402
+import roi_reports  # noqa: E402
+import roi_simulation  # noqa: E402
+
+# Benchmarks for the pieces of a roi-tool.py rerun, timed separately: license
+# pricing, the ROI engine at scalar and batch sizes, the uncertainty analyses,
+# every Plotly figure builder, the CSV and PDF reports, and whole headless
+# reruns of the script through Streamlit's AppTest harness. Each case is timed
+# with timeit (enough loops per sample to run for at least 0.2s, best of
+# --repeat samples) and the results are written as JSON so two runs can be
+# compared. Figure results also record the size of the figure's JSON, which
+# is what st.plotly_chart sends to the browser.
+#
+#     python benchmarks/run_benchmarks.py -o before.json
+#     python benchmarks/run_benchmarks.py -o after.json --compare before.json
+#     python benchmarks/run_benchmarks.py --filter engine/ pricing/
+
+APP_SCRIPT = os.path.join(ROOT, "roi-tool.py")
+APP_TIMEOUT = 120
+DEFAULT_BATCH_SIZES = (1_000, 100_000)
+DEFAULT_REPEAT = 5
+MONTE_CARLO_SAMPLES = 100_000
+SEED = 42
+SWEEP_DEVICES = (50, 50_000)
+APP_CASES = ("app/first_run", "app/rerun", "app/input_rerun")
+
+# The calculator's default inputs, as roi-tool.py passes them to the engine
+DEFAULT_INPUTS = dict(
+    devices=3000,
+    applications=1500,
+    updates_per_app=4,
+    hours_per_update=4.0,
+    hourly_rate=50.0,
+    automation_efficiency=90,
+    edition="UEM",
+    license_cost=roi_engine.license_cost(3000, "UEM").item(),
+    implementation_cost=20000,
+    security_benefit=60,
+    compliance_time_saved=250,
+    downtime_reduction=40,
+    bandwidth_savings=5000,
+    years=roi_engine.PROJECTION_YEARS,
+    discount_rate=roi_engine.DEFAULT_DISCOUNT_RATE,
+    license_escalation=roi_engine.DEFAULT_LICENSE_ESCALATION,
+)
+
+# The Monte Carlo panel's defaults: triangular around the inputs, ±20%
+DEFAULT_DISTRIBUTIONS = {
+    "automation_efficiency": ("Triangular", 72.0, 100.0),
+    "security_benefit": ("Triangular", 48.0, 72.0),
+    "downtime_reduction": ("Triangular", 32.0, 48.0),
+    "hours_per_update": ("Triangular", 3.2, 4.8),
+    "incident_rate": ("Triangular", 0.04, 0.06),
+}
+
+
+def random_inputs(rows, seed=SEED):
+    # rows scenarios spread over every edition and realistic input ranges
+    rng = np.random.default_rng(seed)
+    edition = rng.integers(0, len(roi_engine.EDITIONS), rows)
+    devices = rng.integers(10, 20_000, rows)
+    inputs = dict(
+        devices=devices,
+        applications=rng.integers(10, 3000, rows),
+        updates_per_app=rng.integers(1, 12, rows),
+        hours_per_update=rng.uniform(0.5, 8.0, rows),
+        hourly_rate=rng.uniform(20.0, 120.0, rows),
+        automation_efficiency=rng.uniform(50.0, 99.0, rows),
+        edition=edition,
+        license_cost=roi_engine.license_cost(devices, edition),
+        implementation_cost=rng.uniform(0.0, 100_000.0, rows),
+        bandwidth_savings=rng.uniform(0.0, 20_000.0, rows),
+    )
+    inputs.update(roi_engine.default_benefits(edition))
+    return inputs
+
+
+def engine_cases(batch_sizes):
+    yield "pricing/license_cost/scalar", 1, lambda: roi_engine.license_cost(3000, "UEM")
+    yield "engine/calculate_scenario/scalar", 1, lambda: roi_engine.calculate_scenario(**DEFAULT_INPUTS)
+    yield ("engine/compare_editions", len(roi_engine.EDITIONS),
+           lambda: roi_engine.compare_editions(DEFAULT_INPUTS))
+    for rows in batch_sizes:
+        inputs = random_inputs(rows)
+        devices, edition = inputs["devices"], inputs["edition"]
+        yield f"pricing/license_cost/batch_{rows}", rows, lambda: roi_engine.license_cost(devices, edition)
+        yield f"engine/calculate_roi/batch_{rows}", rows, lambda: roi_engine.calculate_roi(**inputs)
+    mc_inputs = dict(DEFAULT_INPUTS, incident_rate=roi_catalog.current().security_incident_rate)
+    yield (f"simulation/monte_carlo/{MONTE_CARLO_SAMPLES}", MONTE_CARLO_SAMPLES,
+           lambda: roi_simulation.summarize_monte_carlo(mc_inputs, DEFAULT_DISTRIBUTIONS,
+                                                        samples=MONTE_CARLO_SAMPLES, seed=SEED))
+    yield ("simulation/sensitivity", 2 * len(roi_simulation.SENSITIVITY_INPUTS) + 1,
+           lambda: roi_simulation.run_sensitivity(DEFAULT_INPUTS))
+    yield ("simulation/goal_seek/hourly_rate", 1,
+           lambda: roi_simulation.goal_seek(DEFAULT_INPUTS, "hourly_rate", "first_year_roi", 5000))
+    yield ("simulation/goal_seek/implementation_cost", 1,
+           lambda: roi_simulation.goal_seek(DEFAULT_INPUTS, "implementation_cost", "payback_months", 6))
+    for points in (200, 1000):
+        yield (f"simulation/sweep/{points}x{points}", points * points,
+               lambda: roi_simulation.run_sweep(DEFAULT_INPUTS, "devices", SWEEP_DEVICES, "hourly_rate", (10, 200),
+                                                "payback_months", points=(points, points)))
+
+
+def figure_cases(theme="Light"):
+    # Every figure roi-tool.py draws, built from the default scenario the way
+    # the script builds them
+    results = roi_engine.calculate_scenario(**DEFAULT_INPUTS)
+    years = list(range(1, DEFAULT_INPUTS["years"] + 1))
+    mc_inputs = dict(DEFAULT_INPUTS, incident_rate=roi_catalog.current().security_incident_rate)
+    monte_carlo = roi_simulation.summarize_monte_carlo(mc_inputs, DEFAULT_DISTRIBUTIONS,
+                                                       samples=MONTE_CARLO_SAMPLES, seed=SEED)
+    editions = roi_engine.compare_editions(DEFAULT_INPUTS)
+    tornado = roi_simulation.run_sensitivity(DEFAULT_INPUTS)["metrics"]["adjusted_annual_savings"]
+    order = tornado["order"][::-1]
+    labels = [list(roi_simulation.SENSITIVITY_INPUTS.values())[i] for i in order]
+    sweep = roi_simulation.run_sweep(DEFAULT_INPUTS, "devices", SWEEP_DEVICES, "hourly_rate", (10, 200),
+                                     "payback_months", points=(1000, 1000))
+    comparison_data = {
+        "Metric": ["Total Annual Hours Required", "Annual Labor Cost"] + [f"Qualitative Metric {i}" for i in range(7)],
+        "Manual Process": [f"{results['total_manual_hours']:,.0f} hours",
+                           f"${results['total_manual_cost']:,.2f}"] + ["Limited"] * 7,
+        "Endpoint Central": [f"{results['total_automated_hours']:,.0f} hours",
+                             f"${results['total_automated_cost']:,.2f}"] + ["Automated"] * 7,
+        "Impact": ["Hours saved", "Cost saved"] + ["Improved"] * 7,
+    }
+    yield "figures/hours", lambda: roi_charts.build_hours_figure(
+        results["total_manual_hours"], results["total_automated_hours"], theme)
+    yield "figures/cost", lambda: roi_charts.build_cost_figure(
+        results["total_manual_cost"], results["total_automated_cost"] + results["license_cost"], theme)
+    yield "figures/projection", lambda: roi_charts.build_projection_figure(
+        years, results["costs_manual"], results["costs_automated"], results["cumulative_savings"], theme)
+    yield "figures/projection_bands", lambda: roi_charts.build_projection_figure(
+        years, results["costs_manual"], results["costs_automated"], results["cumulative_savings"], theme,
+        savings_bands=monte_carlo["cumulative_savings_bands"], percentiles=monte_carlo["percentiles"])
+    yield "figures/payback_histogram", lambda: roi_charts.build_payback_histogram_figure(
+        monte_carlo["payback_counts"], monte_carlo["payback_edges"], monte_carlo["samples"], theme)
+    yield "figures/benefits", lambda: roi_charts.build_benefits_figure(results["total_benefits"], theme)
+    yield "figures/pie", lambda: roi_charts.build_pie_figure(results["total_benefits"], theme)
+    yield "figures/process_compact", lambda: roi_charts.build_process_figure(
+        results["total_manual_hours"], results["total_automated_hours"], results["total_manual_cost"],
+        results["total_automated_cost"] + results["license_cost"], theme)
+    yield "figures/benefits_compact", lambda: roi_charts.build_benefits_overview_figure(
+        results["total_benefits"], theme)
+    yield "figures/tornado", lambda: roi_charts.build_tornado_figure(
+        labels, (tornado["low"] - tornado["base"])[order], (tornado["high"] - tornado["base"])[order],
+        tornado["base"], 10, "Annual Savings", theme)
+    yield "figures/editions", lambda: roi_charts.build_editions_figure(
+        roi_engine.EDITIONS, editions["adjusted_annual_savings"], editions["first_year_roi"],
+        editions["payback_months"], DEFAULT_INPUTS["edition"], theme)
+    yield "figures/comparison", lambda: roi_charts.build_comparison_figure(comparison_data, theme)
+    yield "figures/sweep_1000x1000", lambda: roi_charts.build_sweep_figure(
+        sweep["x"], sweep["y"], sweep["values"], "Number of Devices", "Technician Hourly Rate",
+        "Payback Period (Months)", True, sweep["x_breakpoints"], sweep["y_breakpoints"], theme)
+
+
+def report_cases():
+    row = dict(roi_engine.calculate_scenario(**DEFAULT_INPUTS), **DEFAULT_INPUTS)
+    yield "reports/csv", lambda: roi_reports.csv_report(row)
+    yield "reports/pdf", lambda: roi_reports.pdf_report(row)
+
+
+def app_cases():
+    # Whole script runs. first_run starts a new session with empty caches,
+    # rerun repeats an unchanged session (every memoized result is a hit) and
+    # input_rerun changes the device count on each run, so the calculation and
+    # the open chart miss the cache the way a user editing an input does.
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    # Streamlit logs a deprecation warning per chart on every run
+    logging.disable(logging.WARNING)
+
+    def first_run():
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        AppTest.from_file(APP_SCRIPT, default_timeout=APP_TIMEOUT).run()
+
+    session = AppTest.from_file(APP_SCRIPT, default_timeout=APP_TIMEOUT).run()
+    if session.exception:
+        raise RuntimeError(f"{APP_SCRIPT} failed: {session.exception[0].message}")
+    devices = next(widget for widget in session.number_input if widget.label == "Number of Devices")
+    device_counts = iter(range(DEFAULT_INPUTS["devices"] + 1, sys.maxsize))
+
+    def input_rerun():
+        devices.set_value(next(device_counts)).run()
+
+    yield from zip(APP_CASES, (first_run, session.run, input_rerun))
+
+
+def benchmark_cases(batch_sizes, include_app=True):
+    # (name, scenarios per call, function) for every benchmark
+    yield from engine_cases(batch_sizes)
+    for name, func in figure_cases():
+        yield name, 1, func
+    for name, func in report_cases():
+        yield name, 1, func
+    if include_app:
+        for name, func in app_cases():
+            yield name, 1, func
+
+
+def time_case(func, repeat):
+    # Seconds per call over repeat samples, each of enough calls to take at
+    # least 0.2s; the calibration run doubles as a warm-up
+    timer = timeit.Timer(func)
+    loops, _ = timer.autorange()
+    return loops, [elapsed / loops for elapsed in timer.repeat(repeat, loops)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import fpdf
+    import pandas
+    import plotly
+    import streamlit
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "plotly": plotly.__version__,
+        "streamlit": streamlit.__version__,
+        "fpdf": fpdf.FPDF_VERSION,
+        "git_commit": git_commit(),
+    }
+
+
+def run_benchmarks(patterns=(), repeat=DEFAULT_REPEAT, batch_sizes=DEFAULT_BATCH_SIZES, progress=None):
+    # Times every case whose name contains one of patterns (all cases when
+    # patterns is empty) and returns the JSON document
+    def selected(name):
+        return not patterns or any(pattern in name for pattern in patterns)
+
+    results = []
+    include_app = any(selected(name) for name in APP_CASES)
+    for name, rows, func in benchmark_cases(batch_sizes, include_app=include_app):
+        if not selected(name):
+            continue
+        loops, samples = time_case(func, repeat)
+        result = {
+            "name": name,
+            "rows": rows,
+            "loops": loops,
+            "repeat": repeat,
+            "min": min(samples),
+            "median": statistics.median(samples),
+            "mean": statistics.fmean(samples),
+            "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            "rows_per_second": rows / min(samples),
+        }
+        if name.startswith("figures/"):
+            result["payload_bytes"] = len(plotly.io.to_json(func(), validate=False))
+        results.append(result)
+        if progress is not None:
+            progress(result)
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "environment": environment(),
+        "results": results,
+    }
+
+
+def format_seconds(seconds):
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.0f} ns"
+
+
+def compare(report, baseline):
+    # Per-case best time against a baseline run, slower cases first
+    baseline_best = {result["name"]: result["min"] for result in baseline["results"]}
+    rows = [(result["min"] / baseline_best[result["name"]], result)
+            for result in report["results"] if result["name"] in baseline_best]
+    lines = [f"{'benchmark':<40} {'baseline':>12} {'current':>12} {'ratio':>8}"]
+    for ratio, result in sorted(rows, key=lambda row: -row[0]):
+        lines.append(f"{result['name']:<40} {format_seconds(baseline_best[result['name']]):>12} "
+                     f"{format_seconds(result['min']):>12} {ratio:>7.2f}x")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Endpoint Central ROI calculator.")
+    parser.add_argument("-o", "--output", default="benchmark-results.json",
+                        help="JSON file for the results (default: benchmark-results.json)")
+    parser.add_argument("--filter", nargs="+", default=[], metavar="PATTERN",
+                        help="only run benchmarks whose name contains one of the patterns")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"timed samples per benchmark (default {DEFAULT_REPEAT})")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(DEFAULT_BATCH_SIZES),
+                        help="scenario counts for the batch engine benchmarks (default: 1000 100000)")
+    parser.add_argument("--compare", metavar="BASELINE", help="results JSON of an earlier run to compare against")
+    parser.add_argument("--list", action="store_true", help="list the benchmark names and exit")
+    args = parser.parse_args(argv)
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    if min(args.batch_sizes) < 1:
+        parser.error("--batch-sizes must be at least 1")
+
+    if args.list:
+        for name, _, _ in benchmark_cases(args.batch_sizes, include_app=False):
+            print(name)
+        print("\n".join(APP_CASES))
+        return 0
+
+    def report_progress(result):
+        payload = f", {result['payload_bytes'] / 1024:,.1f} KB of JSON" if "payload_bytes" in result else ""
+        print(f"{result['name']:<40} {format_seconds(result['min']):>12} per call"
+              f" (best of {result['repeat']} x {result['loops']} loops){payload}", file=sys.stderr)
+
+    try:
+        baseline = None
+        if args.compare is not None:
+            with open(args.compare) as f:
+                baseline = json.load(f)
+        report = run_benchmarks(args.filter, repeat=args.repeat, batch_sizes=args.batch_sizes,
+                                progress=report_progress)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {len(report['results'])} results to {args.output}", file=sys.stderr)
+    if baseline is not None:
+        print(compare(report, baseline))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,30 @@
 import streamlit as st
-import pandas as pd
 import numpy as np
-import io
-import base64
-from PIL import Image
-import plotly.express as px
-import plotly.graph_objects as go
-from fpdf import FPDF
-import tempfile
+import functools
 import os
 import json
+import sqlite3
 import traceback
 
+# pandas, fpdf and roi_batch (which needs pandas) are imported where they are
+# first used, in panels that are closed or idle on the first render, so a cold
+# start does not wait for them
+import roi_catalog
+import roi_charts
+import roi_content
+import roi_engine
+import roi_fleet
+import roi_memo
+import roi_reports
+import roi_result_cache
+import roi_simulation
+import roi_software
+import roi_store
+import roi_timing
+
+# Opt-in per-section timings of each rerun, see roi_timing.py
+timings = roi_timing.RerunTimer(roi_timing.timings_requested(st.query_params))
+
 # Set page config
 st.set_page_config(
     page_title="Endpoint Central ROI Calculator",
@@ -19,10 +32,85 @@ st.set_page_config(
     layout="wide"
 )
 
+# Pricing and model assumptions for this rerun; the catalog file is reloaded
+# when it changes, and a rerun uses one catalog throughout
+try:
+    catalog = roi_catalog.current()
+except (OSError, roi_catalog.CatalogError) as e:
+    st.error(f"Error loading the pricing catalog: {str(e)}")
+    st.stop()
+
+# Calculator state as JSON, saved to and loaded from the scenario store
+def handle_calculation_error(func):
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            st.error(f"Calculation error: {str(e)}")
+            st.error(traceback.format_exc())
+            return None
+    return wrapper
+
+@handle_calculation_error
+def save_calculator_state():
+    state = {
+        "devices": devices,
+        "applications": applications,
+        "updates_per_app": updates_per_app,
+        "hours_per_update": hours_per_update,
+        "hourly_rate": hourly_rate,
+        "automation_efficiency": automation_efficiency,
+        "edition": edition,
+        "implementation_cost": implementation_cost,
+        "security_benefit": security_benefit,
+        "compliance_time_saved": compliance_time_saved,
+        "downtime_reduction": downtime_reduction,
+        "bandwidth_savings": bandwidth_savings,
+        "years": projection_years,
+        "discount_rate": discount_rate,
+        "license_escalation": license_escalation,
+        "override_license": override_license,
+        "license_cost": license_cost,
+        "theme": theme
+    }
+    # The device class and effort mixes of fleet and software inventories, so
+    # the scenario reloads with the same results without the files
+    if fleet_mix is not None:
+        state.update(fleet_mix)
+    if software_mix is not None:
+        state.update(software_mix)
+    return json.dumps(state)
+
+@handle_calculation_error
+def load_calculator_state(state_json):
+    try:
+        state = json.loads(state_json)
+        return state
+    except:
+        return None
+
+# Inputs of a scenario loaded from the store, used as the defaults of the
+# input widgets below; the theme is left as it is. The input widgets have keys
+# starting with "input_" so that apply_loaded_state can reset them.
+loaded_state = st.session_state.get("loaded_state") or {}
+
+def apply_loaded_state(state):
+    # Only valid in a widget callback, before the widgets are drawn
+    st.session_state["loaded_state"] = state
+    for key in [key for key in st.session_state if key.startswith("input_")]:
+        del st.session_state[key]
+
 # Sidebar for theme toggle
 with st.sidebar:
     st.title("Settings")
     theme = st.radio("Choose Theme", ["Light", "Dark"], index=0)
+    # Fewer, combined figures for slow connections; ?compact=1 turns it on
+    compact_charts = st.checkbox(
+        "Compact charts",
+        value=st.query_params.get("compact", "0") not in ("", "0"),
+        help="Draws the time and cost charts, and the benefit charts, together in one figure each, "
+             "which sends less data to the browser over slow connections"
+    )
 
     st.markdown("---")
     st.markdown("### About")
@@ -34,95 +122,14 @@ with st.sidebar:
 
     Version 1.0 | March 2025
     """)
+    st.caption(f"Pricing catalog {catalog.version}")
 
-# Apply theme-specific CSS
-if theme == "Light":
-    theme_color = "#0066B3"
-    background_color = "#FFFFFF"
-    text_color = "#333333"
-    card_bg = "#f7f7f7"
-    plot_bg = "#FFFFFF"
-    plot_color = "#333333"
-else:  # Dark theme
-    theme_color = "#4098E5"
-    background_color = "#1E1E1E"
-    text_color = "#F0F0F0"
-    card_bg = "#2D2D2D"
-    plot_bg = "#1E1E1E"
-    plot_color = "#F0F0F0"
-
-# Custom CSS based on selected theme
-st.markdown(f"""
-<style>
-    .title {{
-        font-size: 42px;
-        font-weight: bold;
-        color: {theme_color};
-        margin-bottom: 0px;
-    }}
-    .subtitle {{
-        font-size: 20px;
-        color: {text_color};
-        margin-top: 0px;
-        margin-bottom: 30px;
-    }}
-    .section-header {{
-        font-size: 24px;
-        font-weight: bold;
-        color: {theme_color};
-        margin-top: 30px;
-        margin-bottom: 20px;
-    }}
-    .metric-container {{
-        background-color: {card_bg};
-        border-radius: 5px;
-        padding: 20px;
-        text-align: center;
-        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-    }}
-    .metric-value {{
-        font-size: 36px;
-        font-weight: bold;
-        color: {theme_color};
-    }}
-    .metric-label {{
-        font-size: 16px;
-        color: {text_color};
-    }}
-    .stApp {{
-        background-color: {background_color};
-        color: {text_color};
-    }}
-    .stTextInput>div>div>input {{
-        color: {text_color};
-    }}
-    .stSelectbox>div>div>div {{
-        color: {text_color};
-    }}
-    .stNumberInput>div>div>input {{
-        color: {text_color};
-    }}
-    .st-bx {{
-        color: {text_color};
-    }}
-    .st-bs {{
-        color: {text_color};
-    }}
-
-    /* Block scrollbar on all elements */
-    ::-webkit-scrollbar {{
-        width: 10px;
-        background: {background_color};
-    }}
-    ::-webkit-scrollbar-track {{
-        background: {background_color};
-    }}
-    ::-webkit-scrollbar-thumb {{
-        background: {theme_color};
-        border-radius: 10px;
-    }}
-</style>
-""", unsafe_allow_html=True)
+timings.lap("sidebar")
+
+# Apply theme-specific CSS; the stylesheet is built once per theme
+text_color = roi_charts.THEME_COLORS[theme]["text_color"]
+st.markdown(roi_content.theme_css(theme), unsafe_allow_html=True)
+timings.lap("css")
 
 # Title and Introduction
 st.markdown("<div class='title'>Endpoint Central ROI Calculator </div>", unsafe_allow_html=True)
@@ -135,6 +142,7 @@ This calculator helps you estimate the Return on Investment (ROI) from implement
 IT infrastructure management. By comparing manual processes with automated solutions, you can visualize potential 
 cost savings, efficiency gains, and strategic benefits.
 """)
+timings.lap("header")
 
 # Create two columns for the main layout
 col1, col2 = st.columns([1, 2])
@@ -143,157 +151,232 @@ col1, col2 = st.columns([1, 2])
 with col1:
     st.markdown("<div class='section-header'>Input Parameters</div>", unsafe_allow_html=True)
 
-    # User inputs with default values from the blueprint
-    devices = st.number_input("Number of Devices", min_value=1, value=3000,
-                                help="Total number of endpoints to be managed")
-    applications = st.number_input("Number of Applications", min_value=1, value=1500,
-                                   help="Total number of applications to be updated")
-    updates_per_app = st.number_input("Updates per Application per Year", min_value=1, value=4,
-                                      help="Average number of updates required per application per year")
-    hours_per_update = st.number_input("Hours per Update (Manual Process)", min_value=0.1, value=4.0,
+    # An uploaded inventory export sets the device count and weighs the
+    # incident and downtime benefits by its device classes, see roi_fleet.py.
+    # An export too large to upload is summarized with roi_fleet.py where it
+    # lives, and the summary file uploaded instead.
+    fleet = None
+    with st.expander("Fleet Inventory"):
+        st.markdown("Upload an endpoint inventory export with one device per row and site and device type "
+                    "columns (OS and criticality are optional) to use its device count and device class mix. "
+                    "For a large export, run `python roi_fleet.py inventory.csv -o fleet.json` and upload "
+                    "`fleet.json` instead.")
+        fleet_file = st.file_uploader("Inventory CSV or Fleet Summary JSON", type=["csv", "json"], key="fleet_file")
+        if fleet_file is not None:
+            try:
+                if fleet_file.name.lower().endswith(".json"):
+                    fleet_counts = roi_memo.read_inventory_summary(fleet_file)
+                else:
+                    fleet_counts = roi_memo.aggregate_inventory(fleet_file)
+                fleet = roi_fleet.summarize(fleet_counts, catalog=catalog)
+            except ValueError as e:
+                st.error(f"Error reading the inventory: {str(e)}")
+        if fleet is not None:
+            import pandas as pd
+
+            st.caption(f"{fleet['devices']:,} devices at {fleet['sites']:,} sites: incidents weighted "
+                       f"{fleet['fleet_incident_factor']:.2f}x and downtime {fleet['fleet_downtime_factor']:.2f}x "
+                       f"per device")
+            st.dataframe(
+                pd.DataFrame(fleet["classes"], columns=["Device Type", "Criticality", "Devices", "Incident Factor",
+                                                        "Downtime Factor"]),
+                hide_index=True,
+                use_container_width=True
+            )
+            st.dataframe(
+                pd.DataFrame(fleet["site_totals"], columns=["Site", "Devices", "Incident-weighted Devices",
+                                                            "Downtime-weighted Devices"]),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "Incident-weighted Devices": st.column_config.NumberColumn(format="%.0f"),
+                    "Downtime-weighted Devices": st.column_config.NumberColumn(format="%.0f")
+                }
+            )
+            if fleet["unmatched"]:
+                st.info(f"Not in the pricing catalog, weighted 1.0: {', '.join(fleet['unmatched'])}")
+
+    # User inputs with default values from the blueprint. fleet_mix is the
+    # device class mix in effect: the uploaded inventory's, or the one a
+    # loaded scenario was saved with, unless the user drops it.
+    fleet_mix = None
+    if fleet is not None:
+        devices = fleet["devices"]
+        st.number_input("Number of Devices", min_value=1, value=devices, disabled=True,
+                        key=f"fleet_devices_{devices}", help="From the uploaded fleet inventory")
+        fleet_mix = {name: fleet[name] for name in roi_fleet.MIX_INPUTS}
+    else:
+        devices = st.number_input("Number of Devices", min_value=1, value=loaded_state.get("devices", 3000),
+                                  key="input_devices", help="Total number of endpoints to be managed")
+        if all(name in loaded_state for name in roi_fleet.MIX_INPUTS):
+            if st.checkbox("Keep the device class mix of the loaded scenario", value=True,
+                           key="input_keep_fleet_mix",
+                           help=f"Incidents weighted {loaded_state['fleet_incident_factor']:.2f}x and downtime "
+                                f"{loaded_state['fleet_downtime_factor']:.2f}x per device, from the fleet inventory "
+                                "the scenario was saved with"):
+                fleet_mix = {name: loaded_state[name] for name in roi_fleet.MIX_INPUTS}
+
+    # An uploaded software inventory sets the application count and yearly
+    # updates and weighs the hours per update by each application's installed
+    # base, see roi_software.py. Like a fleet inventory, a large export can be
+    # summarized with roi_software.py and the summary file uploaded instead.
+    software = None
+    with st.expander("Software Inventory"):
+        st.markdown("Upload a software inventory or patch history export with application and version columns "
+                    "(install count is optional) to use its per-application patch workload. For a large export, "
+                    "run `python roi_software.py installs.csv -o workload.json` and upload `workload.json` "
+                    "instead.")
+        software_file = st.file_uploader("Software CSV or Workload JSON", type=["csv", "json"], key="software_file")
+        software_years = st.number_input("Inventory Period (Years)", min_value=0.1,
+                                         max_value=roi_software.MAX_PERIOD_YEARS,
+                                         value=roi_software.DEFAULT_PERIOD_YEARS, step=0.5, key="software_years",
+                                         help="Years of releases the file covers; each distinct version is one update")
+        if software_file is not None:
+            try:
+                if software_file.name.lower().endswith(".json"):
+                    software_counts = roi_memo.read_software_summary(software_file)
+                else:
+                    software_counts = roi_memo.aggregate_software(software_file)
+                software = roi_software.summarize(software_counts, period_years=software_years, catalog=catalog)
+            except ValueError as e:
+                st.error(f"Error reading the software inventory: {str(e)}")
+        if software is not None:
+            import pandas as pd
+
+            st.caption(f"{software['applications']:,} applications with {software['total_updates']:,.0f} updates "
+                       f"per year, hours per update weighted {software['patch_effort_factor']:.2f}x by installed base")
+            st.dataframe(
+                pd.DataFrame(software["top_applications"], columns=["Application", "Versions", "Installs",
+                                                                    "Updates per Year", "Effort Factor",
+                                                                    "Weighted Updates"]),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "Installs": st.column_config.NumberColumn(format="%.0f"),
+                    "Updates per Year": st.column_config.NumberColumn(format="%.2f"),
+                    "Weighted Updates": st.column_config.NumberColumn(format="%.2f")
+                }
+            )
+
+    # software_mix is the effort mix in effect, like fleet_mix above. Updates
+    # per application are fractional when they come from an inventory, so the
+    # input takes fractions too.
+    software_mix = None
+    if software is not None:
+        applications = software["applications"]
+        updates_per_app = software["updates_per_app"]
+        st.number_input("Number of Applications", min_value=1, value=applications, disabled=True,
+                        key=f"software_applications_{applications}", help="From the uploaded software inventory")
+        st.number_input("Updates per Application per Year", value=updates_per_app, disabled=True, format="%.2f",
+                        key=f"software_updates_{updates_per_app}", help="From the uploaded software inventory")
+        software_mix = {name: software[name] for name in roi_software.MIX_INPUTS}
+    else:
+        applications = st.number_input("Number of Applications", min_value=1,
+                                       value=loaded_state.get("applications", 1500), key="input_applications",
+                                       help="Total number of applications to be updated")
+        updates_per_app = st.number_input("Updates per Application per Year", min_value=0.01,
+                                          value=float(loaded_state.get("updates_per_app", 4)), step=1.0,
+                                          format="%.2f", key="input_updates_per_app",
+                                          help="Average number of updates required per application per year")
+        if all(name in loaded_state for name in roi_software.MIX_INPUTS):
+            if st.checkbox("Keep the patch effort mix of the loaded scenario", value=True,
+                           key="input_keep_software_mix",
+                           help=f"Hours per update weighted {loaded_state['patch_effort_factor']:.2f}x by installed "
+                                "base, from the software inventory the scenario was saved with"):
+                software_mix = {name: loaded_state[name] for name in roi_software.MIX_INPUTS}
+    hours_per_update = st.number_input("Hours per Update (Manual Process)", min_value=0.1,
+                                       value=loaded_state.get("hours_per_update", 4.0), key="input_hours_per_update",
                                        help="Average time required to manually update one application")
-    hourly_rate = st.number_input("Technician Hourly Rate ($)", min_value=1.0, value=50.0,
+    hourly_rate = st.number_input("Technician Hourly Rate ($)", min_value=1.0,
+                                  value=loaded_state.get("hourly_rate", 50.0), key="input_hourly_rate",
                                   help="Average cost per hour for IT personnel")
 
     st.markdown("### Automation Efficiency")
-    automation_efficiency = st.slider("Automation Efficiency (%)", min_value=50, max_value=99, value=90,
+    automation_efficiency = st.slider("Automation Efficiency (%)", min_value=50, max_value=99,
+                                      value=loaded_state.get("automation_efficiency", 90),
+                                      key="input_automation_efficiency",
                                       help="Percentage reduction in manual effort achieved through automation")
 
     st.markdown("### Endpoint Central Edition")
 
-    # Create a dictionary of edition information
-    edition_info = {
-        "Free": {
-            "description": "Basic management for up to 25-50 endpoints at no cost",
-            "features": "Basic endpoint management, patch management",
-            "best_for": "Small businesses with limited IT needs"
-        },
-        "Professional": {
-            "description": "Complete endpoint management for LAN environments",
-            "features": "Patch management, application distribution, asset management, remote troubleshooting, BYOD management, kiosk mode",
-            "best_for": "Small to medium businesses in single-location environments",
-            "base_price": 795
-        },
-        "Enterprise": {
-            "description": "Enhanced management for WAN environments",
-            "features": "Everything in Professional + self-service portal, USB device management, audit remote sessions, license management",
-            "best_for": "Organizations with multiple locations requiring centralized management",
-            "base_price": 945
-        },
-        "UEM": {
-            "description": "Unified endpoint management across all devices",
-            "features": "Everything in Enterprise + remote data wipe, OS deployment, FileVault encryption, mobile device management",
-            "best_for": "Organizations with diverse device types and operating systems",
-            "base_price": 1095
-        },
-        "Security": {
-            "description": "Comprehensive security-focused endpoint management",
-            "features": "Everything in UEM + vulnerability remediation, data loss prevention, endpoint privilege management, browser security, ransomware protection",
-            "best_for": "Organizations with high security requirements or in regulated industries",
-            "base_price": 1695
-        }
-    }
     # Create columns for edition selection and information display
     edition_col1, edition_col2 = st.columns([1, 2])
 
     with edition_col1:
+        # A catalog always lists exactly these editions, see roi_catalog.py
+        default_edition = loaded_state.get("edition", "UEM")
         edition = st.selectbox(
             "Select Edition",
-            ["Free", "Professional", "Enterprise", "UEM", "Security"],
-            index=3,
+            roi_engine.EDITIONS,
+            index=roi_engine.EDITION_INDEX.get(default_edition, 0),
+            key="input_edition",
             help="Different editions offer varying features and pricing"
         )
 
     with edition_col2:
-        st.markdown(f"**{edition} Edition**: {edition_info[edition]['description']}")
-        st.markdown(f"**Key Features**: {edition_info[edition]['features']}")
-        st.markdown(f"**Best For**: {edition_info[edition]['best_for']}")
+        st.markdown(f"**{edition} Edition**: {catalog.edition_info[edition]['description']}")
+        st.markdown(f"**Key Features**: {catalog.edition_info[edition]['key_features']}")
+        st.markdown(f"**Best For**: {catalog.edition_info[edition]['best_for']}")
+
+    timings.lap("inputs")
 
     # Calculate license cost based on edition and number of devices
     try:
-        if edition == "Free":
-            if devices <= 50:
-                license_cost = 0
-            else:
-                st.warning("Free Edition is limited to 50 endpoints. Please select a paid edition for larger deployments.")
-                license_cost = 0
-        else:
-            base_prices = {
-                "Professional": 795,
-                "Enterprise": 945,
-                "UEM": 1095,
-                "Security": 1695
-            }
-            if devices <= 50:
-                license_cost = base_prices[edition]
-            else:
-                tiers = [
-                    (100, 0.9),
-                    (500, 0.8),
-                    (1000, 0.7),
-                    (float('inf'), 0.6)
-                ]
-                remaining_devices = devices - 50
-                additional_cost = 0
-                base_cost_per_device = base_prices[edition] / 50
-                current_devices = 50
-                for tier_limit, discount_factor in tiers:
-                    if current_devices >= devices:
-                        break
-                    devices_in_tier = min(tier_limit, devices) - current_devices
-                    if devices_in_tier > 0:
-                        additional_cost += devices_in_tier * base_cost_per_device * discount_factor
-                        current_devices += devices_in_tier
-                license_cost = base_prices[edition] + additional_cost
+        if edition == "Free" and devices > catalog.free_edition_device_limit:
+            st.warning(f"Free Edition is limited to {catalog.free_edition_device_limit} endpoints. "
+                       "Please select a paid edition for larger deployments.")
+        license_cost = roi_engine.license_cost(devices, edition, catalog=catalog).item()
     except Exception as e:
         st.error(f"Error calculating license cost: {str(e)}")
         license_cost = 0
 
+    timings.lap("license")
+
     st.markdown(f"### Calculated Annual License Cost: ${license_cost:,.2f}")
     st.caption("Based on selected edition and number of devices")
 
-    override_license = st.checkbox("Override calculated license cost", value=False)
+    override_license = st.checkbox("Override calculated license cost",
+                                   value=loaded_state.get("override_license", False), key="input_override_license")
     if override_license:
-        license_cost = st.number_input("Custom Annual License Cost ($)", min_value=0, value=int(license_cost),
+        # Keyed on the calculated cost, so the custom cost starts over from it
+        # when the edition or device count changes
+        custom_license_cost = loaded_state["license_cost"] if loaded_state.get("override_license") else license_cost
+        license_cost = st.number_input("Custom Annual License Cost ($)", min_value=0, value=int(custom_license_cost),
+                                       key=f"input_custom_license_cost_{license_cost:.2f}",
                                        help="Enter your specific license cost if you have a custom quote")
 
-    implementation_cost = st.number_input("One-time Implementation Cost ($)", min_value=0, value=20000,
+    implementation_cost = st.number_input("One-time Implementation Cost ($)", min_value=0,
+                                          value=loaded_state.get("implementation_cost", 20000),
+                                          key="input_implementation_cost",
                                           help="One-time cost for implementation, training, etc.")
 
+    with st.expander("Projection & Discounting"):
+        projection_years = st.slider("Projection Horizon (Years)", min_value=1, max_value=15,
+                                     value=loaded_state.get("years", roi_engine.PROJECTION_YEARS),
+                                     key="input_years",
+                                     help="Number of years covered by the projection, cumulative savings and NPV")
+        discount_rate = st.number_input("Discount Rate (%)", min_value=0.0, max_value=100.0,
+                                        value=loaded_state.get("discount_rate", roi_engine.DEFAULT_DISCOUNT_RATE),
+                                        step=0.5, key="input_discount_rate",
+                                        help="Annual rate used to discount future savings for the net present value")
+        license_escalation = st.number_input("Annual License Price Escalation (%)", min_value=0.0, max_value=100.0,
+                                             value=loaded_state.get("license_escalation", roi_engine.DEFAULT_LICENSE_ESCALATION),
+                                             step=0.5, key="input_license_escalation",
+                                             help="Yearly increase in the license price after the first year")
+
     st.markdown("### Additional Benefits")
-    edition_benefits = {
-        "Free": {
-            "security_benefit_max": 30,
-            "downtime_reduction_max": 20,
-            "default_compliance_hours": 100
-        },
-        "Professional": {
-            "security_benefit_max": 50,
-            "downtime_reduction_max": 35,
-            "default_compliance_hours": 150
-        },
-        "Enterprise": {
-            "security_benefit_max": 65,
-            "downtime_reduction_max": 50,
-            "default_compliance_hours": 200
-        },
-        "UEM": {
-            "security_benefit_max": 75,
-            "downtime_reduction_max": 60,
-            "default_compliance_hours": 250
-        },
-        "Security": {
-            "security_benefit_max": 90,
-            "downtime_reduction_max": 70,
-            "default_compliance_hours": 300
-        }
-    }
+    edition_benefits = {key: int(value[0]) for key, value in roi_engine.default_benefits(edition, catalog=catalog).items()}
+    if loaded_state.get("edition") == edition:
+        edition_benefits.update({key: loaded_state[key] for key in edition_benefits})
+    # The benefit inputs are keyed per edition, so they start over from the
+    # edition's defaults when the edition changes
     with st.expander("Security & Compliance Benefits"):
         security_benefit = st.slider(
             "Security Incident Reduction (%)",
             min_value=0,
             max_value=100,
-            value=min(edition_benefits[edition]["security_benefit_max"], 60),
+            value=edition_benefits["security_benefit"],
+            key=f"input_security_benefit_{edition}",
             help="Estimated reduction in security incidents"
         )
         if edition == "Security":
@@ -301,7 +384,8 @@ with col1:
         compliance_time_saved = st.number_input(
             "Hours Saved on Compliance Reporting (Annual)",
             min_value=0,
-            value=edition_benefits[edition]["default_compliance_hours"],
+            value=edition_benefits["compliance_time_saved"],
+            key=f"input_compliance_time_saved_{edition}",
             help="Estimated hours saved on compliance reporting"
         )
         if edition in ["Enterprise", "UEM", "Security"]:
@@ -311,173 +395,147 @@ with col1:
             "Downtime Reduction (%)",
             min_value=0,
             max_value=100,
-            value=min(edition_benefits[edition]["downtime_reduction_max"], 40),
+            value=edition_benefits["downtime_reduction"],
+            key=f"input_downtime_reduction_{edition}",
             help="Estimated reduction in system downtime"
         )
         bandwidth_savings = st.number_input(
             "Bandwidth Cost Savings ($)",
             min_value=0,
-            value=5000,
+            value=loaded_state.get("bandwidth_savings", 5000),
+            key="input_bandwidth_savings",
             help="Estimated bandwidth cost savings from optimized patch downloads"
         )
         if edition in ["UEM", "Security"]:
             st.info("UEM and Security editions include advanced remote troubleshooting and deployment optimization features that can significantly reduce downtime and bandwidth usage.")
+        calculation_inputs = {
+            "devices": devices,
+            "applications": applications,
+            "updates_per_app": updates_per_app,
+            "hours_per_update": hours_per_update,
+            "hourly_rate": hourly_rate,
+            "automation_efficiency": automation_efficiency,
+            "edition": edition,
+            "license_cost": license_cost,
+            "implementation_cost": implementation_cost,
+            "security_benefit": security_benefit,
+            "compliance_time_saved": compliance_time_saved,
+            "downtime_reduction": downtime_reduction,
+            "bandwidth_savings": bandwidth_savings,
+            "years": projection_years,
+            "discount_rate": discount_rate,
+            "license_escalation": license_escalation
+        }
+        if fleet_mix is not None:
+            calculation_inputs.update(fleet_mix)
+        if software_mix is not None:
+            calculation_inputs.update(software_mix)
+        timings.lap("benefit_inputs")
         try:
-            total_updates = applications * updates_per_app
-            total_manual_hours = total_updates * hours_per_update
-            total_manual_cost = total_manual_hours * hourly_rate
-
-            automation_factor = 1 - (automation_efficiency / 100)
-            total_automated_hours = total_manual_hours * automation_factor
-            total_automated_cost = total_automated_hours * hourly_rate
-
-            annual_labor_savings = total_manual_cost - total_automated_cost
-
-            if edition == "Security":
-                avg_incident_cost = 7500
-            elif edition in ["UEM", "Enterprise"]:
-                avg_incident_cost = 6000
-            else:
-                avg_incident_cost = 5000
-
-            security_incidents_reduction_value = (security_benefit / 100) * (devices * 0.05) * avg_incident_cost
-
-            if edition in ["UEM", "Security"]:
-                downtime_hours_per_device = 2.5
-                efficiency_factor = 1.8
-            elif edition == "Enterprise":
-                downtime_hours_per_device = 2.2
-                efficiency_factor = 1.5
-            else:
-                downtime_hours_per_device = 2.0
-                efficiency_factor = 1.5
-
-            downtime_hours_saved = (downtime_reduction / 100) * (devices * downtime_hours_per_device)
-            downtime_cost_saved = downtime_hours_saved * hourly_rate * efficiency_factor
-
-            if edition in ["UEM", "Security"]:
-                bandwidth_factor = 1.2
-            else:
-                bandwidth_factor = 1.0
-
-            bandwidth_savings_adjusted = bandwidth_savings * bandwidth_factor
-
-            annual_compliance_savings = compliance_time_saved * hourly_rate
-
-            total_annual_savings = (annual_labor_savings + annual_compliance_savings +
-                                    bandwidth_savings_adjusted + security_incidents_reduction_value +
-                                    downtime_cost_saved)
-
-            edition_specific_features = {
-                "Free": {},
-                "Professional": {
-                    "Application Deployment Automation": annual_labor_savings * 0.1,
-                    "Remote Troubleshooting": downtime_cost_saved * 0.2
-                },
-                "Enterprise": {
-                    "Application Deployment Automation": annual_labor_savings * 0.1,
-                    "Remote Troubleshooting": downtime_cost_saved * 0.2,
-                    "Self-Service Portal": devices * 5,
-                    "USB Device Management": devices * 2
-                },
-                "UEM": {
-                    "Application Deployment Automation": annual_labor_savings * 0.1,
-                    "Remote Troubleshooting": downtime_cost_saved * 0.2,
-                    "Self-Service Portal": devices * 5,
-                    "USB Device Management": devices * 2,
-                    "OS Deployment": devices * 10,
-                    "Mobile Device Management": devices * 8
-                },
-                "Security": {
-                    "Application Deployment Automation": annual_labor_savings * 0.1,
-                    "Remote Troubleshooting": downtime_cost_saved * 0.2,
-                    "Self-Service Portal": devices * 5,
-                    "USB Device Management": devices * 2,
-                    "OS Deployment": devices * 10,
-                    "Mobile Device Management": devices * 8,
-                    "Vulnerability Remediation": security_incidents_reduction_value * 0.3,
-                    "Endpoint Privilege Management": devices * 15,
-                    "Ransomware Protection": devices * 25
-                }
-            }
+            results = roi_memo.calculate_scenario(catalog=catalog, **calculation_inputs)
 
-            total_benefits = {
-                "Direct Labor Savings": annual_labor_savings,
-                "Compliance Reporting Savings": annual_compliance_savings,
-                "Bandwidth Cost Savings": bandwidth_savings_adjusted,
-                "Security Incident Reduction Value": security_incidents_reduction_value,
-                "Downtime Cost Savings": downtime_cost_saved
-            }
-
-            for feature, value in edition_specific_features.get(edition, {}).items():
-                if value > 0:
-                    total_benefits[f"{feature} ({edition} Edition)"] = value
-
-            edition_value_factors = {
-                "Free": 1.0,
-                "Professional": 1.05,
-                "Enterprise": 1.1,
-                "UEM": 1.15,
-                "Security": 1.25
-            }
-
-            adjusted_annual_savings = total_annual_savings * edition_value_factors[edition]
-
-            total_first_year_cost = license_cost + implementation_cost
-            subsequent_years_cost = license_cost
+            total_manual_hours = results["total_manual_hours"]
+            total_manual_cost = results["total_manual_cost"]
+            total_automated_hours = results["total_automated_hours"]
+            total_automated_cost = results["total_automated_cost"]
+            annual_labor_savings = results["annual_labor_savings"]
+            security_incidents_reduction_value = results["security_incidents_reduction_value"]
+            downtime_cost_saved = results["downtime_cost_saved"]
+            bandwidth_savings_adjusted = results["bandwidth_savings_adjusted"]
+            annual_compliance_savings = results["annual_compliance_savings"]
+            adjusted_annual_savings = results["adjusted_annual_savings"]
+            first_year_roi = results["first_year_roi"]
+            subsequent_roi = results["subsequent_roi"]
+            payback_months = results["payback_months"]
 
-            if total_first_year_cost > 0:
-                first_year_roi = ((adjusted_annual_savings - total_first_year_cost) / total_first_year_cost) * 100
-            else:
-                first_year_roi = float('inf')
-
-            if subsequent_years_cost > 0:
-                subsequent_roi = ((adjusted_annual_savings - subsequent_years_cost) / subsequent_years_cost) * 100
-            else:
-                subsequent_roi = float('inf')
-
-            if adjusted_annual_savings > total_first_year_cost and total_first_year_cost > 0:
-                payback_months = (total_first_year_cost / adjusted_annual_savings) * 12
-            else:
-                payback_months = float('inf')
+            edition_specific_features = {edition: results["edition_specific_features"]}
+            total_benefits = results["total_benefits"]
 
-            years = list(range(1, 6))
-            costs_manual = [total_manual_cost] * 5
-            costs_automated = [
-                total_automated_cost + (license_cost if i > 0 else (license_cost + implementation_cost))
-                for i in range(5)
-            ]
-            cumulative_savings = [0]
-            for i in range(5):
-                if i == 0:
-                    cumulative_savings.append(adjusted_annual_savings - total_first_year_cost)
-                else:
-                    cumulative_savings.append(
-                        cumulative_savings[-1] + adjusted_annual_savings - subsequent_years_cost)
-            cumulative_savings = cumulative_savings[1:]
+            years = list(range(1, projection_years + 1))
+            costs_manual = results["costs_manual"]
+            costs_automated = results["costs_automated"]
+            cumulative_savings = results["cumulative_savings"]
+            npv = results["npv"]
+            irr = results["irr"]
         except Exception as e:
             st.error(f"An error occurred in calculations: {str(e)}")
             st.error(traceback.format_exc())
+            # No results to export or save; the rest of the page shows zeros
+            results = None
             total_manual_hours = 0
             total_automated_hours = 0
             total_manual_cost = 0
             total_automated_cost = 0
+            annual_labor_savings = 0
             adjusted_annual_savings = 0
             first_year_roi = 0
             subsequent_roi = 0
             payback_months = 0
             total_benefits = {}
-            costs_manual = [0] * 5
-            costs_automated = [0] * 5
-            cumulative_savings = [0] * 5
+            years = list(range(1, projection_years + 1))
+            costs_manual = [0] * projection_years
+            costs_automated = [0] * projection_years
+            cumulative_savings = [0] * projection_years
+            npv = 0
+            irr = 0
             edition_specific_features = {edition: {}}
 
+    timings.lap("savings")
+
+    with st.expander("Uncertainty Analysis (Monte Carlo)"):
+        monte_carlo = None
+        monte_carlo_enabled = st.checkbox(
+            "Enable Monte Carlo simulation",
+            value=False,
+            help="Sample uncertain inputs from distributions and show percentile bands on the projection"
+        )
+        if monte_carlo_enabled:
+            mc_col1, mc_col2 = st.columns(2)
+            with mc_col1:
+                mc_samples = st.number_input("Number of Samples", min_value=1000, max_value=1000000, value=100000,
+                                             step=10000, help="Scenarios drawn in one batched evaluation")
+            with mc_col2:
+                mc_seed = st.number_input("Random Seed", min_value=0, value=42,
+                                          help="Fixed seed so the simulation is reproducible")
+            uncertain_inputs = [
+                ("automation_efficiency", "Automation Efficiency (%)", automation_efficiency, 1),
+                ("security_benefit", "Security Incident Reduction (%)", security_benefit, 1),
+                ("downtime_reduction", "Downtime Reduction (%)", downtime_reduction, 1),
+                ("hours_per_update", "Hours per Update", hours_per_update, 1),
+                ("incident_rate", "Annual Security Incident Rate (% of devices)",
+                 catalog.security_incident_rate * 100, 100)
+            ]
+            distributions = {}
+            # The ranges are keyed on the most likely value, so they start over
+            # from it when the input changes
+            for name, label, value, scale in uncertain_inputs:
+                st.markdown(f"**{label}** (most likely: {value:g})")
+                dist_col1, dist_col2, dist_col3 = st.columns(3)
+                with dist_col1:
+                    kind = st.selectbox("Distribution", roi_simulation.DISTRIBUTIONS, index=2,
+                                        key=f"mc_kind_{name}")
+                with dist_col2:
+                    low = st.number_input("Low", min_value=0.0, value=float(value) * 0.8, key=f"mc_low_{name}_{value:g}")
+                with dist_col3:
+                    high = st.number_input("High", min_value=0.0,
+                                           value=min(float(value) * 1.2, roi_simulation.UNCERTAIN_INPUTS[name][1] * scale),
+                                           key=f"mc_high_{name}_{value:g}")
+                distributions[name] = (kind, low / scale, high / scale)
+            try:
+                mc_inputs = dict(calculation_inputs, incident_rate=catalog.security_incident_rate)
+                monte_carlo = roi_memo.summarize_monte_carlo(mc_inputs, distributions,
+                                                             samples=int(mc_samples), seed=int(mc_seed),
+                                                             catalog=catalog)
+            except Exception as e:
+                st.error(f"Error running Monte Carlo simulation: {str(e)}")
+    timings.lap("monte_carlo")
+
 # ------------------ End of COL1 ------------------
 
 # ----------- COL2: Display charts, export options, and summary -------------
 with col2:
     st.markdown("<div class='section-header'>ROI Analysis Results</div>", unsafe_allow_html=True)
-    metric_col1, metric_col2, metric_col3 = st.columns(3)
+    metric_col1, metric_col2, metric_col3, metric_col4 = st.columns(4)
     with metric_col1:
         st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
         st.markdown(f"<div class='metric-value'>${adjusted_annual_savings:,.2f}</div>", unsafe_allow_html=True)
@@ -499,6 +557,16 @@ with col2:
             st.markdown(f"<div class='metric-value'>N/A</div>", unsafe_allow_html=True)
         st.markdown("<div class='metric-label'>Payback Period</div>", unsafe_allow_html=True)
         st.markdown("</div>", unsafe_allow_html=True)
+    with metric_col4:
+        st.markdown("<div class='metric-container'>", unsafe_allow_html=True)
+        if np.isfinite(irr):
+            st.markdown(f"<div class='metric-value'>{irr:.1f}%</div>", unsafe_allow_html=True)
+        elif irr == float('inf'):
+            st.markdown("<div class='metric-value'>∞</div>", unsafe_allow_html=True)
+        else:
+            st.markdown("<div class='metric-value'>Undefined</div>", unsafe_allow_html=True)
+        st.markdown(f"<div class='metric-label'>{projection_years}-Year IRR</div>", unsafe_allow_html=True)
+        st.markdown("</div>", unsafe_allow_html=True)
     if edition != "Free":
         st.markdown(f"### {edition} Edition Benefits")
         edition_features = list(edition_specific_features.get(edition, {}).keys())
@@ -507,278 +575,415 @@ with col2:
             st.markdown("Additional value from edition-specific features:")
             for value in feature_values:
                 st.markdown(f"- {value}")
-    st.markdown("### Time Savings Analysis")
-    hours_df = pd.DataFrame({
-        'Process': ['Manual Process', 'Endpoint Central'],
-        'Hours': [total_manual_hours, total_automated_hours]
-    })
-    fig_hours = px.bar(
-        hours_df,
-        x='Process',
-        y='Hours',
-        title='Annual Hours Comparison: Manual vs. Automated',
-        labels={'Hours': 'Hours per Year'},
-        color='Process',
-        color_discrete_map={'Manual Process': '#FF6B6B', 'Endpoint Central': '#4ECDC4'},
-        template='plotly_white' if theme == 'Light' else 'plotly_dark'
-    )
-    fig_hours.update_layout(
-        plot_bgcolor=plot_bg,
-        paper_bgcolor=plot_bg,
-        font_color=plot_color,
-        height=500
-    )
-    fig_hours.update_traces(
-        texttemplate='%{y:,.0f}',
-        textposition='outside'
-    )
-    st.plotly_chart(fig_hours, use_container_width=True)
-    st.markdown("### Cost Analysis")
-    cost_df = pd.DataFrame({
-        'Process': ['Manual Process', 'Endpoint Central'],
-        'Cost': [total_manual_cost, total_automated_cost + license_cost]
-    })
-    fig_cost = px.bar(
-        cost_df,
-        x='Process',
-        y='Cost',
-        title='Annual Cost Comparison: Manual vs. Automated',
-        labels={'Cost': 'Annual Cost ($)'},
-        color='Process',
-        color_discrete_map={'Manual Process': '#FF6B6B', 'Endpoint Central': '#4ECDC4'},
-        template='plotly_white' if theme == 'Light' else 'plotly_dark'
-    )
-    fig_cost.update_layout(
-        plot_bgcolor=plot_bg,
-        paper_bgcolor=plot_bg,
-        font_color=plot_color,
-        height=500
-    )
-    fig_cost.update_traces(
-        texttemplate='$%{y:,.0f}',
-        textposition='outside'
-    )
-    st.plotly_chart(fig_cost, use_container_width=True)
-    st.markdown("### 5-Year Projection")
-    projection_df = pd.DataFrame({
-        'Year': years,
-        'Manual Process': costs_manual,
-        'Endpoint Central': costs_automated,
-        'Cumulative Savings': cumulative_savings
-    })
-    fig_projection = go.Figure()
-    fig_projection.add_trace(go.Scatter(
-        x=projection_df['Year'],
-        y=projection_df['Manual Process'],
-        mode='lines+markers',
-        name='Manual Process',
-        line=dict(color='#FF6B6B', width=3),
-        marker=dict(size=8)
-    ))
-    fig_projection.add_trace(go.Scatter(
-        x=projection_df['Year'],
-        y=projection_df['Endpoint Central'],
-        mode='lines+markers',
-        name='Endpoint Central',
-        line=dict(color='#4ECDC4', width=3),
-        marker=dict(size=8)
-    ))
-    fig_projection.add_trace(go.Scatter(
-        x=projection_df['Year'],
-        y=projection_df['Cumulative Savings'],
-        mode='lines+markers',
-        name='Cumulative Savings',
-        line=dict(color='#5D9CEC', width=3, dash='dash'),
-        marker=dict(size=8)
-    ))
-    fig_projection.update_layout(
-        title='5-Year Cost and Savings Projection',
-        xaxis_title='Year',
-        yaxis_title='Cost/Savings ($)',
-        plot_bgcolor=plot_bg,
-        paper_bgcolor=plot_bg,
-        font_color=plot_color,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        template='plotly_white' if theme == 'Light' else 'plotly_dark',
-        height=500,
-        hovermode="x unified"
-    )
-    fig_projection.update_yaxes(tickprefix='$', tickformat=',')
-    st.plotly_chart(fig_projection, use_container_width=True)
-    st.markdown("### Total Benefits Breakdown")
-    benefits_df = pd.DataFrame({
-        'Benefit': list(total_benefits.keys()),
-        'Value': list(total_benefits.values())
-    }).sort_values('Value', ascending=False)
-    fig_benefits = px.bar(
-        benefits_df,
-        x='Benefit',
-        y='Value',
-        title='Breakdown of Annual Benefits',
-        labels={'Value': 'Annual Value ($)', 'Benefit': ''},
-        template='plotly_white' if theme == 'Light' else 'plotly_dark',
-        color='Value',
-        color_continuous_scale='Viridis'
-    )
-    fig_benefits.update_layout(
-        plot_bgcolor=plot_bg,
-        paper_bgcolor=plot_bg,
-        font_color=plot_color,
-        height=500,
-        xaxis_tickangle=-45
-    )
-    fig_benefits.update_traces(
-        texttemplate='$%{y:,.0f}',
-        textposition='outside'
-    )
-    st.plotly_chart(fig_benefits, use_container_width=True)
-    st.markdown("### Proportion of Benefits")
-    fig_pie = px.pie(
-        benefits_df,
-        values='Value',
-        names='Benefit',
-        title='Distribution of Total Benefits',
-        template='plotly_white' if theme == 'Light' else 'plotly_dark',
-        color_discrete_sequence=px.colors.sequential.Viridis,
-        hole=0.3
-    )
-    fig_pie.update_layout(
-        plot_bgcolor=plot_bg,
-        paper_bgcolor=plot_bg,
-        font_color=plot_color,
-        height=600
-    )
-    fig_pie.update_traces(
-        textinfo='percent+label',
-        textposition='inside',
-        insidetextorientation='radial'
-    )
-    st.plotly_chart(fig_pie, use_container_width=True)
-
-    # The following expanders are now siblings, not nested:
-    with st.expander("Detailed Comparison: Manual Process vs. Endpoint Central"):
-        edition_specific_comparisons = {
-            "Free": {
-                "Response Time to Critical Updates": "Days to weeks",
-                "Consistency in Deployment": "Limited consistency",
-                "Ability to Track Compliance": "Basic reporting",
-                "Remote Troubleshooting Capabilities": "Basic",
-                "Bandwidth Usage Optimization": "Minimal",
-                "Security Risk Exposure": "Somewhat reduced",
-                "Staff Focus on Strategic Projects": "Limited improvement"
-            },
-            "Professional": {
-                "Response Time to Critical Updates": "1-2 days",
-                "Consistency in Deployment": "Good consistency",
-                "Ability to Track Compliance": "Improved reporting",
-                "Remote Troubleshooting Capabilities": "Good",
-                "Bandwidth Usage Optimization": "Optimized",
-                "Security Risk Exposure": "Moderately reduced",
-                "Staff Focus on Strategic Projects": "Moderate improvement"
-            },
-            "Enterprise": {
-                "Response Time to Critical Updates": "Hours to a day",
-                "Consistency in Deployment": "Very consistent",
-                "Ability to Track Compliance": "Comprehensive reporting",
-                "Remote Troubleshooting Capabilities": "Advanced",
-                "Bandwidth Usage Optimization": "Highly optimized",
-                "Security Risk Exposure": "Significantly reduced",
-                "Staff Focus on Strategic Projects": "Significant improvement"
-            },
-            "UEM": {
-                "Response Time to Critical Updates": "Hours",
-                "Consistency in Deployment": "Highly consistent",
-                "Ability to Track Compliance": "Comprehensive cross-platform reporting",
-                "Remote Troubleshooting Capabilities": "Advanced cross-platform",
-                "Bandwidth Usage Optimization": "Highly optimized",
-                "Security Risk Exposure": "Greatly reduced",
-                "Staff Focus on Strategic Projects": "Major improvement"
-            },
-            "Security": {
-                "Response Time to Critical Updates": "Near real-time",
-                "Consistency in Deployment": "Maximum consistency",
-                "Ability to Track Compliance": "Enterprise-grade security reporting",
-                "Remote Troubleshooting Capabilities": "Advanced with security focus",
-                "Bandwidth Usage Optimization": "Maximum optimization",
-                "Security Risk Exposure": "Minimized",
-                "Staff Focus on Strategic Projects": "Maximum improvement"
-            }
-        }
-        comparison_data = {
-            "Metric": [
-                "Total Annual Hours Required",
-                "Annual Labor Cost",
-                "Response Time to Critical Updates",
-                "Consistency in Deployment",
-                "Ability to Track Compliance",
-                "Remote Troubleshooting Capabilities",
-                "Bandwidth Usage Optimization",
-                "Security Risk Exposure",
-                "Staff Focus on Strategic Projects"
-            ],
-            "Manual Process": [
-                f"{total_manual_hours:,.0f} hours",
-                f"${total_manual_cost:,.2f}",
-                "Days to weeks",
-                "Variable (human-dependent)",
-                "Limited (manual reporting)",
-                "Limited",
-                "Suboptimal",
-                "Higher",
-                "Limited (focus on maintenance)"
-            ],
-            "Endpoint Central": [
-                f"{total_automated_hours:,.0f} hours",
-                f"${total_automated_cost:,.2f}",
-                edition_specific_comparisons[edition]["Response Time to Critical Updates"],
-                edition_specific_comparisons[edition]["Consistency in Deployment"],
-                edition_specific_comparisons[edition]["Ability to Track Compliance"],
-                edition_specific_comparisons[edition]["Remote Troubleshooting Capabilities"],
-                edition_specific_comparisons[edition]["Bandwidth Usage Optimization"],
-                edition_specific_comparisons[edition]["Security Risk Exposure"],
-                edition_specific_comparisons[edition]["Staff Focus on Strategic Projects"]
-            ],
-            "Impact": [
-                f"{total_manual_hours - total_automated_hours:,.0f} hours saved",
-                f"${annual_labor_savings:,.2f} saved",
-                "Faster vulnerability mitigation",
-                "Improved reliability",
-                "Better audit readiness",
-                "Faster issue resolution",
-                "Reduced network congestion",
-                "Improved security posture",
-                "More innovation"
-            ]
-        }
-        comparison_df = pd.DataFrame(comparison_data)
-        fig_comparison = go.Figure(data=[
-            go.Table(
-                header=dict(
-                    values=list(comparison_df.columns),
-                    fill_color=theme_color,
-                    font=dict(color='white', size=14),
-                    align='center'
-                ),
-                cells=dict(
-                    values=[comparison_df[col] for col in comparison_df.columns],
-                    fill_color=[[plot_bg, card_bg] * len(comparison_df)],
-                    font=dict(color=plot_color, size=12),
-                    align=['left', 'center', 'center', 'center'],
-                    height=30
+    timings.lap("metrics")
+
+    @st.fragment
+    def show_edition_comparison():
+        # The edition comparison, rerun on its own when the expander or its checkbox changes
+        fragment_timings = timings.for_fragment("edition_comparison")
+        with st.expander("Compare All Editions", key="compare_editions_expander", on_change="rerun") as compare_expander:
+            if compare_expander.open:
+                use_edition_defaults = st.checkbox(
+                    "Use each edition's default benefit assumptions",
+                    value=True,
+                    help="When unchecked, every edition uses the security, compliance and downtime inputs entered above"
                 )
+                import pandas as pd
+
+                try:
+                    edition_comparison = roi_memo.compare_editions(calculation_inputs,
+                                                                   use_edition_defaults=use_edition_defaults,
+                                                                   reprice_license=not override_license,
+                                                                   catalog=catalog)
+                    comparison_editions = list(roi_engine.EDITIONS)
+                    edition_comparison_df = pd.DataFrame({
+                        'Edition': comparison_editions,
+                        'Annual License Cost': [f"${value:,.2f}" for value in edition_comparison["license_cost"]],
+                        'Annual Savings': [f"${value:,.2f}" for value in edition_comparison["adjusted_annual_savings"]],
+                        'First Year ROI': [f"{value:.1f}%" if np.isfinite(value) else "∞"
+                                           for value in edition_comparison["first_year_roi"]],
+                        'Payback Period': [f"{value:.1f} months" if np.isfinite(value) else "N/A"
+                                           for value in edition_comparison["payback_months"]],
+                        'IRR': [f"{value:.1f}%" if np.isfinite(value) else "∞" if value == np.inf else "Undefined"
+                                for value in edition_comparison["irr"]],
+                        f'{projection_years}-Year Cumulative Savings': [
+                            f"${value:,.2f}" for value in edition_comparison["cumulative_savings"][:, -1]]
+                    })
+                    st.dataframe(edition_comparison_df, hide_index=True, use_container_width=True)
+                    if devices > catalog.free_edition_device_limit:
+                        st.caption(f"The Free Edition is limited to {catalog.free_edition_device_limit} endpoints, "
+                                   "so its figures are indicative only for this deployment size.")
+                    fig_editions = roi_memo.figures["editions"](
+                        comparison_editions,
+                        edition_comparison["adjusted_annual_savings"],
+                        edition_comparison["first_year_roi"],
+                        edition_comparison["payback_months"],
+                        edition,
+                        theme
+                    )
+                    st.plotly_chart(fig_editions, use_container_width=True)
+                except Exception as e:
+                    st.error(f"Error comparing editions: {str(e)}")
+        fragment_timings.lap("edition_comparison")
+        fragment_timings.end_fragment(edition=edition, theme=theme)
+
+    show_edition_comparison()
+
+    def show_projection():
+        st.markdown(f"### {projection_years}-Year Projection")
+        projection_bands = {}
+        if monte_carlo is not None:
+            projection_bands = {
+                "savings_bands": monte_carlo["cumulative_savings_bands"],
+                "percentiles": monte_carlo["percentiles"]
+            }
+        fig_projection = roi_memo.figures["projection"](years, costs_manual, costs_automated, cumulative_savings, theme,
+                                                        **projection_bands)
+        st.plotly_chart(fig_projection, use_container_width=True)
+        st.caption(f"Net present value over {projection_years} years ({discount_rate:g}% discount rate): "
+                   f"${npv:,.2f} (undiscounted cumulative savings ${cumulative_savings[-1]:,.2f})")
+        if monte_carlo is not None:
+            st.markdown("### Payback Period Distribution")
+            fig_payback = roi_memo.figures["payback_histogram"](monte_carlo["payback_counts"],
+                                                                monte_carlo["payback_edges"],
+                                                                monte_carlo["samples"], theme)
+            st.plotly_chart(fig_payback, use_container_width=True)
+            low_pct, mid_pct, high_pct = monte_carlo["percentiles"]
+            st.caption(
+                f"Annual savings P{low_pct}/P{mid_pct}/P{high_pct}: "
+                + " / ".join(f"${value:,.0f}" for value in monte_carlo["annual_savings_bands"])
+                + f" | Payback P{low_pct}/P{mid_pct}/P{high_pct}: "
+                + " / ".join(f"{value:.1f}" if np.isfinite(value) else "N/A" for value in monte_carlo["payback_bands"])
+                + f" months | {monte_carlo['no_payback_share']:.1%} of scenarios do not pay back within the first year"
+                + f" (seed {monte_carlo['seed']})"
             )
-        ])
-        fig_comparison.update_layout(
-            margin=dict(l=0, r=0, t=0, b=0),
-            height=500
+
+    @st.fragment
+    def show_charts():
+        # The chart tabs, rerun on their own when another tab is selected
+        fragment_timings = timings.for_fragment("charts")
+        # Only the selected chart tab is built and sent to the browser
+        if compact_charts:
+            process_tab, projection_tab, benefits_tab = st.tabs(
+                ["Time & Cost", f"{projection_years}-Year Projection", "Benefits"],
+                key="compact_chart_tab",
+                on_change="rerun"
+            )
+            with process_tab:
+                if process_tab.open:
+                    st.markdown("### Time and Cost Analysis")
+                    fig_process = roi_memo.figures["process"](total_manual_hours, total_automated_hours,
+                                                              total_manual_cost, total_automated_cost + license_cost,
+                                                              theme)
+                    st.plotly_chart(fig_process, use_container_width=True)
+            fragment_timings.lap("chart_process")
+            with projection_tab:
+                if projection_tab.open:
+                    show_projection()
+            fragment_timings.lap("chart_projection")
+            with benefits_tab:
+                if benefits_tab.open:
+                    st.markdown("### Total Benefits Breakdown")
+                    fig_benefits = roi_memo.figures["benefits_overview"](total_benefits, theme)
+                    st.plotly_chart(fig_benefits, use_container_width=True)
+            fragment_timings.lap("chart_benefits")
+            fragment_timings.end_fragment(edition=edition, theme=theme)
+            return
+
+        hours_tab, cost_tab, projection_tab, benefits_tab, pie_tab = st.tabs(
+            ["Time Savings", "Cost Analysis", f"{projection_years}-Year Projection", "Benefits Breakdown",
+             "Proportion of Benefits"],
+            key="chart_tab",
+            on_change="rerun"
         )
-        st.plotly_chart(fig_comparison, use_container_width=True)
+        with hours_tab:
+            if hours_tab.open:
+                st.markdown("### Time Savings Analysis")
+                fig_hours = roi_memo.figures["hours"](total_manual_hours, total_automated_hours, theme)
+                st.plotly_chart(fig_hours, use_container_width=True)
+        fragment_timings.lap("chart_hours")
+        with cost_tab:
+            if cost_tab.open:
+                st.markdown("### Cost Analysis")
+                fig_cost = roi_memo.figures["cost"](total_manual_cost, total_automated_cost + license_cost, theme)
+                st.plotly_chart(fig_cost, use_container_width=True)
+        fragment_timings.lap("chart_cost")
+        with projection_tab:
+            if projection_tab.open:
+                show_projection()
+        fragment_timings.lap("chart_projection")
+        with benefits_tab:
+            if benefits_tab.open:
+                st.markdown("### Total Benefits Breakdown")
+                fig_benefits = roi_memo.figures["benefits"](total_benefits, theme)
+                st.plotly_chart(fig_benefits, use_container_width=True)
+        fragment_timings.lap("chart_benefits")
+        with pie_tab:
+            if pie_tab.open:
+                st.markdown("### Proportion of Benefits")
+                fig_pie = roi_memo.figures["pie"](total_benefits, theme)
+                st.plotly_chart(fig_pie, use_container_width=True)
+        fragment_timings.lap("chart_pie")
+        fragment_timings.end_fragment(edition=edition, theme=theme)
+
+    show_charts()
+
+    @st.fragment
+    def show_sensitivity():
+        # The tornado chart, rerun on its own when the expander or its settings change
+        fragment_timings = timings.for_fragment("sensitivity")
+        with st.expander("Sensitivity Analysis", key="sensitivity_expander", on_change="rerun") as sensitivity_expander:
+            if sensitivity_expander.open:
+                sens_col1, sens_col2 = st.columns(2)
+                with sens_col1:
+                    sensitivity_delta = st.slider("Perturbation (±%)", min_value=1, max_value=50, value=10,
+                                                  help="Each input is moved down and up by this percentage")
+                with sens_col2:
+                    sensitivity_metric = st.selectbox(
+                        "Ranked Metric",
+                        list(roi_simulation.SENSITIVITY_METRICS),
+                        format_func=lambda metric: roi_simulation.SENSITIVITY_METRICS[metric]
+                    )
+                try:
+                    sensitivity = roi_memo.run_sensitivity(calculation_inputs, delta_pct=sensitivity_delta,
+                                                           reprice_license=not override_license,
+                                                           catalog=catalog)
+                    tornado = sensitivity["metrics"][sensitivity_metric]
+                    if np.isfinite(tornado["base"]):
+                        order = tornado["order"][::-1]
+                        tornado_labels = [roi_simulation.SENSITIVITY_INPUTS[sensitivity["parameters"][i]] for i in order]
+                        # Infinite ROI/payback cannot be drawn as a bar, so those cases are left blank
+                        tornado_low = np.where(np.isfinite(tornado["low"]), tornado["low"] - tornado["base"], np.nan)[order]
+                        tornado_high = np.where(np.isfinite(tornado["high"]), tornado["high"] - tornado["base"], np.nan)[order]
+                        fig_tornado = roi_memo.figures["tornado"](tornado_labels, tornado_low, tornado_high, tornado["base"],
+                                                                  sensitivity_delta,
+                                                                  roi_simulation.SENSITIVITY_METRICS[sensitivity_metric], theme)
+                        st.plotly_chart(fig_tornado, use_container_width=True)
+                    else:
+                        st.info("The base case value is infinite, so there is no finite baseline to measure perturbations against.")
+                except Exception as e:
+                    st.error(f"Error running sensitivity analysis: {str(e)}")
+        fragment_timings.lap("sensitivity")
+        fragment_timings.end_fragment(edition=edition, theme=theme)
+
+    show_sensitivity()
+
+    def apply_goal_seek(parameter, value):
+        # Button callback: the current inputs with the solved value, loaded
+        # into the input widgets like a saved scenario
+        state = load_calculator_state(save_calculator_state())
+        state[parameter] = int(value) if roi_simulation.INPUT_RANGES[parameter][2] == 1 else value
+        apply_loaded_state(state)
+
+    @st.fragment
+    def show_goal_seek():
+        # The goal-seek solver, rerun on its own when the expander or its settings change
+        fragment_timings = timings.for_fragment("goal_seek")
+        with st.expander("Goal Seek", key="goal_seek_expander", on_change="rerun") as goal_seek_expander:
+            if goal_seek_expander.open:
+                st.markdown("Find the value of one input that reaches a payback or ROI target, "
+                            "with every other input as entered.")
+                seek_col1, seek_col2, seek_col3 = st.columns(3)
+                with seek_col1:
+                    seek_parameter = st.selectbox(
+                        "Input to Solve For",
+                        list(roi_simulation.INPUT_RANGES),
+                        format_func=lambda name: roi_simulation.SENSITIVITY_INPUTS[name],
+                        key="seek_parameter"
+                    )
+                with seek_col2:
+                    seek_metric = st.selectbox(
+                        "Target Metric",
+                        list(roi_simulation.TARGET_METRICS),
+                        format_func=lambda metric: roi_simulation.TARGET_METRICS[metric][0],
+                        key="seek_metric"
+                    )
+                with seek_col3:
+                    if seek_metric == "payback_months":
+                        seek_target = st.number_input("Pay Back Within (Months)", min_value=0.1, value=6.0,
+                                                      step=0.5, key="seek_target_payback")
+                    else:
+                        seek_target = st.number_input("Reach ROI of (%)", value=100.0, step=10.0,
+                                                      key="seek_target_roi")
+                try:
+                    seek = roi_memo.goal_seek(calculation_inputs, seek_parameter, seek_metric, seek_target,
+                                              reprice_license=not override_license, catalog=catalog)
+                    parameter_label = roi_simulation.SENSITIVITY_INPUTS[seek_parameter]
+                    low, high, step = roi_simulation.INPUT_RANGES[seek_parameter]
+                    value_format = "{:,.0f}" if step == 1 else "{:,.2f}"
+                    achieved = seek["achieved"]
+                    if not np.isfinite(achieved):
+                        achieved_text = "no payback" if seek_metric == "payback_months" else "an infinite ROI"
+                    elif seek_metric == "payback_months":
+                        achieved_text = f"a payback of {achieved:.1f} months"
+                    else:
+                        achieved_text = f"a first year ROI of {achieved:.1f}%"
+                    if seek["status"] == "found":
+                        if seek["met_at_current"]:
+                            st.success(f"The target is met at the current {parameter_label.lower()} of "
+                                       f"{value_format.format(seek['current'])}. The limit before it is missed is "
+                                       f"{value_format.format(seek['value'])}, which gives {achieved_text}.")
+                        else:
+                            st.success(f"{parameter_label}: {value_format.format(seek['value'])} "
+                                       f"(currently {value_format.format(seek['current'])}) gives {achieved_text}.")
+                        # An uploaded inventory overrides the inputs it sets, so a
+                        # solved value for one of them could not take effect
+                        from_inventory = (seek_parameter == "devices" and fleet is not None
+                                          or seek_parameter in ("applications", "updates_per_app")
+                                          and software is not None)
+                        if from_inventory:
+                            st.caption(f"The {parameter_label.lower()} comes from the uploaded inventory; remove "
+                                       "the inventory to use this value.")
+                        if st.button("Use This Value", on_click=apply_goal_seek, args=(seek_parameter, seek["value"]),
+                                     disabled=from_inventory):
+                            st.rerun()
+                    elif seek["status"] == "always":
+                        st.info(f"The target is met for any {parameter_label.lower()} from "
+                                f"{value_format.format(low)} to {value_format.format(high)}.")
+                    else:
+                        st.warning(f"No {parameter_label.lower()} from {value_format.format(low)} to "
+                                   f"{value_format.format(high)} reaches the target; the closest is "
+                                   f"{value_format.format(seek['value'])}, which gives {achieved_text}.")
+                    st.caption(f"Solved with {seek['evaluations']:,} scenarios in {seek['iterations']} batches")
+                except Exception as e:
+                    st.error(f"Error running goal seek: {str(e)}")
+        fragment_timings.lap("goal_seek")
+        fragment_timings.end_fragment(edition=edition, theme=theme)
+
+    show_goal_seek()
+
+    @st.fragment
+    def show_sweep():
+        # The two-input sweep heatmap, rerun on its own when the expander or its settings change
+        fragment_timings = timings.for_fragment("sweep")
+        with st.expander("Two-Input Sweep", key="sweep_expander", on_change="rerun") as sweep_expander:
+            if sweep_expander.open:
+                st.markdown("Map a metric over every combination of two inputs, "
+                            "with every other input as entered.")
+                sweep_inputs = list(roi_simulation.INPUT_RANGES)
+                sweep_ranges = []
+                sweep_col1, sweep_col2 = st.columns(2)
+                for column, axis, default in ((sweep_col1, "x", "devices"), (sweep_col2, "y", "automation_efficiency")):
+                    with column:
+                        parameter = st.selectbox(
+                            f"{axis.upper()} Axis Input",
+                            sweep_inputs,
+                            index=sweep_inputs.index(default),
+                            format_func=lambda name: roi_simulation.SENSITIVITY_INPUTS[name],
+                            key=f"sweep_{axis}"
+                        )
+                        low, high, step = roi_simulation.INPUT_RANGES[parameter]
+                        range_low, range_high = roi_simulation.sweep_range(parameter, calculation_inputs[parameter])
+                        number = int if step == 1 else float
+                        # Keyed on the input, so the range starts over when the input changes
+                        range_col1, range_col2 = st.columns(2)
+                        with range_col1:
+                            sweep_low = st.number_input("From", min_value=number(low), max_value=number(high),
+                                                        value=number(range_low), key=f"sweep_{axis}_low_{parameter}")
+                        with range_col2:
+                            sweep_high = st.number_input("To", min_value=number(low), max_value=number(high),
+                                                         value=number(range_high), key=f"sweep_{axis}_high_{parameter}")
+                        sweep_ranges.append((parameter, (sweep_low, sweep_high)))
+                sweep_col3, sweep_col4 = st.columns(2)
+                with sweep_col3:
+                    sweep_metric = st.selectbox(
+                        "Mapped Metric",
+                        list(roi_simulation.TARGET_METRICS),
+                        format_func=lambda metric: roi_simulation.TARGET_METRICS[metric][0],
+                        key="sweep_metric"
+                    )
+                with sweep_col4:
+                    sweep_points = st.select_slider("Grid Points per Input", options=[50, 100, 200, 500, 1000],
+                                                    value=200, key="sweep_points")
+                (x_parameter, x_range), (y_parameter, y_range) = sweep_ranges
+                if x_parameter == y_parameter:
+                    st.info("Choose two different inputs to sweep.")
+                else:
+                    try:
+                        sweep = roi_memo.run_sweep(calculation_inputs, x_parameter, x_range, y_parameter, y_range,
+                                                   sweep_metric, points=(sweep_points, sweep_points),
+                                                   reprice_license=not override_license, catalog=catalog)
+                        metric_label, target_kind = roi_simulation.TARGET_METRICS[sweep_metric]
+                        fig_sweep = roi_memo.figures["sweep"](
+                            sweep["x"], sweep["y"], sweep["values"],
+                            roi_simulation.SENSITIVITY_INPUTS[x_parameter],
+                            roi_simulation.SENSITIVITY_INPUTS[y_parameter],
+                            metric_label, target_kind == "max",
+                            sweep["x_breakpoints"], sweep["y_breakpoints"], theme
+                        )
+                        st.plotly_chart(fig_sweep, use_container_width=True)
+                        notes = [f"{sweep['values'].size:,} scenarios"]
+                        if len(sweep["x_breakpoints"]) or len(sweep["y_breakpoints"]):
+                            notes.append("dashed lines mark the device counts where a license pricing tier starts")
+                        if sweep_metric == "payback_months":
+                            notes.append("blank cells do not pay back within the first year")
+                        st.caption("; ".join(notes) + ".")
+                    except Exception as e:
+                        st.error(f"Error running sweep: {str(e)}")
+        fragment_timings.lap("sweep")
+        fragment_timings.end_fragment(edition=edition, theme=theme)
+
+    show_sweep()
+
+    @st.fragment
+    def show_detailed_comparison():
+        # The comparison table, rerun on its own when the expander is toggled
+        fragment_timings = timings.for_fragment("comparison_table")
+        # The following expanders are now siblings, not nested:
+        with st.expander("Detailed Comparison: Manual Process vs. Endpoint Central", key="comparison_expander", on_change="rerun") as comparison_expander:
+            if comparison_expander.open:
+                comparison_data = {
+                    "Metric": [
+                        "Total Annual Hours Required",
+                        "Annual Labor Cost",
+                        "Response Time to Critical Updates",
+                        "Consistency in Deployment",
+                        "Ability to Track Compliance",
+                        "Remote Troubleshooting Capabilities",
+                        "Bandwidth Usage Optimization",
+                        "Security Risk Exposure",
+                        "Staff Focus on Strategic Projects"
+                    ],
+                    "Manual Process": [
+                        f"{total_manual_hours:,.0f} hours",
+                        f"${total_manual_cost:,.2f}",
+                        "Days to weeks",
+                        "Variable (human-dependent)",
+                        "Limited (manual reporting)",
+                        "Limited",
+                        "Suboptimal",
+                        "Higher",
+                        "Limited (focus on maintenance)"
+                    ],
+                    "Endpoint Central": [
+                        f"{total_automated_hours:,.0f} hours",
+                        f"${total_automated_cost:,.2f}",
+                        roi_content.EDITION_COMPARISONS[edition]["Response Time to Critical Updates"],
+                        roi_content.EDITION_COMPARISONS[edition]["Consistency in Deployment"],
+                        roi_content.EDITION_COMPARISONS[edition]["Ability to Track Compliance"],
+                        roi_content.EDITION_COMPARISONS[edition]["Remote Troubleshooting Capabilities"],
+                        roi_content.EDITION_COMPARISONS[edition]["Bandwidth Usage Optimization"],
+                        roi_content.EDITION_COMPARISONS[edition]["Security Risk Exposure"],
+                        roi_content.EDITION_COMPARISONS[edition]["Staff Focus on Strategic Projects"]
+                    ],
+                    "Impact": [
+                        f"{total_manual_hours - total_automated_hours:,.0f} hours saved",
+                        f"${annual_labor_savings:,.2f} saved",
+                        "Faster vulnerability mitigation",
+                        "Improved reliability",
+                        "Better audit readiness",
+                        "Faster issue resolution",
+                        "Reduced network congestion",
+                        "Improved security posture",
+                        "More innovation"
+                    ]
+                }
+                fig_comparison = roi_memo.figures["comparison"](comparison_data, theme)
+                st.plotly_chart(fig_comparison, use_container_width=True)
+        fragment_timings.lap("comparison_table")
+        fragment_timings.end_fragment(edition=edition, theme=theme)
+
+    show_detailed_comparison()
 
     with st.expander("Strategic Recommendations"):
         if edition == "Free":
@@ -826,185 +1031,104 @@ with col2:
             4. **Regulatory Compliance**: Enhanced security controls and reporting help meet stringent compliance requirements.
             5. **Maximum Protection**: A complete solution that addresses both management efficiency and security requirements.
             """)
-    with st.expander("Export Your Results"):
-        def generate_csv_report():
+    timings.lap("recommendations")
+
+    def remove_portfolio_archive(path):
+        if path:
             try:
-                buffer = io.BytesIO()
-                data = {
-                    'Metric': [
-                        'Number of Devices', 'Number of Applications', 'Updates per Application',
-                        'Hours per Update (Manual)', 'Technician Hourly Rate', 'Selected Edition',
-                        'Automation Efficiency', 'Annual License Cost', 'Implementation Cost',
-                        'Total Manual Hours', 'Total Automated Hours', 'Hours Saved',
-                        'Total Manual Cost', 'Total Automated Cost', 'Direct Labor Savings',
-                        'Compliance Reporting Savings', 'Bandwidth Cost Savings',
-                        'Security Incident Reduction Value', 'Downtime Cost Savings',
-                        'Total Annual Savings', 'First Year ROI', 'Subsequent Years ROI',
-                        'Payback Period (Months)'
-                    ],
-                    'Value': [
-                        devices, applications, updates_per_app,
-                        hours_per_update, hourly_rate, edition,
-                        f"{automation_efficiency}%", f"${license_cost:,.2f}",
-                        f"${implementation_cost:,.2f}",
-                        f"{total_manual_hours:,.2f}", f"{total_automated_hours:,.2f}",
-                        f"{total_manual_hours - total_automated_hours:,.2f}",
-                        f"${total_manual_cost:,.2f}", f"${total_automated_cost:,.2f}",
-                        f"${annual_labor_savings:,.2f}",
-                        f"${annual_compliance_savings:,.2f}", f"${bandwidth_savings_adjusted:,.2f}",
-                        f"${security_incidents_reduction_value:,.2f}",
-                        f"${downtime_cost_saved:,.2f}",
-                        f"${adjusted_annual_savings:,.2f}",
-                        f"{first_year_roi:.2f}%" if first_year_roi != float('inf') else "∞",
-                        f"{subsequent_roi:.2f}%" if subsequent_roi != float('inf') else "∞",
-                        f"{payback_months:.2f}" if payback_months != float('inf') else "N/A"
-                    ]
-                }
-                if edition != "Free" and len(edition_specific_features[edition]) > 0:
-                    for feature, value in edition_specific_features[edition].items():
-                        data['Metric'].append(f"{feature} Value")
-                        data['Value'].append(f"${value:,.2f}")
-                df = pd.DataFrame(data)
-                df.to_csv(buffer, index=False)
-                return buffer
-            except Exception as e:
-                st.error(f"Error generating CSV: {str(e)}")
-                return None
-        export_col1, export_col2 = st.columns(2)
-        with export_col1:
-            csv_buffer = generate_csv_report()
-            if csv_buffer:
-                csv_data = csv_buffer.getvalue()
-                b64_csv = base64.b64encode(csv_data).decode()
-                href_csv = f'<a href="data:file/csv;base64,{b64_csv}" download="maxar_endpoint_central_roi_{edition.lower()}_edition.csv" class="btn" style="text-decoration:none; background-color:{theme_color}; color:white; padding:10px 15px; border-radius:5px; display:inline-block; text-align:center;">Download Results as CSV</a>'
-                st.markdown(href_csv, unsafe_allow_html=True)
-        with export_col2:
-            if st.button("Generate PDF Report", key="pdf_button"):
-                with st.spinner("Generating PDF report..."):
-                    def generate_pdf_report():
-                        try:
-                            pdf = FPDF()
-                            pdf.add_page()
-                            pdf.set_font("Arial", "B", 16)
-                            pdf.cell(0, 10, "Endpoint Central ROI Calculator", ln=True, align="C")
-                            pdf.set_font("Arial", "", 12)
-                            pdf.cell(0, 10, f"Report for {edition} Edition", ln=True, align="C")
-                            pdf.line(10, 30, 200, 30)
-                            pdf.ln(10)
-                            pdf.set_font("Arial", "B", 14)
-                            pdf.cell(0, 10, "Input Parameters", ln=True)
-                            pdf.set_font("Arial", "", 10)
-                            params = [
-                                ["Number of Devices", f"{devices}"],
-                                ["Number of Applications", f"{applications}"],
-                                ["Updates per Application", f"{updates_per_app}"],
-                                ["Hours per Update (Manual)", f"{hours_per_update}"],
-                                ["Technician Hourly Rate", f"${hourly_rate}"],
-                                ["Automation Efficiency", f"{automation_efficiency}%"],
-                                ["Annual License Cost", f"${license_cost:,.2f}"],
-                                ["Implementation Cost", f"${implementation_cost:,.2f}"]
-                            ]
-                            for param in params:
-                                pdf.cell(90, 7, param[0], border=1)
-                                pdf.cell(90, 7, param[1], border=1, ln=True)
-                            pdf.ln(10)
-                            pdf.set_font("Arial", "B", 14)
-                            pdf.cell(0, 10, "Key Results", ln=True)
-                            pdf.set_font("Arial", "", 10)
-                            results = [
-                                ["Annual Savings", f"${adjusted_annual_savings:,.2f}"],
-                                ["First Year ROI", f"{first_year_roi:.1f}%" if first_year_roi != float('inf') else "∞"],
-                                ["Subsequent Years ROI", f"{subsequent_roi:.1f}%" if subsequent_roi != float('inf') else "∞"],
-                                ["Payback Period", f"{payback_months:.1f} months" if payback_months != float('inf') else "N/A"]
-                            ]
-                            for result in results:
-                                pdf.cell(90, 7, result[0], border=1)
-                                pdf.cell(90, 7, result[1], border=1, ln=True)
-                            pdf.ln(10)
-                            pdf.set_font("Arial", "B", 14)
-                            pdf.cell(0, 10, "Time and Cost Comparison", ln=True)
-                            pdf.set_font("Arial", "", 10)
-                            comparisons = [
-                                ["Total Manual Hours", f"{total_manual_hours:,.0f} hours"],
-                                ["Total Automated Hours", f"{total_automated_hours:,.0f} hours"],
-                                ["Hours Saved", f"{total_manual_hours - total_automated_hours:,.0f} hours"],
-                                ["Manual Process Cost", f"${total_manual_cost:,.2f}"],
-                                ["Automated Process Cost", f"${total_automated_cost:,.2f}"],
-                                ["Direct Labor Savings", f"${annual_labor_savings:,.2f}"]
-                            ]
-                            for comp in comparisons:
-                                pdf.cell(90, 7, comp[0], border=1)
-                                pdf.cell(90, 7, comp[1], border=1, ln=True)
-                            pdf.ln(10)
-                            pdf.set_font("Arial", "B", 14)
-                            pdf.cell(0, 10, "Benefits Breakdown", ln=True)
-                            pdf.set_font("Arial", "", 10)
-                            for benefit, value in total_benefits.items():
-                                pdf.cell(120, 7, benefit, border=1)
-                                pdf.cell(60, 7, f"${value:,.2f}", border=1, ln=True)
-                            pdf.ln(10)
-                            if edition != "Free" and len(edition_specific_features[edition]) > 0:
-                                pdf.set_font("Arial", "B", 14)
-                                pdf.cell(0, 10, f"{edition} Edition Specific Features", ln=True)
-                                pdf.set_font("Arial", "", 10)
-                                for feature, value in edition_specific_features[edition].items():
-                                    pdf.cell(120, 7, feature, border=1)
-                                    pdf.cell(60, 7, f"${value:,.2f}", border=1, ln=True)
-                            pdf.ln(10)
-                            pdf.set_font("Arial", "B", 14)
-                            pdf.cell(0, 10, "5-Year Projection Summary", ln=True)
-                            pdf.set_font("Arial", "", 10)
-                            pdf.cell(40, 7, "Year", border=1)
-                            pdf.cell(50, 7, "Manual Cost", border=1)
-                            pdf.cell(50, 7, "Automated Cost", border=1)
-                            pdf.cell(50, 7, "Cumulative Savings", border=1, ln=True)
-                            for i in range(5):
-                                pdf.cell(40, 7, f"Year {i + 1}", border=1)
-                                pdf.cell(50, 7, f"${costs_manual[i]:,.2f}", border=1)
-                                pdf.cell(50, 7, f"${costs_automated[i]:,.2f}", border=1)
-                                pdf.cell(50, 7, f"${cumulative_savings[i]:,.2f}", border=1, ln=True)
-                            pdf.ln(10)
-                            pdf.set_font("Arial", "B", 14)
-                            pdf.cell(0, 10, "Conclusion", ln=True)
-                            pdf.set_font("Arial", "", 10)
-                            if edition == "Free":
-                                conclusion = "The Free Edition provides basic endpoint management capabilities suitable for small environments up to 50 devices."
-                            elif edition == "Professional":
-                                conclusion = "The Professional Edition offers strong ROI for LAN environments with significant automation benefits."
-                            elif edition == "Enterprise":
-                                conclusion = "The Enterprise Edition provides enhanced value for multi-location environments with centralized management needs."
-                            elif edition == "UEM":
-                                conclusion = "The UEM Edition delivers comprehensive device management across all platforms with advanced deployment capabilities."
-                            else:
-                                conclusion = "The Security Edition offers maximum protection and management capabilities, ideal for security-conscious organizations."
-                            pdf.multi_cell(0, 7, conclusion)
-                            pdf.ln(10)
-                            pdf.set_font("Arial", "I", 8)
-                            pdf.cell(0, 10, "© 2025 ManageEngine | This report is for informational purposes only.",
-                                     ln=True, align="C")
-                            pdf.cell(0, 10,
-                                     "Contact our technicians for a detailed assessment tailored to your specific environment.",
-                                     ln=True, align="C")
-                            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-                                pdf_path = tmp.name
-                                pdf.output(pdf_path)
-                            return pdf_path
-                        except Exception as e:
-                            st.error(f"Failed to generate PDF: {str(e)}")
-                            return None
-                    pdf_path = generate_pdf_report()
-                    if pdf_path:
-                        with open(pdf_path, "rb") as pdf_file:
-                            pdf_bytes = pdf_file.read()
-                        b64_pdf = base64.b64encode(pdf_bytes).decode()
-                        href_pdf = f'<a href="data:application/pdf;base64,{b64_pdf}" download="maxar_endpoint_central_roi_{edition.lower()}_edition.pdf" class="btn" style="text-decoration:none; background-color:{theme_color}; color:white; padding:10px 15px; border-radius:5px; display:inline-block; text-align:center;">Download PDF Report</a>'
-                        st.markdown(href_pdf, unsafe_allow_html=True)
-                        try:
-                            os.unlink(pdf_path)
-                        except:
-                            pass
-                    else:
-                        st.error("Failed to generate PDF report. Please try again.")
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def read_portfolio_archive(path):
+        # Download callable of a built report archive
+        with open(path, "rb") as f:
+            data = f.read()
+        remove_portfolio_archive(path)
+        return data
+
+    @st.fragment
+    def show_exports():
+        # The export panels, rerun on their own when the portfolio upload or its settings change
+        fragment_timings = timings.for_fragment("exports")
+        with st.expander("Export Your Results"):
+            # Reports are built in memory only when a download button is clicked
+            # and are served from Streamlit's media endpoint
+            if results is None:
+                st.info("Fix the calculation error above to export the results.")
+            else:
+                report_row = dict(results, **calculation_inputs)
+                export_col1, export_col2 = st.columns(2)
+                with export_col1:
+                    st.download_button(
+                        "Download Results as CSV",
+                        data=functools.partial(roi_reports.csv_report, report_row),
+                        file_name=f"maxar_endpoint_central_roi_{edition.lower()}_edition.csv",
+                        mime="text/csv",
+                        on_click="ignore",
+                        key="csv_download"
+                    )
+                with export_col2:
+                    st.download_button(
+                        "Download PDF Report",
+                        data=functools.partial(roi_reports.pdf_report, report_row),
+                        file_name=f"maxar_endpoint_central_roi_{edition.lower()}_edition.pdf",
+                        mime="application/pdf",
+                        on_click="ignore",
+                        key="pdf_download"
+                    )
+        fragment_timings.lap("exports")
+        with st.expander("Bulk Portfolio Export"):
+            st.markdown("Upload a CSV with one prospect per row to get a zip archive with a report for each of them. "
+                        "Rows use the fields saved by the calculator; a first extra column such as a customer name "
+                        "is used to name the reports.")
+            portfolio_file = st.file_uploader("Scenario CSV", type="csv", key="portfolio_file")
+            portfolio_formats = st.multiselect("Reports per Scenario", ["PDF", "CSV"], default=["PDF"])
+            if st.button("Build Report Archive", disabled=portfolio_file is None or not portfolio_formats):
+                portfolio_rows = max(portfolio_file.getvalue().count(b"\n") - 1, 1)
+                progress_bar = st.progress(0.0, text="Rendering reports...")
+
+                def show_progress(rows, elapsed):
+                    progress_bar.progress(min(rows / portfolio_rows, 1.0),
+                                          text=f"Rendered reports for {rows:,} of {portfolio_rows:,} scenarios "
+                                               f"({rows / max(elapsed, 1e-9) * 60:,.0f} per minute)")
+
+                import roi_batch
+
+                # The archive is written to a temporary file and only its path
+                # is kept in the session; the reports themselves are rendered
+                # on a small worker pool chunk by chunk. An archive that is
+                # never downloaded goes with the server process's archive
+                # directory, see roi_batch.archive_path.
+                remove_portfolio_archive(st.session_state.pop("portfolio_archive", None))
+                archive = roi_batch.archive_path()
+                try:
+                    portfolio_file.seek(0)
+                    scenario_count = roi_batch.export_reports(portfolio_file, archive,
+                                                              formats=[fmt.lower() for fmt in portfolio_formats],
+                                                              years=projection_years, progress=show_progress,
+                                                              workers=roi_batch.INTERACTIVE_REPORT_WORKERS)
+                    st.session_state["portfolio_archive"] = archive
+                    st.success(f"Built reports for {scenario_count:,} scenarios "
+                               f"({os.path.getsize(archive) / 1e6:,.1f} MB archive)")
+                except ValueError as e:
+                    remove_portfolio_archive(archive)
+                    st.error(f"Error building reports: {str(e)}")
+            if os.path.exists(st.session_state.get("portfolio_archive") or ""):
+                # The archive is read from its file when the button is clicked
+                # and removed once read; the click forgets its path
+                st.download_button(
+                    "Download Report Archive",
+                    data=functools.partial(read_portfolio_archive, st.session_state["portfolio_archive"]),
+                    file_name="endpoint_central_roi_reports.zip",
+                    mime="application/zip",
+                    on_click=lambda: st.session_state.pop("portfolio_archive", None),
+                    key="portfolio_download"
+                )
+        fragment_timings.lap("portfolio_export")
+        fragment_timings.end_fragment(edition=edition, theme=theme)
+
+    show_exports()
     st.markdown("---")
     st.markdown(f"""
     <div style="text-align: center; color: {text_color};">
@@ -1014,39 +1138,132 @@ with col2:
     </div>
     """, unsafe_allow_html=True)
 
-    def handle_calculation_error(func):
-        def wrapper(*args, **kwargs):
+# Saved scenarios in the sidebar: save the current inputs and results under a
+# customer name, then search, review and reload them
+def load_saved_scenario(scenario_id):
+    # Button callback, so the loaded inputs are in place before the widgets
+    # are drawn on the next rerun
+    stored = roi_store.load_scenario(scenario_id)
+    if stored is not None:
+        apply_loaded_state(load_calculator_state(stored[0]))
+
+
+@st.fragment
+def show_scenario_store():
+    # Reruns on its own while searching; loading a scenario reruns the page
+    fragment_timings = timings.for_fragment("scenario_store")
+    with st.expander("Saved Scenarios", key="store_expander", on_change="rerun") as store_expander:
+        if store_expander.open:
+            customer = st.text_input("Customer", key="store_customer",
+                                     help="Customer or prospect the current scenario is saved for")
+            if results is None:
+                st.caption("The current scenario has a calculation error and cannot be saved.")
+            if st.button("Save Current Scenario", disabled=not customer.strip() or results is None):
+                try:
+                    roi_store.save_scenario(customer, save_calculator_state(), results, catalog.version)
+                    st.success(f"Saved the {edition} scenario for {customer.strip()}")
+                except (sqlite3.Error, ValueError) as e:
+                    st.error(f"Error saving scenario: {str(e)}")
+
+            st.markdown("**Find Saved Scenarios**")
+            search_customer = st.text_input("Customer Name Starts With", key="store_search")
+            search_edition = st.selectbox("Edition", ["All"] + list(roi_engine.EDITIONS), key="store_edition")
+            saved_dates = st.date_input("Saved Between", value=(), key="store_dates")
             try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                st.error(f"Calculation error: {str(e)}")
-                st.error(traceback.format_exc())
-                return None
-        return wrapper
-
-    @handle_calculation_error
-    def save_calculator_state():
-        state = {
-            "devices": devices,
-            "applications": applications,
-            "updates_per_app": updates_per_app,
-            "hours_per_update": hours_per_update,
-            "hourly_rate": hourly_rate,
-            "automation_efficiency": automation_efficiency,
-            "edition": edition,
-            "implementation_cost": implementation_cost,
-            "security_benefit": security_benefit,
-            "compliance_time_saved": compliance_time_saved,
-            "downtime_reduction": downtime_reduction,
-            "bandwidth_savings": bandwidth_savings,
-            "theme": theme
-        }
-        return json.dumps(state)
+                saved = roi_store.list_scenarios(
+                    customer=search_customer,
+                    edition=None if search_edition == "All" else search_edition,
+                    saved_from=saved_dates[0] if len(saved_dates) > 0 else None,
+                    saved_to=saved_dates[-1] if len(saved_dates) > 1 else None
+                )
+            except sqlite3.Error as e:
+                st.error(f"Error reading saved scenarios: {str(e)}")
+                saved = []
+            if not saved:
+                st.caption("No saved scenarios match.")
+            else:
+                import pandas as pd
 
-    @handle_calculation_error
-    def load_calculator_state(state_json):
-        try:
-            state = json.loads(state_json)
-            return state
-        except:
-            return None
+                saved_df = pd.DataFrame(saved, columns=roi_store.SUMMARY_COLUMNS)
+                selection = st.dataframe(
+                    saved_df[["customer", "edition", "saved_at", "annual_savings"]],
+                    hide_index=True,
+                    use_container_width=True,
+                    on_select="rerun",
+                    selection_mode="single-row",
+                    key="store_list",
+                    column_config={
+                        "customer": "Customer",
+                        "edition": "Edition",
+                        "saved_at": "Saved (UTC)",
+                        "annual_savings": st.column_config.NumberColumn("Annual Savings", format="$%.0f")
+                    }
+                )
+                st.caption(f"Latest {len(saved)} matches" if len(saved) == roi_store.LIST_LIMIT
+                           else f"{len(saved)} matches")
+                if selection.selection.rows:
+                    selected = saved_df.iloc[selection.selection.rows[0]]
+                    stored = roi_store.load_scenario(int(selected["id"]))
+                    if stored is not None:
+                        # Results as they were saved, under the catalog of that time
+                        stored_row = dict(stored[1], **load_calculator_state(stored[0]))
+                        first_year_roi, payback_months = stored_row["first_year_roi"], stored_row["payback_months"]
+                        st.markdown(f"""
+                        **{selected['customer']}**, {stored_row['edition']} Edition, {stored_row['devices']:,} devices
+                        - Annual Savings: ${stored_row['adjusted_annual_savings']:,.2f}
+                        - First Year ROI: {f"{first_year_roi:.1f}%" if first_year_roi != float('inf') else "∞"}
+                        - Payback Period: {f"{payback_months:.1f} months" if payback_months != float('inf') else "N/A"}
+                        - {stored_row['years']}-Year NPV: ${stored_row['npv']:,.2f}
+                        """)
+                        st.caption(f"Pricing catalog {selected['catalog_version']}")
+                        st.download_button(
+                            "Download Saved Report (PDF)",
+                            data=functools.partial(roi_reports.pdf_report, stored_row),
+                            file_name=f"endpoint_central_roi_{stored_row['edition'].lower()}_scenario_{selected['id']}.pdf",
+                            mime="application/pdf",
+                            on_click="ignore",
+                            key="store_pdf_download"
+                        )
+                        if st.button("Load into Calculator", on_click=load_saved_scenario, args=(int(selected["id"]),)):
+                            st.rerun()
+    fragment_timings.lap("scenario_store")
+    fragment_timings.end_fragment(edition=edition, theme=theme)
+
+
+with st.sidebar:
+    show_scenario_store()
+
+# Rerun timings, when requested, in the sidebar and as a log line. Later
+# reruns of a single fragment only log their own timings.
+timings.lap("footer")
+timings.finish(edition=edition, theme=theme)
+if timings.enabled:
+    import pandas as pd
+
+    with st.sidebar:
+        with st.expander("Rerun Timings", expanded=True):
+            st.dataframe(
+                pd.DataFrame(timings.rows(), columns=["Section", "Time (ms)", "Share", "Sent (KB)"]),
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "Time (ms)": st.column_config.NumberColumn(format="%.1f"),
+                    "Share": st.column_config.NumberColumn(format="percent"),
+                    "Sent (KB)": st.column_config.NumberColumn(format="%.1f")
+                }
+            )
+            sent_bytes = timings.total_sent()
+            st.caption(f"Total: {timings.total() * 1000:,.1f} ms and "
+                       + (f"{sent_bytes / 1024:,.1f} KB sent to the browser" if sent_bytes is not None
+                          else "bytes sent to the browser unavailable")
+                       + " for this rerun")
+            try:
+                cache_stats = roi_result_cache.stats()
+                st.caption(f"Shared result cache: {cache_stats['entries']:,} results, "
+                           f"{cache_stats['hit_rate']:.0%} hit rate ({cache_stats['hits']:,} hits, "
+                           f"{cache_stats['coalesced']:,} coalesced, {cache_stats['misses']:,} misses) "
+                           f"over all server processes, counting only scenarios not already in a "
+                           f"process's memory; {cache_stats['memory_hits']:,} scenarios served from "
+                           f"this process's memory")
+            except sqlite3.Error:
+                st.caption("Shared result cache unavailable")
@@ -0,0 +1,367 @@
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+import urllib.parse
+
+import numpy as np
+
+import roi_batch
+import roi_catalog
+import roi_engine
+import roi_reports
+
+# Local HTTP JSON API over the ROI engine, for tools that need ROI numbers
+# without the Streamlit interface. Scenarios use the fields of a roi_batch.py
+# input row (optional fields take the calculator's defaults and the license is
+# priced from the active catalog) and are scored with the same engine and
+# catalog as roi-tool.py.
+#
+#     POST /v1/scenario    one scenario object           -> {"catalog_version", "result"}
+#     POST /v1/scenarios   {"scenarios": [objects, ...]} -> {"catalog_version", "results"}
+#     GET  /v1/pricing?devices=3000                      -> annual license cost per edition
+#     GET  /v1/health                                    -> catalog version and batching counters
+#
+# Concurrent single-scenario requests are coalesced: the first request to
+# arrive opens a batch window of BATCH_WINDOW seconds, every request arriving
+# inside it joins the batch, and the batch is scored with one vectorized engine
+# call when the window closes or MAX_BATCH_SIZE scenarios are waiting. The
+# server is a single asyncio event loop on the standard library's streams,
+# speaking HTTP/1.1 with keep-alive; scoring runs on the loop itself, since a
+# batch takes about as long as handing it to a thread would.
+#
+#     python roi_api.py --port 8502
+#     python benchmarks/load_api.py --port 8502 --connections 64 --duration 10
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8502
+BATCH_WINDOW = 0.002
+MAX_BATCH_SIZE = 512
+
+# Limits on a request: header bytes, body bytes and scenarios per batch request
+MAX_HEADER_BYTES = 16 * 1024
+MAX_BODY_BYTES = 8 * 1024 * 1024
+MAX_BATCH_SCENARIOS = 10_000
+
+# Scenario fields in engine input order; roi_batch.OPTIONAL_COLUMNS may be
+# left out or null. A saved calculator state can be posted as is: its theme is
+# ignored, and with override_license false the license cost is repriced.
+INPUT_FIELDS = roi_batch.SCENARIO_COLUMNS + ("license_cost",)
+NUMERIC_FIELDS = tuple(name for name in INPUT_FIELDS if name != "edition")
+IGNORED_FIELDS = ("theme", "override_license")
+
+# Calculated report metrics returned after the inputs; infinite or undefined
+# values (a payback that is never reached, the ROI of a free scenario) are null,
+# and irr_status tells an undefined IRR from an infinite one
+OUTPUT_FIELDS = tuple(key for _, key, _, _ in roi_reports.REPORT_METRICS
+                      if key not in INPUT_FIELDS and key != "hours_saved")
+RESULT_FIELDS = ("edition",) + NUMERIC_FIELDS + OUTPUT_FIELDS
+
+ROUTES = {"/v1/scenario": "POST", "/v1/scenarios": "POST", "/v1/pricing": "GET", "/v1/health": "GET"}
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error",
+           501: "Not Implemented"}
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not a valid number")
+
+
+def parse_json(body):
+    try:
+        return json.loads(body, parse_constant=_reject_constant)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise ApiError(400, f"request body is not valid JSON: {e}")
+
+
+def parse_scenario(document, where="scenario"):
+    # (edition code, numeric inputs in NUMERIC_FIELDS order with NaN for the
+    # optional fields left out) for a scenario object
+    if not isinstance(document, dict):
+        raise ApiError(400, f"{where} must be a JSON object")
+    unknown = [name for name in document if name not in INPUT_FIELDS and name not in IGNORED_FIELDS]
+    if unknown:
+        raise ApiError(400, f"{where} has unknown fields: {', '.join(unknown)}")
+    edition = document.get("edition")
+    if edition not in roi_engine.EDITION_INDEX:
+        raise ApiError(400, f"{where}.edition must be one of {', '.join(roi_engine.EDITIONS)}")
+    values = []
+    for name in NUMERIC_FIELDS:
+        value = document.get(name)
+        if name == "license_cost" and document.get("override_license") is False:
+            value = None
+        if value is None:
+            if name not in roi_batch.OPTIONAL_COLUMNS:
+                raise ApiError(400, f"{where}.{name} is required")
+            value = math.nan
+        elif isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise ApiError(400, f"{where}.{name} must be a number")
+        elif not abs(value) < math.inf:
+            raise ApiError(400, f"{where}.{name} must be a finite number")
+        values.append(value)
+    years = values[NUMERIC_FIELDS.index("years")]
+    if not math.isnan(years) and (years < 1 or years % 1 != 0):
+        raise ApiError(400, f"{where}.years must be a whole number of at least 1")
+    for name in roi_batch.MIX_COLUMNS:
+        if values[NUMERIC_FIELDS.index(name)] < 0:
+            raise ApiError(400, f"{where}.{name} must be at least 0")
+    return roi_engine.EDITION_INDEX[edition], values
+
+
+def _plain(values):
+    # JSON-ready list of input values, without a trailing .0 on whole numbers
+    return [int(value) if value.is_integer() else value for value in values.tolist()]
+
+
+def _finite(values):
+    # JSON-ready list of output values, with null for infinite or NaN values
+    plain = values.tolist()
+    if values.dtype.kind not in "fiu":
+        return plain
+    if not np.isfinite(values).all():
+        plain = [value if math.isfinite(value) else None for value in plain]
+    return plain
+
+
+def score_scenarios(parsed, catalog):
+    # Result objects for parsed scenarios, in order, from one engine call per
+    # projection horizon
+    codes = np.fromiter((code for code, _ in parsed), dtype=np.intp, count=len(parsed))
+    values = np.array([row for _, row in parsed], dtype=float).reshape(len(parsed), len(NUMERIC_FIELDS))
+    inputs = {"edition": codes}
+    inputs.update((name, values[:, i]) for i, name in enumerate(NUMERIC_FIELDS))
+    roi_batch.fill_defaults(inputs, catalog=catalog)
+    results = [None] * len(parsed)
+    feature_names = [name for name, _, _ in catalog.edition_features]
+    for positions, batch in roi_batch.horizon_groups(inputs):
+        scored = roi_engine.calculate_roi(catalog=catalog, **batch)
+        scored["irr_status"] = roi_engine.irr_status(scored["irr"])
+        rows = len(positions)
+        columns = [np.asarray(roi_engine.EDITIONS)[batch["edition"]].tolist()]
+        columns += [_plain(np.broadcast_to(np.asarray(batch[name], dtype=float), rows)) for name in NUMERIC_FIELDS]
+        columns += [_finite(scored[key]) for key in OUTPUT_FIELDS]
+        included, feature_values = scored["feature_included"].tolist(), scored["feature_values"].tolist()
+        for i, (position, row) in enumerate(zip(positions.tolist(), zip(*columns))):
+            result = dict(zip(RESULT_FIELDS, row))
+            result["edition_specific_features"] = {
+                name: value for name, value, flag in zip(feature_names, feature_values[i], included[i]) if flag}
+            results[position] = result
+    return results
+
+
+class ScenarioBatcher:
+    # Collects single scenarios submitted from concurrent requests and scores
+    # them together; submit returns the scenario's result object
+
+    def __init__(self, window=BATCH_WINDOW, max_size=MAX_BATCH_SIZE):
+        self.window = window
+        self.max_size = max_size
+        self.pending = []
+        self.timer = None
+        self.batches = 0
+        self.scenarios = 0
+
+    async def submit(self, scenario):
+        future = asyncio.get_running_loop().create_future()
+        self.pending.append((scenario, future))
+        if len(self.pending) >= self.max_size:
+            self.flush()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+        self.batches += 1
+        self.scenarios += len(pending)
+        try:
+            results = score_scenarios([scenario for scenario, _ in pending], roi_catalog.current())
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            # A request whose client went away has been cancelled
+            if not future.done():
+                future.set_result(result)
+
+
+def pricing(query):
+    # Annual license cost of a device count under every edition
+    try:
+        devices = float(query["devices"][-1])
+    except (KeyError, ValueError):
+        raise ApiError(400, "devices must be given as a number")
+    if not math.isfinite(devices) or devices < 0:
+        raise ApiError(400, "devices must be a number of at least 0")
+    catalog = roi_catalog.current()
+    costs = roi_engine.license_cost(devices, np.arange(len(roi_engine.EDITIONS)), catalog=catalog)
+    return {"catalog_version": catalog.version, "devices": devices if devices % 1 else int(devices),
+            "license_cost": dict(zip(roi_engine.EDITIONS, costs.tolist()))}
+
+
+async def route(method, target, body, batcher, started):
+    # Status and response object for a request
+    path, _, query = target.partition("?")
+    if path not in ROUTES:
+        raise ApiError(404, f"no such endpoint: {path}")
+    if method != ROUTES[path]:
+        raise ApiError(405, f"{path} only accepts {ROUTES[path]}")
+    if path == "/v1/scenario":
+        result = await batcher.submit(parse_scenario(parse_json(body)))
+        return {"catalog_version": roi_catalog.current().version, "result": result}
+    if path == "/v1/scenarios":
+        document = parse_json(body)
+        scenarios = document.get("scenarios") if isinstance(document, dict) else None
+        if not isinstance(scenarios, list):
+            raise ApiError(400, "request body must be an object with a scenarios list")
+        if len(scenarios) > MAX_BATCH_SCENARIOS:
+            raise ApiError(413, f"at most {MAX_BATCH_SCENARIOS:,} scenarios per request")
+        parsed = [parse_scenario(scenario, f"scenarios[{i}]") for i, scenario in enumerate(scenarios)]
+        catalog = roi_catalog.current()
+        return {"catalog_version": catalog.version, "results": score_scenarios(parsed, catalog) if parsed else []}
+    if path == "/v1/pricing":
+        return pricing(urllib.parse.parse_qs(query))
+    return {"status": "ok", "catalog_version": roi_catalog.current().version,
+            "uptime_seconds": round(time.monotonic() - started, 3),
+            "batches": batcher.batches, "batched_scenarios": batcher.scenarios}
+
+
+def response(status, document, keep_alive):
+    body = json.dumps(document, separators=(",", ":"), allow_nan=False).encode()
+    connection = "" if keep_alive else "Connection: close\r\n"
+    head = (f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n{connection}\r\n")
+    return head.encode("latin-1") + body
+
+
+async def read_request(reader):
+    # (method, target, headers, body) of the next request on a connection, or
+    # None once the client has closed it
+    try:
+        head = await reader.readuntil(b"\r\n\r\n")
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        raise ApiError(431, "request headers are too large")
+    lines = head.decode("latin-1").split("\r\n")
+    try:
+        method, target, version = lines[0].split(" ")
+    except ValueError:
+        raise ApiError(400, "malformed request line")
+    headers = {}
+    for line in lines[1:]:
+        if line:
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+    headers[":version"] = version
+    if "transfer-encoding" in headers:
+        raise ApiError(501, "chunked request bodies are not supported; send a Content-Length")
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise ApiError(400, "invalid Content-Length")
+    if length > MAX_BODY_BYTES:
+        raise ApiError(413, f"request bodies are limited to {MAX_BODY_BYTES:,} bytes")
+    body = await reader.readexactly(length) if length else b""
+    return method, target, headers, body
+
+
+def keep_alive(headers):
+    connection = headers.get("connection", "").lower()
+    if headers[":version"] == "HTTP/1.0":
+        return connection == "keep-alive"
+    return connection != "close"
+
+
+async def handle_connection(reader, writer, batcher, started):
+    try:
+        while True:
+            try:
+                request = await read_request(reader)
+            except ApiError as e:
+                # The rest of the stream cannot be framed, so the connection ends here
+                writer.write(response(e.status, {"error": str(e)}, keep_alive=False))
+                break
+            if request is None:
+                break
+            method, target, headers, body = request
+            alive = keep_alive(headers)
+            try:
+                status, document = 200, await route(method, target, body, batcher, started)
+            except ApiError as e:
+                status, document = e.status, {"error": str(e)}
+            except Exception as e:
+                status, document = 500, {"error": f"{type(e).__name__}: {e}"}
+            writer.write(response(status, document, alive))
+            if not alive:
+                break
+            if writer.transport.get_write_buffer_size() > 64 * 1024:
+                await writer.drain()
+        await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, window=BATCH_WINDOW, max_batch_size=MAX_BATCH_SIZE,
+                ready=None):
+    # Runs the API until cancelled; ready, if given, is called with the
+    # listening server once it accepts connections
+    roi_catalog.current()
+    batcher = ScenarioBatcher(window, max_batch_size)
+    started = time.monotonic()
+    server = await asyncio.start_server(
+        lambda reader, writer: handle_connection(reader, writer, batcher, started),
+        host, port, limit=MAX_HEADER_BYTES, backlog=1024)
+    async with server:
+        if ready is not None:
+            ready(server)
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the Endpoint Central ROI engine as a local JSON API.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"address to listen on (default {DEFAULT_HOST})")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"port to listen on (default {DEFAULT_PORT})")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW * 1000,
+                        help=f"how long single requests wait to be batched (default {BATCH_WINDOW * 1000:g})")
+    parser.add_argument("--max-batch-size", type=int, default=MAX_BATCH_SIZE,
+                        help=f"scenarios that close a batch early (default {MAX_BATCH_SIZE})")
+    args = parser.parse_args(argv)
+    if args.batch_window_ms < 0:
+        parser.error("--batch-window-ms must be at least 0")
+    if args.max_batch_size < 1:
+        parser.error("--max-batch-size must be at least 1")
+
+    def report_ready(server):
+        host, port = server.sockets[0].getsockname()[:2]
+        print(f"Serving the ROI API on http://{host}:{port}", file=sys.stderr, flush=True)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.batch_window_ms / 1000, args.max_batch_size, report_ready))
+    except (OSError, roi_catalog.CatalogError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,384 @@
+import argparse
+import atexit
+import collections
+import concurrent.futures
+import glob
+import itertools
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+import roi_catalog
+import roi_engine
+import roi_fleet
+import roi_reports
+import roi_software
+
+# Headless batch scoring: reads a CSV with one scenario per row, using the
+# fields written by save_calculator_state in roi-tool.py, and writes the
+# generate_csv_report metrics for every row to an output CSV and/or the
+# per-scenario PDF and CSV reports to a zip archive. The input is read in
+# chunks and each chunk is scored with one vectorized engine call, so memory
+# use depends on the chunk size rather than the input size.
+#
+#     python roi_batch.py prospects.csv prospects_roi.csv --workers 4
+#     python roi_batch.py prospects.csv --reports territory.zip --report-formats pdf csv
+
+# The inventory mix factors a saved calculator state holds when it used a
+# fleet or software inventory (see roi_fleet.py and roi_software.py); each is
+# at least 0
+MIX_COLUMNS = roi_fleet.MIX_INPUTS + roi_software.MIX_INPUTS
+
+SCENARIO_COLUMNS = (
+    "devices", "applications", "updates_per_app", "hours_per_update", "hourly_rate",
+    "automation_efficiency", "edition", "implementation_cost", "security_benefit",
+    "compliance_time_saved", "downtime_reduction", "bandwidth_savings", "years", "discount_rate",
+    "license_escalation",
+) + MIX_COLUMNS
+
+# Columns that may be left out or blank: the license cost is then priced from
+# the device count and edition, the benefit inputs take the edition's defaults
+# as in the calculator, the projection uses the --years horizon with no
+# discounting or license price escalation, and the mix factors are 1.0
+OPTIONAL_COLUMNS = ("license_cost", "security_benefit", "compliance_time_saved", "downtime_reduction",
+                    "years", "discount_rate", "license_escalation") + MIX_COLUMNS
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Reports are rendered in smaller chunks since each scenario becomes a file
+REPORT_CHUNK_SIZE = 250
+REPORT_FORMATS = ("pdf", "csv")
+
+# Worker processes for report archives built from the calculator, which runs
+# them inside the Streamlit server process
+INTERACTIVE_REPORT_WORKERS = 2
+
+# Report archives built from the calculator are written to a temporary
+# directory of the server process, removed when the process exits. Archives a
+# process left behind, because it was killed, are swept once they are older
+# than ARCHIVE_MAX_AGE seconds.
+ARCHIVE_PREFIX = "roi_reports_"
+ARCHIVE_MAX_AGE = 24 * 3600
+
+_archive_lock = threading.Lock()
+_archive_dir = None
+
+
+def fill_defaults(inputs, years=roi_engine.PROJECTION_YEARS, catalog=None):
+    # Replaces missing (NaN) optional inputs in place, as the calculator
+    # would: the benefit inputs with the edition defaults, the projection with
+    # the years horizon and no discounting or escalation, the mix factors with
+    # 1.0 and the license cost with the catalog price for the device count and
+    # edition
+    catalog = catalog or roi_catalog.current()
+    codes = inputs["edition"]
+    defaults = roi_engine.default_benefits(codes, catalog=catalog)
+    defaults.update(years=years, discount_rate=roi_engine.DEFAULT_DISCOUNT_RATE,
+                    license_escalation=roi_engine.DEFAULT_LICENSE_ESCALATION)
+    defaults.update(dict.fromkeys(MIX_COLUMNS, 1.0))
+    defaults["license_cost"] = roi_engine.license_cost(inputs["devices"], codes, catalog=catalog)
+    for name, values in defaults.items():
+        inputs[name] = np.where(np.isnan(inputs[name]), values, inputs[name])
+    return inputs
+
+
+def scenario_inputs(chunk, years=roi_engine.PROJECTION_YEARS, catalog=None):
+    # Engine inputs for a chunk of input rows; the years column is returned
+    # per row for score_chunk to group on
+    catalog = catalog or roi_catalog.current()
+    missing = [name for name in SCENARIO_COLUMNS if name not in chunk and name not in OPTIONAL_COLUMNS]
+    if missing:
+        raise ValueError(f"Missing input columns: {', '.join(missing)}")
+    codes = roi_engine.edition_codes(chunk["edition"].astype(str).str.strip().to_numpy())
+    inputs = {"edition": codes}
+    for name in SCENARIO_COLUMNS:
+        if name == "edition":
+            continue
+        if name in chunk:
+            inputs[name] = pd.to_numeric(chunk[name], errors="coerce").to_numpy(dtype=float)
+        else:
+            inputs[name] = np.full(len(chunk), np.nan)
+    if "license_cost" in chunk:
+        inputs["license_cost"] = pd.to_numeric(chunk["license_cost"], errors="coerce").to_numpy(dtype=float)
+    else:
+        inputs["license_cost"] = np.full(len(chunk), np.nan)
+    fill_defaults(inputs, years=years, catalog=catalog)
+    for name, values in inputs.items():
+        if name != "edition" and np.isnan(values).any():
+            rows = chunk.index[np.isnan(values)]
+            raise ValueError(f"Invalid or missing {name} on data row {rows[0] + 1}")
+    invalid_years = (inputs["years"] < 1) | (inputs["years"] % 1 != 0)
+    if invalid_years.any():
+        raise ValueError(f"years must be a whole number of at least 1 on data row {chunk.index[invalid_years][0] + 1}")
+    for name in MIX_COLUMNS:
+        negative = inputs[name] < 0
+        if negative.any():
+            raise ValueError(f"{name} must be at least 0 on data row {chunk.index[negative][0] + 1}")
+    return inputs
+
+
+def passthrough_columns(chunk):
+    # Input columns copied to the output unchanged; the saved theme is dropped
+    return [name for name in chunk.columns
+            if name not in SCENARIO_COLUMNS and name not in OPTIONAL_COLUMNS and name != "theme"]
+
+
+def metric_columns(catalog):
+    # Output metric columns after the passthrough columns, with the text
+    # format of each: inputs as entered, calculated amounts to the cent
+    columns = []
+    for label, key, _, _ in roi_reports.REPORT_METRICS:
+        if key in ("edition", "irr_status"):
+            columns.append((label, "%s"))
+        elif key in SCENARIO_COLUMNS:
+            columns.append((label, "%.15g"))
+        else:
+            columns.append((label, "%.2f"))
+    columns += [(f"{feature} Value", "%.2f") for feature, _, _ in catalog.edition_features]
+    return columns
+
+
+def csv_text(column):
+    # CSV field text for a passthrough column, quoted where needed
+    text = column.fillna("").astype(str)
+    quoted = '"' + text.str.replace('"', '""') + '"'
+    return np.where(text.str.contains('[",\r\n]'), quoted, text).tolist()
+
+
+def header_row(chunk, catalog):
+    # Output CSV header for input chunks shaped like chunk
+    labels = passthrough_columns(chunk) + [label for label, _ in metric_columns(catalog)]
+    return pd.DataFrame(columns=labels).to_csv(index=False)
+
+
+def horizon_groups(inputs):
+    # Yields the row positions and engine inputs of each projection horizon
+    # in inputs, so every horizon is scored in one engine call
+    horizons = np.unique(inputs["years"])
+    if len(horizons) == 1:
+        yield np.arange(len(inputs["years"])), dict(inputs, years=int(horizons[0]))
+        return
+    for horizon in horizons:
+        rows = np.flatnonzero(inputs["years"] == horizon)
+        batch = {name: values[rows] for name, values in inputs.items()}
+        batch["years"] = int(horizon)
+        yield rows, batch
+
+
+def score_rows(inputs, catalog):
+    # Report frame for engine inputs, in input order
+    frames = [roi_reports.report_frame(batch, roi_engine.calculate_roi(catalog=catalog, **batch),
+                                       catalog=catalog).set_index(rows)
+              for rows, batch in horizon_groups(inputs)]
+    return frames[0] if len(frames) == 1 else pd.concat(frames).sort_index()
+
+
+def score_chunk(chunk, years=roi_engine.PROJECTION_YEARS, catalog=None):
+    # Scores a chunk and returns it as CSV text without a header. Columns that
+    # are not calculator inputs, such as a customer name, are passed through
+    # ahead of the metrics. Rows are formatted with one % template, which is
+    # several times faster than DataFrame.to_csv for float columns.
+    catalog = catalog or roi_catalog.current()
+    report = score_rows(scenario_inputs(chunk, years=years, catalog=catalog), catalog)
+    passthrough = passthrough_columns(chunk)
+    metrics = metric_columns(catalog)
+    columns = [csv_text(chunk[name]) for name in passthrough] + [report[label].tolist() for label, _ in metrics]
+    row_format = ",".join(["%s"] * len(passthrough) + [fmt for _, fmt in metrics]) + "\n"
+    return "".join([row_format % row for row in zip(*columns)])
+
+
+def run_chunks(chunks, func, args=(), workers=None):
+    # Yields (chunk length, func(chunk, *args)) for each chunk in input order.
+    # With more than one worker the chunks run on a process pool with at most
+    # two chunks per worker in flight.
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in chunks:
+            yield len(chunk), func(chunk, *args)
+        return
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = collections.deque()
+        for chunk in chunks:
+            pending.append((len(chunk), executor.submit(func, chunk, *args)))
+            if len(pending) >= 2 * workers:
+                size, future = pending.popleft()
+                yield size, future.result()
+        while pending:
+            size, future = pending.popleft()
+            yield size, future.result()
+
+
+def score_file(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, workers=None,
+               years=roi_engine.PROJECTION_YEARS):
+    # Streams input_path to output_path chunk by chunk and returns the number
+    # of scored rows. The whole file is scored with the catalog active at the
+    # start, even if it is reloaded meanwhile.
+    catalog = roi_catalog.current()
+    chunks = iter(pd.read_csv(input_path, chunksize=chunk_size, skipinitialspace=True))
+    first = next(chunks, None)
+    rows = 0
+    with open(output_path, "w", newline="", encoding="utf-8") as output:
+        if first is None:
+            return rows
+        output.write(header_row(first, catalog))
+        for size, text in run_chunks(itertools.chain([first], chunks), score_chunk, (years, catalog), workers):
+            output.write(text)
+            rows += size
+    return rows
+
+
+def plain_value(value):
+    # Python number for a report, without a trailing .0 on whole numbers
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def report_names(chunk):
+    # Archive file names without extension: the data row number, the first
+    # passthrough column (such as a customer name) and the edition
+    passthrough = passthrough_columns(chunk)
+    names = pd.Series("", index=chunk.index)
+    if passthrough:
+        names = (chunk[passthrough[0]].fillna("").astype(str)
+                 .str.replace(r"[^\w.-]+", "_", regex=True).str.strip("_.") + "_")
+    editions = chunk["edition"].astype(str).str.strip().str.lower()
+    return [f"{row + 1:06d}_{name}{edition}" for row, name, edition in zip(chunk.index, names, editions)]
+
+
+def report_files(chunk, years=roi_engine.PROJECTION_YEARS, formats=("pdf",), catalog=None):
+    # (file name, bytes) of each requested report for every row of a chunk,
+    # using the PDF and CSV layouts of the calculator's export
+    catalog = catalog or roi_catalog.current()
+    inputs = scenario_inputs(chunk, years=years, catalog=catalog)
+    rows = [None] * len(chunk)
+    for positions, batch in horizon_groups(inputs):
+        results = roi_engine.calculate_roi(catalog=catalog, **batch)
+        for i, position in enumerate(positions):
+            row = roi_engine.scenario(results, i, catalog=catalog)
+            for name, values in batch.items():
+                if name != "edition":
+                    row[name] = plain_value(values[i] if np.ndim(values) else values)
+            rows[position] = row
+    files = []
+    for name, row in zip(report_names(chunk), rows):
+        if "pdf" in formats:
+            files.append((f"{name}.pdf", roi_reports.pdf_report(row)))
+        if "csv" in formats:
+            files.append((f"{name}.csv", roi_reports.csv_report(row)))
+    return files
+
+
+def sweep_archives(max_age=ARCHIVE_MAX_AGE, directory=None):
+    # Removes report archives and archive directories in the temporary
+    # directory that were last modified more than max_age seconds ago
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(directory or tempfile.gettempdir(), ARCHIVE_PREFIX + "*")):
+        try:
+            if os.path.getmtime(path) >= cutoff:
+                continue
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def archive_path():
+    # A new file name for a report archive in this process's archive
+    # directory, which is created, after sweeping stale ones, on first use
+    global _archive_dir
+    with _archive_lock:
+        if _archive_dir is None:
+            sweep_archives()
+            _archive_dir = tempfile.mkdtemp(prefix=ARCHIVE_PREFIX)
+            atexit.register(shutil.rmtree, _archive_dir, ignore_errors=True)
+    return os.path.join(_archive_dir, f"{uuid.uuid4().hex}.zip")
+
+
+def export_reports(input_file, archive, formats=("pdf",), chunk_size=REPORT_CHUNK_SIZE, workers=None,
+                   years=roi_engine.PROJECTION_YEARS, progress=None):
+    # Renders the requested reports for every row of input_file (a path or
+    # file object) into a zip archive (a path or binary file object) and
+    # returns the number of scenarios. Each chunk's files are written as soon
+    # as the chunk is done, so only the chunks in flight are held in memory.
+    # progress, if given, is called with the scenarios done so far and the
+    # seconds elapsed after every chunk.
+    unknown = set(formats) - set(REPORT_FORMATS)
+    if unknown:
+        raise ValueError(f"Unknown report format: {', '.join(sorted(unknown))}")
+    start = time.perf_counter()
+    catalog = roi_catalog.current()
+    chunks = pd.read_csv(input_file, chunksize=chunk_size, skipinitialspace=True)
+    rows = 0
+    with zipfile.ZipFile(archive, "w") as zip_file:
+        for size, files in run_chunks(chunks, report_files, (years, tuple(formats), catalog), workers):
+            for name, data in files:
+                # PDF page streams are already compressed
+                compression = zipfile.ZIP_STORED if name.endswith(".pdf") else zipfile.ZIP_DEFLATED
+                zip_file.writestr(name, data, compress_type=compression)
+            rows += size
+            if progress is not None:
+                progress(rows, time.perf_counter() - start)
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Score a CSV of Endpoint Central ROI scenarios without the Streamlit interface.")
+    parser.add_argument("input", help="input CSV with one scenario per row")
+    parser.add_argument("output", nargs="?", help="output CSV for the calculated metrics")
+    parser.add_argument("--reports", metavar="ZIP", help="zip archive for a report file per scenario")
+    parser.add_argument("--report-formats", nargs="+", choices=REPORT_FORMATS, default=["pdf"],
+                        help="report files written per scenario with --reports (default: pdf)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows read and scored at a time (default {DEFAULT_CHUNK_SIZE:,})")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="worker processes; 1 scores in this process (default: CPU count)")
+    parser.add_argument("--years", type=int, default=roi_engine.PROJECTION_YEARS,
+                        help=f"projection horizon for rows without a years value (default {roi_engine.PROJECTION_YEARS})")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.years < 1:
+        parser.error("--years must be at least 1")
+    if args.output is None and args.reports is None:
+        parser.error("give an output CSV, --reports or both")
+
+    try:
+        if args.output is not None:
+            start = time.perf_counter()
+            rows = score_file(args.input, args.output, chunk_size=args.chunk_size, workers=args.workers,
+                              years=args.years)
+            elapsed = time.perf_counter() - start
+            print(f"Scored {rows:,} scenarios in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)"
+                  f" -> {args.output}", file=sys.stderr)
+        if args.reports is not None:
+            def report_progress(rows, elapsed):
+                print(f"\rRendered reports for {rows:,} scenarios ({rows / max(elapsed, 1e-9) * 60:,.0f}/min)",
+                      end="", file=sys.stderr, flush=True)
+
+            start = time.perf_counter()
+            rows = export_reports(args.input, args.reports, formats=args.report_formats, workers=args.workers,
+                                  years=args.years, progress=report_progress)
+            elapsed = time.perf_counter() - start
+            print(f"\rRendered reports for {rows:,} scenarios in {elapsed:.1f}s"
+                  f" ({rows / max(elapsed, 1e-9) * 60:,.0f}/min) -> {args.reports}", file=sys.stderr)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
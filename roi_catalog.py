@@ -0,0 +1,296 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+# Pricing and model assumptions, loaded from the versioned catalog.json next
+# to this module (or the file named by ROI_CATALOG). The file is parsed and
+# validated once into a Catalog of lookup arrays indexed by edition code
+# (position in EDITIONS). current() returns the active catalog and checks the
+# file for changes at most every RELOAD_INTERVAL seconds; a changed file is
+# loaded in full and then swapped in with a single assignment, so callers see
+# either the old or the new catalog, never a mix. A changed file that fails
+# validation is logged and the previous catalog stays active.
+#
+# A catalog must list exactly the editions in EDITIONS, in that order: their
+# codes index the per-edition arrays shared by the engine, the API, batch
+# scoring and the calculator. A catalog cannot leave an edition out or
+# reorder them; adding an edition means extending EDITIONS, and the
+# per-edition comparison and recommendation text in roi-tool.py, as well.
+
+EDITIONS = ("Free", "Professional", "Enterprise", "UEM", "Security")
+
+ENV_VAR = "ROI_CATALOG"
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json")
+RELOAD_INTERVAL = 1.0
+
+# calculate_roi outputs an edition feature value can be proportional to,
+# besides the device count
+FEATURE_BASES = ("devices", "annual_labor_savings", "downtime_cost_saved", "security_incidents_reduction_value")
+
+EDITION_FIELDS = (
+    "base_price", "avg_incident_cost", "downtime_hours_per_device", "efficiency_factor", "bandwidth_factor",
+    "value_factor", "security_benefit_max", "downtime_reduction_max", "default_compliance_hours",
+)
+
+Catalog = collections.namedtuple("Catalog", [
+    "version", "fingerprint", "path",
+    # Annual license pricing: the base price covers the first base_devices
+    # devices and each further device costs base_price / base_devices times
+    # the discount factor of its tier. tier_starts, tier_start_cost and
+    # tier_rate are precomputed breakpoints: the device count each tier starts
+    # at, and per edition the license cost at that start and the per-device
+    # rate inside the tier, flattened to edition_code * len(tier_limits) + tier.
+    "base_prices", "base_devices", "free_edition_device_limit", "tier_limits", "tier_factors",
+    "tier_starts", "tier_start_cost", "tier_rate",
+    # Per-edition model constants
+    "avg_incident_cost", "downtime_hours_per_device", "efficiency_factor", "bandwidth_factor",
+    "edition_value_factors",
+    # Per-edition benefit assumptions; the default security and downtime
+    # reductions are the edition maximum capped at default_security_benefit
+    # and default_downtime_reduction
+    "security_benefit_max", "downtime_reduction_max", "default_compliance_hours",
+    "default_security_benefit", "default_downtime_reduction", "security_incident_rate",
+    # Edition-specific features as (name, basis, multiplier); each edition
+    # includes the first edition_feature_count[code] of them
+    "edition_features", "edition_feature_count",
+    # Fleet inventory classes: (incident factor, downtime factor) per device
+    # type and a factor per criticality level, by lower-case name; a device
+    # class weighs the type factors by its criticality factor. Empty when the
+    # catalog has no fleet section.
+    "device_type_factors", "criticality_factors",
+    # Software inventory patch effort: an application installed on up to
+    # effort_tier_limits[i] devices takes effort_tier_factors[i] times the
+    # hours per update; a single tier of 1.0 when the catalog has no software
+    # section
+    "effort_tier_limits", "effort_tier_factors",
+    # Display text per edition name: description, key_features and best_for
+    "edition_info",
+])
+
+logger = logging.getLogger("roi_catalog")
+
+_lock = threading.Lock()
+_active = None
+_active_stat = None
+_rejected_stat = None
+_next_check = 0.0
+
+
+class CatalogError(ValueError):
+    pass
+
+
+def _number(value, where, minimum=0.0, integer=False):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not np.isfinite(value):
+        raise CatalogError(f"{where} must be a number")
+    if integer and value != int(value):
+        raise CatalogError(f"{where} must be a whole number")
+    if value < minimum:
+        raise CatalogError(f"{where} must be at least {minimum:g}")
+    return value
+
+
+def _section(document, key, where="catalog"):
+    value = document.get(key)
+    if not isinstance(value, dict):
+        raise CatalogError(f"{where} needs a {key} object")
+    return value
+
+
+def parse(text, path=None):
+    # Validates a catalog document and builds its lookup arrays
+    try:
+        document = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise CatalogError(f"not valid JSON: {e}")
+    if not isinstance(document, dict):
+        raise CatalogError("catalog must be a JSON object")
+    version = document.get("version")
+    if not isinstance(version, str) or not version:
+        raise CatalogError("catalog needs a version string")
+
+    pricing = _section(document, "pricing")
+    base_devices = _number(pricing.get("base_devices"), "pricing.base_devices", minimum=1, integer=True)
+    free_limit = _number(pricing.get("free_edition_device_limit"), "pricing.free_edition_device_limit",
+                         minimum=1, integer=True)
+    tiers = pricing.get("tiers")
+    if not isinstance(tiers, list) or not tiers:
+        raise CatalogError("pricing.tiers must be a non-empty list")
+    tier_limits, tier_factors = [], []
+    for i, tier in enumerate(tiers):
+        where = f"pricing.tiers[{i}]"
+        if not isinstance(tier, dict):
+            raise CatalogError(f"{where} must be an object")
+        last = i == len(tiers) - 1
+        if last != (tier.get("up_to") is None):
+            raise CatalogError(f"{where}.up_to must be null for the last tier only")
+        limit = np.inf if last else _number(tier["up_to"], f"{where}.up_to", integer=True)
+        if limit <= (tier_limits[-1] if tier_limits else base_devices):
+            raise CatalogError(f"{where}.up_to must be above the previous tier and base_devices")
+        tier_limits.append(limit)
+        tier_factors.append(_number(tier.get("factor"), f"{where}.factor"))
+
+    benefits = _section(document, "benefits")
+    incident_rate = _number(benefits.get("security_incident_rate"), "benefits.security_incident_rate")
+    if incident_rate > 1:
+        raise CatalogError("benefits.security_incident_rate must be at most 1")
+    default_security = _number(benefits.get("default_security_benefit"), "benefits.default_security_benefit")
+    default_downtime = _number(benefits.get("default_downtime_reduction"), "benefits.default_downtime_reduction")
+
+    features = document.get("features")
+    if not isinstance(features, list):
+        raise CatalogError("catalog needs a features list")
+    edition_features = []
+    for i, feature in enumerate(features):
+        where = f"features[{i}]"
+        if not isinstance(feature, dict) or not isinstance(feature.get("name"), str):
+            raise CatalogError(f"{where} needs a name")
+        if feature.get("basis") not in FEATURE_BASES:
+            raise CatalogError(f"{where}.basis must be one of {', '.join(FEATURE_BASES)}")
+        edition_features.append((feature["name"], feature["basis"],
+                                 float(_number(feature.get("multiplier"), f"{where}.multiplier"))))
+
+    device_type_factors, criticality_factors = {}, {}
+    fleet = document.get("fleet", {})
+    if not isinstance(fleet, dict):
+        raise CatalogError("catalog.fleet must be an object")
+    device_types = fleet.get("device_types", {})
+    criticality = fleet.get("criticality", {})
+    if not isinstance(device_types, dict) or not isinstance(criticality, dict):
+        raise CatalogError("fleet.device_types and fleet.criticality must be objects")
+    for name, factors in device_types.items():
+        where = f"fleet.device_types.{name}"
+        if not isinstance(factors, dict):
+            raise CatalogError(f"{where} must be an object")
+        device_type_factors[name.lower()] = (float(_number(factors.get("incident_factor"), f"{where}.incident_factor")),
+                                             float(_number(factors.get("downtime_factor"), f"{where}.downtime_factor")))
+    for name, factor in criticality.items():
+        criticality_factors[name.lower()] = float(_number(factor, f"fleet.criticality.{name}"))
+
+    software = document.get("software", {})
+    if not isinstance(software, dict):
+        raise CatalogError("catalog.software must be an object")
+    effort_tiers = software.get("effort_tiers", [{"up_to": None, "factor": 1.0}])
+    if not isinstance(effort_tiers, list) or not effort_tiers:
+        raise CatalogError("software.effort_tiers must be a non-empty list")
+    effort_limits, effort_factors = [], []
+    for i, tier in enumerate(effort_tiers):
+        where = f"software.effort_tiers[{i}]"
+        if not isinstance(tier, dict):
+            raise CatalogError(f"{where} must be an object")
+        last = i == len(effort_tiers) - 1
+        if last != (tier.get("up_to") is None):
+            raise CatalogError(f"{where}.up_to must be null for the last tier only")
+        limit = np.inf if last else _number(tier["up_to"], f"{where}.up_to")
+        if effort_limits and limit <= effort_limits[-1]:
+            raise CatalogError(f"{where}.up_to must be above the previous tier")
+        effort_limits.append(limit)
+        effort_factors.append(_number(tier.get("factor"), f"{where}.factor"))
+
+    editions = _section(document, "editions")
+    if tuple(editions) != EDITIONS:
+        raise CatalogError(f"editions must be {', '.join(EDITIONS)}, in that order")
+    columns = {field: [] for field in EDITION_FIELDS}
+    feature_count, edition_info = [], {}
+    for name, edition in editions.items():
+        where = f"editions.{name}"
+        if not isinstance(edition, dict):
+            raise CatalogError(f"{where} must be an object")
+        for field in EDITION_FIELDS:
+            columns[field].append(_number(edition.get(field), f"{where}.{field}"))
+        count = _number(edition.get("feature_count"), f"{where}.feature_count", integer=True)
+        if count > len(edition_features):
+            raise CatalogError(f"{where}.feature_count is more than the {len(edition_features)} features")
+        feature_count.append(count)
+        for field in ("description", "key_features", "best_for"):
+            if not isinstance(edition.get(field), str):
+                raise CatalogError(f"{where}.{field} must be a string")
+        edition_info[name] = {field: edition[field] for field in ("description", "key_features", "best_for")}
+    for field in ("security_benefit_max", "downtime_reduction_max"):
+        if max(columns[field]) > 100:
+            raise CatalogError(f"editions.*.{field} is a percentage and must be at most 100")
+
+    base_prices = np.array(columns["base_price"], dtype=float)
+    tier_limits = np.array(tier_limits, dtype=float)
+    tier_factors = np.array(tier_factors, dtype=float)
+    tier_starts = np.concatenate(([base_devices], tier_limits[:-1]))
+    tier_units = np.concatenate(([0.0], np.cumsum((tier_limits[:-1] - tier_starts[:-1]) * tier_factors[:-1])))
+    return Catalog(
+        version=version,
+        fingerprint=hashlib.sha256(text.encode() if isinstance(text, str) else text).hexdigest()[:16],
+        path=path,
+        base_prices=base_prices,
+        base_devices=int(base_devices),
+        free_edition_device_limit=int(free_limit),
+        tier_limits=tier_limits,
+        tier_factors=tier_factors,
+        tier_starts=tier_starts,
+        tier_start_cost=(base_prices[:, None] * (1 + tier_units / base_devices)).ravel(),
+        tier_rate=(base_prices[:, None] / base_devices * tier_factors).ravel(),
+        avg_incident_cost=np.array(columns["avg_incident_cost"], dtype=float),
+        downtime_hours_per_device=np.array(columns["downtime_hours_per_device"], dtype=float),
+        efficiency_factor=np.array(columns["efficiency_factor"], dtype=float),
+        bandwidth_factor=np.array(columns["bandwidth_factor"], dtype=float),
+        edition_value_factors=np.array(columns["value_factor"], dtype=float),
+        security_benefit_max=np.array(columns["security_benefit_max"], dtype=float),
+        downtime_reduction_max=np.array(columns["downtime_reduction_max"], dtype=float),
+        default_compliance_hours=np.array(columns["default_compliance_hours"], dtype=float),
+        default_security_benefit=default_security,
+        default_downtime_reduction=default_downtime,
+        security_incident_rate=incident_rate,
+        edition_features=tuple(edition_features),
+        edition_feature_count=np.array(feature_count, dtype=np.intp),
+        device_type_factors=device_type_factors,
+        criticality_factors=criticality_factors,
+        effort_tier_limits=np.array(effort_limits, dtype=float),
+        effort_tier_factors=np.array(effort_factors, dtype=float),
+        edition_info=edition_info,
+    )
+
+
+def load(path):
+    with open(path, "rb") as f:
+        return parse(f.read(), path=path)
+
+
+def catalog_path():
+    return os.environ.get(ENV_VAR) or DEFAULT_PATH
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return path, stat.st_mtime_ns, stat.st_size
+
+
+def current():
+    # The active catalog, reloaded when its file has changed. The first call
+    # raises CatalogError or OSError when the file cannot be loaded.
+    global _active, _active_stat, _rejected_stat, _next_check
+    now = time.monotonic()
+    if _active is not None and now < _next_check:
+        return _active
+    with _lock:
+        if _active is not None and now < _next_check:
+            return _active
+        path, stat_key = catalog_path(), None
+        try:
+            stat_key = _stat_key(path)
+            if stat_key != _active_stat and stat_key != _rejected_stat:
+                catalog = load(path)
+                if _active is not None:
+                    logger.info("Loaded pricing catalog %s from %s", catalog.version, path)
+                _active, _active_stat = catalog, stat_key
+        except (OSError, CatalogError) as e:
+            if _active is None:
+                raise
+            # An invalid file is not parsed again until it changes
+            _rejected_stat = stat_key if isinstance(e, CatalogError) else None
+            logger.warning("Keeping pricing catalog %s; %s could not be loaded: %s", _active.version, path, e)
+        _next_check = now + RELOAD_INTERVAL
+        return _active
@@ -0,0 +1,424 @@
+import functools
+
+import numpy as np
+import plotly.colors
+import plotly.graph_objects as go
+import plotly.io as pio
+from plotly.subplots import make_subplots
+
+# Plotly figure builders for roi-tool.py. They take plain values and the theme
+# name only, so the Streamlit script can memoize each one on its arguments.
+# Figures are built with graph_objects alone: plotly.express would import
+# pandas, which costs more at startup than building any of these figures.
+#
+# Every figure carries its template in the JSON sent to the browser, and the
+# stock plotly_white and plotly_dark templates are about 7 KB each, mostly
+# defaults for trace types and subplots these charts never draw. The figures
+# use chart_template instead, a copy trimmed to the trace types below, built
+# once per template name. The builders also leave out properties that only
+# restate Plotly's defaults.
+
+THEME_COLORS = {
+    "Light": {
+        "theme_color": "#0066B3",
+        "background_color": "#FFFFFF",
+        "text_color": "#333333",
+        "card_bg": "#f7f7f7",
+        "plot_bg": "#FFFFFF",
+        "plot_color": "#333333",
+        "template": "plotly_white"
+    },
+    "Dark": {
+        "theme_color": "#4098E5",
+        "background_color": "#1E1E1E",
+        "text_color": "#F0F0F0",
+        "card_bg": "#2D2D2D",
+        "plot_bg": "#1E1E1E",
+        "plot_color": "#F0F0F0",
+        "template": "plotly_dark"
+    }
+}
+
+PROCESS_COLORS = {'Manual Process': '#FF6B6B', 'Endpoint Central': '#4ECDC4'}
+EDITION_COLORS = ['#FF6B6B', '#FFCE54', '#A0D468', '#4ECDC4', '#5D9CEC']
+
+# Trace types drawn by these figures, and the template layout defaults for
+# subplots and controls they never have. Every coloured trace sets its own
+# colorscale, so the template colorscales are dropped too.
+TEMPLATE_TRACE_TYPES = ("bar", "scatter", "pie", "heatmap", "table")
+UNUSED_TEMPLATE_LAYOUT = ("polar", "ternary", "scene", "geo", "updatemenudefaults", "sliderdefaults", "colorscale")
+
+
+@functools.cache
+def chart_template(name):
+    # The named Plotly template without the defaults these figures never use
+    template = pio.templates[name].to_plotly_json()
+    data = {trace_type: [{key: value for key, value in entry.items() if key != "colorscale"} for entry in entries]
+            for trace_type, entries in template.get("data", {}).items() if trace_type in TEMPLATE_TRACE_TYPES}
+    layout = {key: value for key, value in template.get("layout", {}).items() if key not in UNUSED_TEMPLATE_LAYOUT}
+    return go.layout.Template(data=data, layout=layout)
+
+
+def theme_template(theme):
+    return chart_template(THEME_COLORS[theme]["template"])
+
+
+def _theme_layout(theme):
+    colors = THEME_COLORS[theme]
+    return dict(plot_bgcolor=colors["plot_bg"], paper_bgcolor=colors["plot_bg"], font_color=colors["plot_color"])
+
+
+def _add_process_bars(fig, values, value_label, text_template, row=None, col=None, showlegend=True):
+    # One bar per process, coloured and grouped in the legend by process
+    for process, value in zip(PROCESS_COLORS, values):
+        fig.add_trace(go.Bar(
+            x=[process],
+            y=np.array([value], dtype=float),
+            name=process,
+            legendgroup=process,
+            marker_color=PROCESS_COLORS[process],
+            showlegend=showlegend,
+            textposition='outside',
+            texttemplate=text_template,
+            hovertemplate=f'Process=%{{x}}<br>{value_label}=%{{y}}<extra></extra>'
+        ), row=row, col=col)
+
+
+def _process_figure(values, value_label, text_template, title, theme):
+    fig = go.Figure(layout=dict(template=theme_template(theme)))
+    _add_process_bars(fig, values, value_label, text_template)
+    fig.update_layout(
+        xaxis=dict(title_text='Process', categoryorder='array', categoryarray=list(PROCESS_COLORS)),
+        yaxis_title_text=value_label,
+        legend=dict(title_text='Process', tracegroupgap=0),
+        title_text=title,
+        barmode='relative',
+        **_theme_layout(theme),
+        height=500
+    )
+    return fig
+
+
+def build_hours_figure(total_manual_hours, total_automated_hours, theme):
+    return _process_figure([total_manual_hours, total_automated_hours], 'Hours per Year', '%{y:,.0f}',
+                           'Annual Hours Comparison: Manual vs. Automated', theme)
+
+
+def build_cost_figure(total_manual_cost, total_automated_cost, theme):
+    return _process_figure([total_manual_cost, total_automated_cost], 'Annual Cost ($)', '$%{y:,.0f}',
+                           'Annual Cost Comparison: Manual vs. Automated', theme)
+
+
+def build_process_figure(total_manual_hours, total_automated_hours, total_manual_cost, total_automated_cost,
+                         theme):
+    # The hours and cost comparisons side by side in one figure, for the
+    # compact chart mode; one legend entry per process toggles both bars
+    fig = make_subplots(rows=1, cols=2, subplot_titles=('Hours per Year', 'Annual Cost ($)'))
+    _add_process_bars(fig, [total_manual_hours, total_automated_hours], 'Hours per Year', '%{y:,.0f}', row=1, col=1)
+    _add_process_bars(fig, [total_manual_cost, total_automated_cost], 'Annual Cost ($)', '$%{y:,.0f}', row=1, col=2,
+                      showlegend=False)
+    fig.update_xaxes(categoryorder='array', categoryarray=list(PROCESS_COLORS))
+    fig.update_yaxes(tickprefix='$', row=1, col=2)
+    fig.update_layout(
+        template=theme_template(theme),
+        legend=dict(title_text='Process', tracegroupgap=0),
+        title_text='Annual Hours and Cost: Manual vs. Automated',
+        barmode='relative',
+        **_theme_layout(theme),
+        height=500
+    )
+    return fig
+
+
+def build_projection_figure(years, costs_manual, costs_automated, cumulative_savings, theme,
+                            savings_bands=None, percentiles=None):
+    # savings_bands holds the low, middle and high percentile rows of the
+    # simulated cumulative savings, labelled by percentiles
+    fig_projection = go.Figure()
+    fig_projection.add_trace(go.Scatter(
+        x=years,
+        y=costs_manual,
+        mode='lines+markers',
+        name='Manual Process',
+        line=dict(color='#FF6B6B', width=3),
+        marker=dict(size=8)
+    ))
+    fig_projection.add_trace(go.Scatter(
+        x=years,
+        y=costs_automated,
+        mode='lines+markers',
+        name='Endpoint Central',
+        line=dict(color='#4ECDC4', width=3),
+        marker=dict(size=8)
+    ))
+    fig_projection.add_trace(go.Scatter(
+        x=years,
+        y=cumulative_savings,
+        mode='lines+markers',
+        name='Cumulative Savings',
+        line=dict(color='#5D9CEC', width=3, dash='dash'),
+        marker=dict(size=8)
+    ))
+    fig_projection.update_layout(
+        title=f'{len(years)}-Year Cost and Savings Projection',
+        xaxis_title='Year',
+        yaxis_title='Cost/Savings ($)',
+        **_theme_layout(theme),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        template=theme_template(theme),
+        height=500,
+        hovermode="x unified"
+    )
+    if savings_bands is not None:
+        low_pct, mid_pct, high_pct = percentiles
+        fig_projection.add_trace(go.Scatter(
+            x=years,
+            y=savings_bands[2],
+            mode='lines',
+            name=f'P{high_pct} Cumulative Savings',
+            line=dict(color='#5D9CEC', width=0),
+            showlegend=False
+        ))
+        fig_projection.add_trace(go.Scatter(
+            x=years,
+            y=savings_bands[0],
+            mode='lines',
+            name=f'P{low_pct}-P{high_pct} Cumulative Savings',
+            line=dict(color='#5D9CEC', width=0),
+            fill='tonexty',
+            fillcolor='rgba(93, 156, 236, 0.25)'
+        ))
+        fig_projection.add_trace(go.Scatter(
+            x=years,
+            y=savings_bands[1],
+            mode='lines',
+            name=f'P{mid_pct} Cumulative Savings',
+            line=dict(color='#5D9CEC', width=2, dash='dot')
+        ))
+    fig_projection.update_yaxes(tickprefix='$', tickformat=',')
+    return fig_projection
+
+
+def build_payback_histogram_figure(counts, edges, samples, theme):
+    edges = np.asarray(edges)
+    fig_payback = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        marker_color='#4ECDC4',
+        name='Scenarios'
+    ))
+    fig_payback.update_layout(
+        title=f'Payback Period across {samples:,} Simulated Scenarios',
+        xaxis_title='Payback Period (months)',
+        yaxis_title='Scenarios',
+        **_theme_layout(theme),
+        template=theme_template(theme),
+        height=400
+    )
+    return fig_payback
+
+
+def _sorted_benefits(total_benefits):
+    # Benefit names and values, largest value first
+    ranked = sorted(total_benefits.items(), key=lambda item: item[1], reverse=True)
+    return [name for name, _ in ranked], np.array([value for _, value in ranked], dtype=float)
+
+
+def _benefits_bar(names, values):
+    return go.Bar(
+        x=names,
+        y=values,
+        marker=dict(color=values, coloraxis='coloraxis'),
+        showlegend=False,
+        textposition='outside',
+        texttemplate='$%{y:,.0f}',
+        hovertemplate='=%{x}<br>Annual Value ($)=%{marker.color}<extra></extra>'
+    )
+
+
+def _benefits_pie(names, values):
+    return go.Pie(
+        labels=names,
+        values=values,
+        hole=0.3,
+        textinfo='percent+label',
+        textposition='inside',
+        insidetextorientation='radial',
+        hovertemplate='Benefit=%{label}<br>Value=%{value}<extra></extra>'
+    )
+
+
+def _viridis_coloraxis(**kwargs):
+    viridis = plotly.colors.sequential.Viridis
+    return dict(autocolorscale=False, colorscale=[[i / (len(viridis) - 1), color] for i, color in enumerate(viridis)],
+                **kwargs)
+
+
+def build_benefits_figure(total_benefits, theme):
+    names, values = _sorted_benefits(total_benefits)
+    fig_benefits = go.Figure(_benefits_bar(names, values), layout=dict(template=theme_template(theme)))
+    fig_benefits.update_layout(
+        xaxis=dict(title_text='', tickangle=-45),
+        yaxis_title_text='Annual Value ($)',
+        coloraxis=_viridis_coloraxis(colorbar_title_text='Annual Value ($)'),
+        title_text='Breakdown of Annual Benefits',
+        **_theme_layout(theme),
+        height=500
+    )
+    return fig_benefits
+
+
+def build_pie_figure(total_benefits, theme):
+    names, values = _sorted_benefits(total_benefits)
+    fig_pie = go.Figure(_benefits_pie(names, values), layout=dict(template=theme_template(theme)))
+    fig_pie.update_layout(
+        title_text='Distribution of Total Benefits',
+        piecolorway=plotly.colors.sequential.Viridis,
+        **_theme_layout(theme),
+        height=600
+    )
+    return fig_pie
+
+
+def build_benefits_overview_figure(total_benefits, theme):
+    # The benefits bar chart and pie side by side in one figure, for the
+    # compact chart mode; the bar colour scale is left out, the pie legend
+    # names the benefits
+    names, values = _sorted_benefits(total_benefits)
+    fig = make_subplots(rows=1, cols=2, specs=[[{"type": "xy"}, {"type": "domain"}]], column_widths=[0.55, 0.45],
+                        subplot_titles=('Annual Value ($)', 'Share of Total Benefits'))
+    fig.add_trace(_benefits_bar(names, values), row=1, col=1)
+    fig.add_trace(_benefits_pie(names, values), row=1, col=2)
+    fig.update_xaxes(tickangle=-45)
+    fig.update_yaxes(tickprefix='$')
+    fig.update_layout(
+        template=theme_template(theme),
+        coloraxis=_viridis_coloraxis(showscale=False),
+        title_text='Breakdown and Distribution of Annual Benefits',
+        piecolorway=plotly.colors.sequential.Viridis,
+        **_theme_layout(theme),
+        height=550
+    )
+    return fig
+
+
+def build_tornado_figure(labels, low, high, base, delta_pct, metric_label, theme):
+    # low and high are the metric changes from base, ordered bottom to top
+    fig_tornado = go.Figure()
+    fig_tornado.add_trace(go.Bar(
+        y=labels,
+        x=low,
+        base=base,
+        orientation='h',
+        name=f'-{delta_pct}%',
+        marker_color='#FF6B6B'
+    ))
+    fig_tornado.add_trace(go.Bar(
+        y=labels,
+        x=high,
+        base=base,
+        orientation='h',
+        name=f'+{delta_pct}%',
+        marker_color='#4ECDC4'
+    ))
+    fig_tornado.update_layout(
+        title=f'What Drives {metric_label} (±{delta_pct}% per input)',
+        barmode='overlay',
+        **_theme_layout(theme),
+        template=theme_template(theme),
+        height=600
+    )
+    return fig_tornado
+
+
+def build_sweep_figure(x_values, y_values, values, x_label, y_label, metric_label, lower_is_better,
+                       x_breakpoints, y_breakpoints, theme):
+    # One heatmap trace for the whole grid; NumPy arrays are sent to the
+    # browser as packed binary, so a million float32 cells stay a few MB.
+    # Infinite values (no payback) are left as gaps. License tier breakpoints
+    # on a devices axis are drawn as dashed lines.
+    values = np.asarray(values, dtype=np.float32)
+    fig_sweep = go.Figure(go.Heatmap(
+        x=np.asarray(x_values, dtype=np.float32),
+        y=np.asarray(y_values, dtype=np.float32),
+        z=np.where(np.isfinite(values), values, np.float32(np.nan)),
+        colorscale='Viridis',
+        reversescale=lower_is_better,
+        colorbar=dict(title=metric_label),
+        hoverongaps=False,
+        hovertemplate=f'{x_label}: %{{x:,.2f}}<br>{y_label}: %{{y:,.2f}}<br>{metric_label}: %{{z:,.1f}}<extra></extra>'
+    ))
+    line_color = THEME_COLORS[theme]["plot_color"]
+    for breakpoint in x_breakpoints:
+        fig_sweep.add_vline(x=breakpoint, line_dash='dash', line_color=line_color, line_width=1,
+                            annotation_text=f'{breakpoint:,.0f}', annotation_position='top')
+    for breakpoint in y_breakpoints:
+        fig_sweep.add_hline(y=breakpoint, line_dash='dash', line_color=line_color, line_width=1,
+                            annotation_text=f'{breakpoint:,.0f}', annotation_position='right')
+    fig_sweep.update_layout(
+        title=f'{metric_label} by {x_label} and {y_label}',
+        xaxis_title=x_label,
+        yaxis_title=y_label,
+        **_theme_layout(theme),
+        template=theme_template(theme),
+        height=550
+    )
+    return fig_sweep
+
+
+def build_editions_figure(editions, annual_savings, first_year_roi, payback_months, selected_edition, theme):
+    fig_editions = make_subplots(rows=1, cols=3,
+                                 subplot_titles=('Annual Savings ($)', 'First Year ROI (%)', 'Payback Period (months)'))
+    for column, values in enumerate([annual_savings, first_year_roi, payback_months], start=1):
+        values = np.asarray(values, dtype=float)
+        fig_editions.add_trace(go.Bar(
+            x=list(editions),
+            y=np.where(np.isfinite(values), values, np.nan),
+            marker_color=[THEME_COLORS[theme]["theme_color"] if name == selected_edition else color
+                          for name, color in zip(editions, EDITION_COLORS)],
+            showlegend=False
+        ), row=1, col=column)
+    fig_editions.update_layout(
+        title='Edition Comparison (selected edition highlighted)',
+        **_theme_layout(theme),
+        template=theme_template(theme),
+        height=450
+    )
+    return fig_editions
+
+
+def build_comparison_figure(comparison_data, theme):
+    colors = THEME_COLORS[theme]
+    columns = list(comparison_data)
+    rows = len(comparison_data[columns[0]])
+    fig_comparison = go.Figure(data=[
+        go.Table(
+            header=dict(
+                values=columns,
+                fill_color=colors["theme_color"],
+                font=dict(color='white', size=14),
+                align='center'
+            ),
+            cells=dict(
+                values=[list(comparison_data[column]) for column in columns],
+                fill_color=[[colors["plot_bg"], colors["card_bg"]] * rows],
+                font=dict(color=colors["plot_color"], size=12),
+                align=['left', 'center', 'center', 'center'],
+                height=30
+            )
+        )
+    ])
+    fig_comparison.update_layout(
+        # The default template, Streamlit's own chart theme under Streamlit
+        template=chart_template(pio.templates.default),
+        margin=dict(l=0, r=0, t=0, b=0),
+        height=500
+    )
+    return fig_comparison
@@ -0,0 +1,134 @@
+import functools
+
+import roi_charts
+
+# Static content of the roi-tool.py page. It lives in a module, rather than in
+# the script body, so it is built once per process instead of on every rerun.
+# Edition descriptions live in the pricing catalog with the prices (see
+# roi_catalog.py).
+
+# Qualitative rows of the detailed manual vs. automated comparison, per edition
+EDITION_COMPARISONS = {
+    "Free": {
+        "Response Time to Critical Updates": "Days to weeks",
+        "Consistency in Deployment": "Limited consistency",
+        "Ability to Track Compliance": "Basic reporting",
+        "Remote Troubleshooting Capabilities": "Basic",
+        "Bandwidth Usage Optimization": "Minimal",
+        "Security Risk Exposure": "Somewhat reduced",
+        "Staff Focus on Strategic Projects": "Limited improvement"
+    },
+    "Professional": {
+        "Response Time to Critical Updates": "1-2 days",
+        "Consistency in Deployment": "Good consistency",
+        "Ability to Track Compliance": "Improved reporting",
+        "Remote Troubleshooting Capabilities": "Good",
+        "Bandwidth Usage Optimization": "Optimized",
+        "Security Risk Exposure": "Moderately reduced",
+        "Staff Focus on Strategic Projects": "Moderate improvement"
+    },
+    "Enterprise": {
+        "Response Time to Critical Updates": "Hours to a day",
+        "Consistency in Deployment": "Very consistent",
+        "Ability to Track Compliance": "Comprehensive reporting",
+        "Remote Troubleshooting Capabilities": "Advanced",
+        "Bandwidth Usage Optimization": "Highly optimized",
+        "Security Risk Exposure": "Significantly reduced",
+        "Staff Focus on Strategic Projects": "Significant improvement"
+    },
+    "UEM": {
+        "Response Time to Critical Updates": "Hours",
+        "Consistency in Deployment": "Highly consistent",
+        "Ability to Track Compliance": "Comprehensive cross-platform reporting",
+        "Remote Troubleshooting Capabilities": "Advanced cross-platform",
+        "Bandwidth Usage Optimization": "Highly optimized",
+        "Security Risk Exposure": "Greatly reduced",
+        "Staff Focus on Strategic Projects": "Major improvement"
+    },
+    "Security": {
+        "Response Time to Critical Updates": "Near real-time",
+        "Consistency in Deployment": "Maximum consistency",
+        "Ability to Track Compliance": "Enterprise-grade security reporting",
+        "Remote Troubleshooting Capabilities": "Advanced with security focus",
+        "Bandwidth Usage Optimization": "Maximum optimization",
+        "Security Risk Exposure": "Minimized",
+        "Staff Focus on Strategic Projects": "Maximum improvement"
+    }
+}
+
+
+@functools.lru_cache(maxsize=None)
+def theme_css(theme):
+    # The page stylesheet for a theme from roi_charts.THEME_COLORS
+    colors = roi_charts.THEME_COLORS[theme]
+    return f"""
+<style>
+    .title {{
+        font-size: 42px;
+        font-weight: bold;
+        color: {colors['theme_color']};
+        margin-bottom: 0px;
+    }}
+    .subtitle {{
+        font-size: 20px;
+        color: {colors['text_color']};
+        margin-top: 0px;
+        margin-bottom: 30px;
+    }}
+    .section-header {{
+        font-size: 24px;
+        font-weight: bold;
+        color: {colors['theme_color']};
+        margin-top: 30px;
+        margin-bottom: 20px;
+    }}
+    .metric-container {{
+        background-color: {colors['card_bg']};
+        border-radius: 5px;
+        padding: 20px;
+        text-align: center;
+        box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+    }}
+    .metric-value {{
+        font-size: 36px;
+        font-weight: bold;
+        color: {colors['theme_color']};
+    }}
+    .metric-label {{
+        font-size: 16px;
+        color: {colors['text_color']};
+    }}
+    .stApp {{
+        background-color: {colors['background_color']};
+        color: {colors['text_color']};
+    }}
+    .stTextInput>div>div>input {{
+        color: {colors['text_color']};
+    }}
+    .stSelectbox>div>div>div {{
+        color: {colors['text_color']};
+    }}
+    .stNumberInput>div>div>input {{
+        color: {colors['text_color']};
+    }}
+    .st-bx {{
+        color: {colors['text_color']};
+    }}
+    .st-bs {{
+        color: {colors['text_color']};
+    }}
+
+    /* Block scrollbar on all elements */
+    ::-webkit-scrollbar {{
+        width: 10px;
+        background: {colors['background_color']};
+    }}
+    ::-webkit-scrollbar-track {{
+        background: {colors['background_color']};
+    }}
+    ::-webkit-scrollbar-thumb {{
+        background: {colors['theme_color']};
+        border-radius: 10px;
+    }}
+</style>
+"""
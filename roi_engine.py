@@ -0,0 +1,363 @@
+import numpy as np
+
+import roi_catalog
+
+# Vectorized ROI model behind roi-tool.py. Every input may be a scalar or a
+# NumPy array; inputs are broadcast together and every output is an array
+# with one entry per scenario, so one call can score any number of them.
+# Pricing and the per-edition assumptions come from a roi_catalog.Catalog;
+# functions that take a catalog use the active one when it is None.
+
+EDITIONS = roi_catalog.EDITIONS
+EDITION_INDEX = {name: code for code, name in enumerate(EDITIONS)}
+
+# Default projection horizon in years. Discount rates and license price
+# escalation are annual percentages; cash flows fall at the end of each year
+# and the implementation cost is paid upfront.
+PROJECTION_YEARS = 5
+DEFAULT_DISCOUNT_RATE = 0.0
+DEFAULT_LICENSE_ESCALATION = 0.0
+
+# IRR solver settings: Newton steps from a payback-based guess, then bisection
+# for scenarios Newton leaves unconverged
+IRR_NEWTON_ITERATIONS = 50
+IRR_BISECTION_ITERATIONS = 200
+IRR_TOLERANCE = 1e-10
+# A root is accepted when its NPV is within this fraction of the total flows
+IRR_RESIDUAL = 1e-6
+
+BENEFIT_LABELS = (
+    ("Direct Labor Savings", "annual_labor_savings"),
+    ("Compliance Reporting Savings", "annual_compliance_savings"),
+    ("Bandwidth Cost Savings", "bandwidth_savings_adjusted"),
+    ("Security Incident Reduction Value", "security_incidents_reduction_value"),
+    ("Downtime Cost Savings", "downtime_cost_saved"),
+)
+
+
+def edition_codes(edition):
+    # Accepts edition names or integer codes and returns integer codes
+    edition = np.asarray(edition)
+    if edition.dtype.kind in "iu":
+        return edition.astype(np.intp)
+    names, inverse = np.unique(edition, return_inverse=True)
+    try:
+        lookup = np.array([EDITION_INDEX[str(name)] for name in names], dtype=np.intp)
+    except KeyError as e:
+        raise ValueError(f"Unknown edition: {e.args[0]}")
+    return lookup[inverse].reshape(edition.shape)
+
+
+def license_cost(devices, edition, catalog=None):
+    # Annual license cost for arrays of device counts and editions
+    catalog = catalog or roi_catalog.current()
+    codes = edition_codes(edition)
+    devices, codes = np.broadcast_arrays(np.atleast_1d(np.asarray(devices, dtype=float)),
+                                         np.atleast_1d(codes))
+    tier_limits = catalog.tier_limits
+    tier = np.minimum(np.searchsorted(tier_limits, devices), len(tier_limits) - 1)
+    flat = codes * len(tier_limits) + tier
+    tiered = catalog.tier_start_cost[flat] + (devices - catalog.tier_starts[tier]) * catalog.tier_rate[flat]
+    return np.where(devices <= catalog.base_devices, catalog.base_prices[codes], tiered)
+
+
+def default_benefits(edition, catalog=None):
+    # Default security, compliance and downtime benefit inputs for editions
+    catalog = catalog or roi_catalog.current()
+    codes = np.atleast_1d(edition_codes(edition))
+    return {
+        "security_benefit": np.minimum(catalog.security_benefit_max[codes], catalog.default_security_benefit),
+        "compliance_time_saved": catalog.default_compliance_hours[codes],
+        "downtime_reduction": np.minimum(catalog.downtime_reduction_max[codes], catalog.default_downtime_reduction),
+    }
+
+
+def _npv_at(cash_flows, rate):
+    # NPV and its derivative with respect to rate for each row of cash_flows
+    periods = np.arange(cash_flows.shape[1])
+    growth = (1 + rate)[:, None]
+    with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+        discounted = cash_flows * growth ** -periods
+        return discounted.sum(axis=1), -(discounted * periods).sum(axis=1) / growth[:, 0]
+
+
+def _npv_converged(flows, rate):
+    # Whether the NPV at rate is zero to within IRR_RESIDUAL of the total
+    # flows; NaN rates and NPVs, as near -100% where they overflow, do not
+    # count as converged
+    npv, _ = _npv_at(flows, rate)
+    return np.abs(npv) <= IRR_RESIDUAL * np.abs(flows).sum(axis=1)
+
+
+def irr(cash_flows):
+    # Internal rate of return in percent for each row of cash_flows, where
+    # column t is the net cash flow at the end of year t and column 0 is
+    # upfront. Scenarios with no outlay and no negative flows have an infinite
+    # IRR, like ROI without a cost. Scenarios whose NPV does not change sign
+    # above -100%, including flows with two IRRs, have an undefined (NaN) IRR.
+    cash_flows = np.atleast_2d(np.asarray(cash_flows, dtype=float))
+    rate = np.full(len(cash_flows), np.nan)
+    rate[(cash_flows >= 0).all(axis=1) & (cash_flows > 0).any(axis=1)] = np.inf
+
+    # The root is bracketed between just above -100% and a rate high enough
+    # that the first nonzero flow outweighs the discounted sum of all later
+    # flows
+    candidates = np.flatnonzero((cash_flows > 0).any(axis=1) & (cash_flows < 0).any(axis=1))
+    flows = cash_flows[candidates]
+    first_flow = np.abs(flows[np.arange(len(flows)), np.argmax(flows != 0, axis=1)])
+    low = np.full(len(candidates), -1 + 1e-12)
+    high = np.abs(flows).sum(axis=1) / first_flow
+    npv_low, _ = _npv_at(flows, low)
+    npv_high, _ = _npv_at(flows, high)
+    bracketed = np.sign(npv_low) * np.sign(npv_high) < 0
+    candidates, flows = candidates[bracketed], flows[bracketed]
+    low, high, npv_low = low[bracketed], high[bracketed], npv_low[bracketed]
+    if not len(candidates):
+        return rate * 100
+
+    # Newton's method from a guess based on the average yearly return on the
+    # outlay; steps that would cross -100% go halfway towards it instead
+    outlay = -flows[:, 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        guess = flows[:, 1:].sum(axis=1) / outlay / max(flows.shape[1] - 1, 1) - 1
+    guess = np.clip(np.where(outlay > 0, guess, 0.1), low, high)
+    solution = np.full(len(flows), np.nan)
+    active = np.arange(len(flows))
+    for _ in range(IRR_NEWTON_ITERATIONS):
+        npv, slope = _npv_at(flows[active], guess)
+        with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+            step = npv / slope
+        usable = np.isfinite(step)
+        guess = np.where(usable, np.maximum(guess - step, (guess - 1) / 2), guess)
+        done = usable & (np.abs(step) <= IRR_TOLERANCE * (1 + np.abs(guess)))
+        solution[active[done]] = guess[done]
+        active, guess = active[~done & usable], guess[~done & usable]
+        if not len(active):
+            break
+    solution[~_npv_converged(flows, solution)] = np.nan
+
+    # Bisection inside the bracket wherever Newton did not converge
+    pending = np.flatnonzero(np.isnan(solution))
+    if len(pending):
+        pending_flows, low, high, npv_low = flows[pending], low[pending], high[pending], npv_low[pending]
+        for _ in range(IRR_BISECTION_ITERATIONS):
+            middle = (low + high) / 2
+            npv_middle, _ = _npv_at(pending_flows, middle)
+            left = np.sign(npv_middle) == np.sign(npv_low)
+            low = np.where(left, middle, low)
+            npv_low = np.where(left, npv_middle, npv_low)
+            high = np.where(left, high, middle)
+        solution[pending] = (low + high) / 2
+        # A root the bisection cannot pin down, such as one so close to -100%
+        # that the NPV overflows, is undefined rather than a wrong rate
+        unresolved = pending[~_npv_converged(pending_flows, solution[pending])]
+        solution[unresolved] = np.nan
+
+    rate[candidates] = solution
+    return rate * 100
+
+
+def irr_status(rate):
+    # "defined", "infinite" (no outlay) or "undefined" (no sign change) for
+    # each IRR, so exports can tell an undefined IRR from an unbounded one
+    rate = np.asarray(rate, dtype=float)
+    return np.where(np.isfinite(rate), "defined", np.where(np.isinf(rate), "infinite", "undefined"))
+
+
+def calculate_roi(devices, applications, updates_per_app, hours_per_update, hourly_rate,
+                  automation_efficiency, edition, license_cost, implementation_cost,
+                  security_benefit, compliance_time_saved, downtime_reduction, bandwidth_savings,
+                  incident_rate=None, avg_incident_cost=None,
+                  downtime_hours_per_device=None, efficiency_factor=None, edition_value_factor=None,
+                  fleet_incident_factor=1.0, fleet_downtime_factor=1.0, patch_effort_factor=1.0,
+                  years=PROJECTION_YEARS, discount_rate=DEFAULT_DISCOUNT_RATE,
+                  license_escalation=DEFAULT_LICENSE_ESCALATION, catalog=None, projections=True):
+    # The incident rate and the per-edition model constants default to the
+    # catalog's values and can be overridden per scenario. The fleet factors
+    # scale the per-device incident rate and downtime hours by the device
+    # class mix of an inventory (see roi_fleet.py); 1.0 treats every device
+    # alike. patch_effort_factor likewise scales the hours per update by the
+    # effort mix of a software inventory (see roi_software.py). years sets
+    # the projection horizon and is shared by every scenario of a call.
+    # Without projections only the annual figures up to payback_months are
+    # returned, skipping the yearly projections, NPV, IRR and feature values.
+    catalog = catalog or roi_catalog.current()
+    codes = np.atleast_1d(edition_codes(edition))
+    if incident_rate is None:
+        incident_rate = catalog.security_incident_rate
+    if avg_incident_cost is None:
+        avg_incident_cost = catalog.avg_incident_cost[codes]
+    if downtime_hours_per_device is None:
+        downtime_hours_per_device = catalog.downtime_hours_per_device[codes]
+    if efficiency_factor is None:
+        efficiency_factor = catalog.efficiency_factor[codes]
+    if edition_value_factor is None:
+        edition_value_factor = catalog.edition_value_factors[codes]
+    (devices, applications, updates_per_app, hours_per_update, hourly_rate,
+     automation_efficiency, license_cost, implementation_cost, security_benefit,
+     compliance_time_saved, downtime_reduction, bandwidth_savings, incident_rate,
+     avg_incident_cost, downtime_hours_per_device, efficiency_factor, edition_value_factor,
+     fleet_incident_factor, fleet_downtime_factor, patch_effort_factor, discount_rate, license_escalation,
+     codes) = np.broadcast_arrays(
+        *[np.atleast_1d(np.asarray(value, dtype=float)) for value in (
+            devices, applications, updates_per_app, hours_per_update, hourly_rate,
+            automation_efficiency, license_cost, implementation_cost, security_benefit,
+            compliance_time_saved, downtime_reduction, bandwidth_savings, incident_rate,
+            avg_incident_cost, downtime_hours_per_device, efficiency_factor, edition_value_factor,
+            fleet_incident_factor, fleet_downtime_factor, patch_effort_factor, discount_rate, license_escalation)],
+        codes)
+
+    total_updates = applications * updates_per_app
+    total_manual_hours = total_updates * hours_per_update * patch_effort_factor
+    total_manual_cost = total_manual_hours * hourly_rate
+
+    automation_factor = 1 - (automation_efficiency / 100)
+    total_automated_hours = total_manual_hours * automation_factor
+    total_automated_cost = total_automated_hours * hourly_rate
+
+    annual_labor_savings = total_manual_cost - total_automated_cost
+
+    security_incidents_reduction_value = ((security_benefit / 100) * (devices * incident_rate * fleet_incident_factor)
+                                          * avg_incident_cost)
+
+    downtime_hours_saved = ((downtime_reduction / 100)
+                            * (devices * downtime_hours_per_device * fleet_downtime_factor))
+    downtime_cost_saved = downtime_hours_saved * hourly_rate * efficiency_factor
+
+    bandwidth_savings_adjusted = bandwidth_savings * catalog.bandwidth_factor[codes]
+
+    annual_compliance_savings = compliance_time_saved * hourly_rate
+
+    total_annual_savings = (annual_labor_savings + annual_compliance_savings +
+                            bandwidth_savings_adjusted + security_incidents_reduction_value +
+                            downtime_cost_saved)
+
+    adjusted_annual_savings = total_annual_savings * edition_value_factor
+
+    total_first_year_cost = license_cost + implementation_cost
+    subsequent_years_cost = license_cost
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        first_year_roi = np.where(
+            total_first_year_cost > 0,
+            (adjusted_annual_savings - total_first_year_cost) / total_first_year_cost * 100,
+            np.inf)
+        subsequent_roi = np.where(
+            subsequent_years_cost > 0,
+            (adjusted_annual_savings - subsequent_years_cost) / subsequent_years_cost * 100,
+            np.inf)
+        payback_months = np.where(
+            (adjusted_annual_savings > total_first_year_cost) & (total_first_year_cost > 0),
+            total_first_year_cost / adjusted_annual_savings * 12,
+            np.inf)
+
+    results = {
+        "edition_code": codes,
+        "license_cost": license_cost,
+        "implementation_cost": implementation_cost,
+        "total_updates": total_updates,
+        "total_manual_hours": total_manual_hours,
+        "total_manual_cost": total_manual_cost,
+        "total_automated_hours": total_automated_hours,
+        "total_automated_cost": total_automated_cost,
+        "annual_labor_savings": annual_labor_savings,
+        "security_incidents_reduction_value": security_incidents_reduction_value,
+        "downtime_hours_saved": downtime_hours_saved,
+        "downtime_cost_saved": downtime_cost_saved,
+        "bandwidth_savings_adjusted": bandwidth_savings_adjusted,
+        "annual_compliance_savings": annual_compliance_savings,
+        "total_annual_savings": total_annual_savings,
+        "adjusted_annual_savings": adjusted_annual_savings,
+        "total_first_year_cost": total_first_year_cost,
+        "subsequent_years_cost": subsequent_years_cost,
+        "first_year_roi": first_year_roi,
+        "subsequent_roi": subsequent_roi,
+        "payback_months": payback_months,
+    }
+
+    if not projections:
+        return results
+
+    # Yearly projections have shape (scenarios, years). The license price grows
+    # by license_escalation each year after the first, and each year's net
+    # savings are discounted back to the start of year one.
+    years = int(years)
+    if years < 1:
+        raise ValueError("The projection horizon must be at least one year")
+    first_year = np.arange(years) == 0
+    escalation = np.cumprod(np.where(first_year, 1.0, 1 + license_escalation[:, None] / 100), axis=1)
+    discount = np.cumprod(np.broadcast_to(1 / (1 + discount_rate[:, None] / 100), (len(codes), years)), axis=1)
+    yearly_license_cost = license_cost[:, None] * escalation
+    costs_manual = np.repeat(total_manual_cost[:, None], years, axis=1)
+    costs_automated = total_automated_cost[:, None] + yearly_license_cost + np.where(
+        first_year, implementation_cost[:, None], 0.0)
+    net_savings = adjusted_annual_savings[:, None] - yearly_license_cost
+    cumulative_savings = np.cumsum(net_savings, axis=1) - implementation_cost[:, None]
+    discounted_cumulative_savings = np.cumsum(net_savings * discount, axis=1) - implementation_cost[:, None]
+    internal_rate_of_return = irr(np.concatenate([-implementation_cost[:, None], net_savings], axis=1))
+
+    results.update({
+        "costs_manual": costs_manual,
+        "costs_automated": costs_automated,
+        "cumulative_savings": cumulative_savings,
+        "discounted_cumulative_savings": discounted_cumulative_savings,
+        "cumulative_net_savings": cumulative_savings[:, -1],
+        "npv": discounted_cumulative_savings[:, -1],
+        "irr": internal_rate_of_return,
+    })
+
+    # Edition-specific feature values have shape (scenarios, len(catalog.edition_features));
+    # features not included in a scenario's edition are zero
+    features = catalog.edition_features
+    included = np.arange(len(features)) < catalog.edition_feature_count[codes][:, None]
+    bases = {"devices": devices}
+    feature_values = np.zeros((len(codes), len(features)))
+    for i, (_, basis, multiplier) in enumerate(features):
+        feature_values[:, i] = bases.get(basis, results.get(basis)) * multiplier
+    results["feature_values"] = np.where(included, feature_values, 0.0)
+    results["feature_included"] = included
+    return results
+
+
+def scenario(results, index=0, catalog=None):
+    # Plain-Python view of one scenario of a calculate_roi result, shaped the
+    # way roi-tool.py displays and exports it; catalog names the features
+    catalog = catalog or roi_catalog.current()
+    row = {}
+    for key, values in results.items():
+        if key in ("feature_values", "feature_included"):
+            continue
+        value = values[index]
+        row[key] = value.tolist() if np.ndim(value) else value.item()
+    row["edition"] = EDITIONS[row["edition_code"]]
+    row["edition_specific_features"] = {
+        name: float(value)
+        for (name, _, _), value, included in zip(catalog.edition_features, results["feature_values"][index],
+                                                 results["feature_included"][index])
+        if included
+    }
+    row["total_benefits"] = {label: row[key] for label, key in BENEFIT_LABELS}
+    for feature, value in row["edition_specific_features"].items():
+        if value > 0:
+            row["total_benefits"][f"{feature} ({row['edition']} Edition)"] = value
+    return row
+
+
+def compare_editions(inputs, use_edition_defaults=True, reprice_license=True, catalog=None):
+    # Scores one scenario under every edition in a single call; row i of the
+    # result is EDITIONS[i]. Benefit inputs can follow each edition's defaults
+    # and the license cost can be repriced per edition.
+    catalog = catalog or roi_catalog.current()
+    codes = np.arange(len(EDITIONS))
+    batch = dict(inputs, edition=codes, catalog=catalog)
+    if reprice_license:
+        batch["license_cost"] = license_cost(inputs["devices"], codes, catalog=catalog)
+    if use_edition_defaults:
+        batch.update(default_benefits(codes, catalog=catalog))
+    return calculate_roi(**batch)
+
+
+def calculate_scenario(catalog=None, **inputs):
+    # calculate_roi for a single scenario, returned as plain Python values
+    catalog = catalog or roi_catalog.current()
+    return scenario(calculate_roi(catalog=catalog, **inputs), catalog=catalog)
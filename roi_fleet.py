@@ -0,0 +1,220 @@
+import argparse
+import collections
+import json
+import sys
+import time
+
+import roi_catalog
+
+# Fleet inventory ingestion: reads an endpoint inventory export with one row
+# per device, giving its site, OS, device type and criticality, and counts the
+# devices per site and device class (type and criticality). The file is read
+# in chunks of typed (categorical) columns and only the group counts are kept,
+# so memory use depends on the chunk size and the number of distinct groups,
+# not on the size of the export.
+#
+# A device class weighs the per-device incident rate and downtime hours of the
+# model by the catalog's factors for its device type, times the factor for its
+# criticality; types and criticality levels the catalog does not list count as
+# 1.0. The device-weighted averages of those factors over the fleet go into
+# calculate_roi as fleet_incident_factor and fleet_downtime_factor, next to
+# the total device count.
+#
+# pandas is imported when a file is read, so the calculator can import this
+# module without loading it on its first page.
+#
+# The calculator can only read an export it is sent, and holds the upload in
+# memory, so a very large export is summarized where it lives instead: the
+# summary file written with -o also holds the group counts, which
+# read_aggregate loads back for the calculator to weigh under its own catalog.
+#
+#     python roi_fleet.py inventory.csv
+#     python roi_fleet.py inventory.csv -o fleet.json --chunk-size 500000
+
+REQUIRED_COLUMNS = ("site", "device_type")
+OPTIONAL_COLUMNS = ("os", "criticality")
+
+# Header names exports commonly use for the inventory columns
+COLUMN_ALIASES = {
+    "location": "site",
+    "operating_system": "os",
+    "type": "device_type",
+    "device_category": "device_type",
+    "business_criticality": "criticality",
+}
+
+# calculate_roi inputs of the device class mix, which a saved scenario keeps
+MIX_INPUTS = ("fleet_incident_factor", "fleet_downtime_factor")
+
+UNKNOWN = "Unknown"
+DEFAULT_CHUNK_SIZE = 200_000
+
+
+def column_name(header, aliases=COLUMN_ALIASES):
+    # Inventory column for an export header such as "Device Type", or the
+    # normalized header when it is not one
+    name = str(header).strip().lower().replace(" ", "_").replace("-", "_")
+    return aliases.get(name, name)
+
+
+def _label(value):
+    value = str(value).strip()
+    return value or UNKNOWN
+
+
+def read_inventory(source, chunk_size=DEFAULT_CHUNK_SIZE, required=REQUIRED_COLUMNS, optional=OPTIONAL_COLUMNS,
+                   aliases=COLUMN_ALIASES):
+    # Yields chunks of the required and optional columns of source (a path
+    # or file object), renamed to those column names, as categoricals; the
+    # defaults are the fleet inventory's columns
+    import pandas as pd
+
+    wanted = set(required + optional)
+    chunks = pd.read_csv(source, chunksize=chunk_size, usecols=lambda header: column_name(header, aliases) in wanted,
+                         dtype="category", keep_default_na=False, skipinitialspace=True)
+    for chunk in chunks:
+        chunk.columns = [column_name(header, aliases) for header in chunk.columns]
+        missing = [name for name in required if name not in chunk]
+        if missing:
+            raise ValueError(f"Missing inventory columns: {', '.join(missing)}")
+        yield chunk
+
+
+def aggregate_inventory(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Device counts of an inventory per (site, device type, criticality) and
+    # per OS, as a dict with the total device count
+    groups = collections.Counter()
+    os_counts = collections.Counter()
+    devices = 0
+    for chunk in read_inventory(source, chunk_size):
+        keys = [name for name in ("site", "device_type", "criticality") if name in chunk]
+        for key, count in chunk.groupby(keys, observed=True, sort=False).size().items():
+            key = dict(zip(keys, key if isinstance(key, tuple) else (key,)))
+            groups[_label(key["site"]), _label(key["device_type"]), _label(key.get("criticality", ""))] += count
+        if "os" in chunk:
+            for name, count in chunk["os"].value_counts(sort=False).items():
+                if count:
+                    os_counts[_label(name)] += count
+        devices += len(chunk)
+    if not devices:
+        raise ValueError("The inventory has no devices")
+    return {"devices": devices, "groups": dict(groups), "os_counts": dict(os_counts)}
+
+
+def aggregate_document(aggregate):
+    # JSON-ready form of an aggregate_inventory result, for read_aggregate
+    return {
+        "devices": aggregate["devices"],
+        "groups": [[site, device_type, criticality, count]
+                   for (site, device_type, criticality), count in aggregate["groups"].items()],
+        "os_counts": aggregate["os_counts"],
+    }
+
+
+def read_aggregate(source):
+    # The aggregate_inventory result saved in a summary file written with -o
+    # (a path or file object)
+    try:
+        if hasattr(source, "read"):
+            document = json.load(source)
+        else:
+            with open(source) as f:
+                document = json.load(f)
+        inventory = document["inventory"]
+        groups = {(str(site), str(device_type), str(criticality)): int(count)
+                  for site, device_type, criticality, count in inventory["groups"]}
+        devices = int(inventory["devices"])
+        os_counts = {str(name): int(count) for name, count in inventory["os_counts"].items()}
+    except (UnicodeDecodeError, KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError("Not a fleet summary written by roi_fleet.py -o")
+    if devices < 1 or sum(groups.values()) != devices:
+        raise ValueError("The fleet summary's device counts do not add up")
+    return {"devices": devices, "groups": groups, "os_counts": os_counts}
+
+
+def class_factors(device_type, criticality, catalog):
+    # (incident factor, downtime factor) of a device class
+    incident, downtime = catalog.device_type_factors.get(device_type.lower(), (1.0, 1.0))
+    weight = catalog.criticality_factors.get(criticality.lower(), 1.0)
+    return incident * weight, downtime * weight
+
+
+def summarize(aggregate, catalog=None):
+    # The fleet factors of an aggregate_inventory result under catalog, with
+    # per-class and per-site totals for display, largest first. The weighted
+    # device counts are the devices times their class factors.
+    catalog = catalog or roi_catalog.current()
+    classes = collections.defaultdict(int)
+    sites = collections.defaultdict(lambda: [0, 0.0, 0.0])
+    incident_devices = downtime_devices = 0.0
+    for (site, device_type, criticality), count in aggregate["groups"].items():
+        incident, downtime = class_factors(device_type, criticality, catalog)
+        classes[device_type, criticality] += count
+        totals = sites[site]
+        totals[0] += count
+        totals[1] += count * incident
+        totals[2] += count * downtime
+        incident_devices += count * incident
+        downtime_devices += count * downtime
+    devices = aggregate["devices"]
+    unmatched = sorted({device_type for device_type, _ in classes
+                        if device_type.lower() not in catalog.device_type_factors}
+                       | {criticality for _, criticality in classes
+                          if criticality.lower() not in catalog.criticality_factors})
+    return {
+        "devices": devices,
+        "sites": len(sites),
+        "fleet_incident_factor": incident_devices / devices,
+        "fleet_downtime_factor": downtime_devices / devices,
+        "classes": sorted(((device_type, criticality, count) + class_factors(device_type, criticality, catalog)
+                           for (device_type, criticality), count in classes.items()),
+                          key=lambda row: -row[2]),
+        "site_totals": sorted(((site,) + tuple(totals) for site, totals in sites.items()), key=lambda row: -row[1]),
+        "os_counts": dict(sorted(aggregate["os_counts"].items(), key=lambda item: -item[1])),
+        "unmatched": unmatched,
+    }
+
+
+def engine_inputs(summary):
+    # calculate_roi inputs for a fleet summary
+    return {
+        "devices": summary["devices"],
+        "fleet_incident_factor": summary["fleet_incident_factor"],
+        "fleet_downtime_factor": summary["fleet_downtime_factor"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize an endpoint inventory export for the ROI calculator.")
+    parser.add_argument("input", help="inventory CSV with one device per row")
+    parser.add_argument("-o", "--output",
+                        help="also write the summary to this JSON file, which the calculator can load")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows read at a time (default {DEFAULT_CHUNK_SIZE:,})")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+
+    try:
+        start = time.perf_counter()
+        aggregate = aggregate_inventory(args.input, chunk_size=args.chunk_size)
+        summary = summarize(aggregate)
+        elapsed = time.perf_counter() - start
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(dict(summary, inventory=aggregate_document(aggregate)), f, indent=2)
+                f.write("\n")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Read {summary['devices']:,} devices at {summary['sites']:,} sites in {elapsed:.1f}s"
+          f" ({summary['devices'] / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+    print(json.dumps(engine_inputs(summary), indent=2))
+    if summary["unmatched"]:
+        print(f"Not in the catalog, counted with factor 1.0: {', '.join(summary['unmatched'])}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import functools
+import threading
+
+import streamlit as st
+
+import roi_catalog
+import roi_charts
+import roi_engine
+import roi_fleet
+import roi_result_cache
+import roi_simulation
+import roi_software
+
+# Memoized calculations and figure builders shared by every rerun and session
+# of roi-tool.py. They are created here, once per process, rather than in the
+# script body where they would be rebuilt on each rerun. Each cache is keyed
+# on the canonical inputs, the theme and the pricing catalog version (see
+# memoize_priced), holds at most CACHE_MAX_ENTRIES results and evicts the
+# least recently used beyond that. Figures are cached as shared objects
+# because unpickling a Plotly figure re-validates every property;
+# st.plotly_chart only reads them. Sweep grids can be megabytes each, so
+# their caches hold fewer. Scenario results are also shared between server
+# processes through roi_result_cache, which this cache sits in front of; the
+# lookups this cache answers are counted there as memory hits.
+# Results computed from an uploaded file are keyed on the upload rather than
+# its contents (see memoize_upload), so a large file is read once.
+
+CACHE_MAX_ENTRIES = 256
+SWEEP_CACHE_MAX_ENTRIES = 8
+UPLOAD_CACHE_MAX_ENTRIES = 16
+
+
+def memoize(func, max_entries=CACHE_MAX_ENTRIES):
+    return st.cache_data(max_entries=max_entries, show_spinner=False)(func)
+
+
+def memoize_priced(func, max_entries=CACHE_MAX_ENTRIES):
+    # memoize for calculations that take a catalog: results are keyed on the
+    # catalog fingerprint, so a reloaded catalog gets fresh results, and the
+    # catalog itself is passed through without hashing its arrays
+    @functools.wraps(func)
+    def cached(*args, catalog_fingerprint, _catalog, **kwargs):
+        return func(*args, catalog=_catalog, **kwargs)
+
+    cached = memoize(cached, max_entries)
+
+    @functools.wraps(func)
+    def wrapper(*args, catalog=None, **kwargs):
+        catalog = catalog or roi_catalog.current()
+        return cached(*args, catalog_fingerprint=catalog.fingerprint, _catalog=catalog, **kwargs)
+    return wrapper
+
+
+def memoize_upload(func, max_entries=UPLOAD_CACHE_MAX_ENTRIES):
+    # memoize for functions of a file from st.file_uploader: results are
+    # keyed on the upload's file id, name and size instead of hashing what
+    # can be hundreds of megabytes on every rerun, and the file is read from
+    # its start
+    @functools.wraps(func)
+    def cached(*, upload_key, _uploaded_file, **kwargs):
+        _uploaded_file.seek(0)
+        return func(_uploaded_file, **kwargs)
+
+    cached = memoize(cached, max_entries)
+
+    @functools.wraps(func)
+    def wrapper(uploaded_file, **kwargs):
+        return cached(upload_key=(uploaded_file.file_id, uploaded_file.name, uploaded_file.size),
+                      _uploaded_file=uploaded_file, **kwargs)
+    return wrapper
+
+
+def memoize_figure(func, max_entries=CACHE_MAX_ENTRIES):
+    return st.cache_resource(max_entries=max_entries, show_spinner=False)(func)
+
+
+_scenario_computed = threading.local()
+
+
+def _shared_scenario(*args, **kwargs):
+    _scenario_computed.flag = True
+    return roi_result_cache.calculate_scenario(*args, **kwargs)
+
+
+_memoized_scenario = memoize_priced(_shared_scenario)
+
+
+@functools.wraps(roi_result_cache.calculate_scenario)
+def calculate_scenario(*args, **kwargs):
+    # The memoized scenario, counting a result that did not reach the shared
+    # cache as a memory hit
+    _scenario_computed.flag = False
+    result = _memoized_scenario(*args, **kwargs)
+    if not _scenario_computed.flag:
+        roi_result_cache.count_memory_hit()
+    return result
+
+
+compare_editions = memoize_priced(roi_engine.compare_editions)
+run_sensitivity = memoize_priced(roi_simulation.run_sensitivity)
+summarize_monte_carlo = memoize_priced(roi_simulation.summarize_monte_carlo)
+goal_seek = memoize_priced(roi_simulation.goal_seek)
+run_sweep = memoize_priced(roi_simulation.run_sweep, SWEEP_CACHE_MAX_ENTRIES)
+aggregate_inventory = memoize_upload(roi_fleet.aggregate_inventory)
+read_inventory_summary = memoize_upload(roi_fleet.read_aggregate)
+aggregate_software = memoize_upload(roi_software.aggregate_software)
+read_software_summary = memoize_upload(roi_software.read_aggregate)
+
+figures = {
+    "hours": memoize_figure(roi_charts.build_hours_figure),
+    "cost": memoize_figure(roi_charts.build_cost_figure),
+    "process": memoize_figure(roi_charts.build_process_figure),
+    "projection": memoize_figure(roi_charts.build_projection_figure),
+    "payback_histogram": memoize_figure(roi_charts.build_payback_histogram_figure),
+    "benefits": memoize_figure(roi_charts.build_benefits_figure),
+    "pie": memoize_figure(roi_charts.build_pie_figure),
+    "benefits_overview": memoize_figure(roi_charts.build_benefits_overview_figure),
+    "tornado": memoize_figure(roi_charts.build_tornado_figure),
+    "editions": memoize_figure(roi_charts.build_editions_figure),
+    "comparison": memoize_figure(roi_charts.build_comparison_figure),
+    "sweep": memoize_figure(roi_charts.build_sweep_figure, SWEEP_CACHE_MAX_ENTRIES),
+}
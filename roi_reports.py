@@ -0,0 +1,210 @@
+import numpy as np
+
+import roi_catalog
+import roi_engine
+
+# Report metrics shared by the CSV export in roi-tool.py and the batch CLI in
+# roi_batch.py, as (label, key, format, text for an infinite value). Keys name
+# a calculator input or a roi_engine.calculate_roi output, besides hours_saved
+# and irr_status (see roi_engine.irr_status). Undefined (NaN) values are
+# reported as N/A, and an undefined IRR as Undefined.
+#
+# pandas and fpdf are imported by the functions that use them, so importing
+# this module for the calculator's first page costs neither; they load when a
+# report is first built.
+REPORT_METRICS = (
+    ("Number of Devices", "devices", "{}", None),
+    ("Number of Applications", "applications", "{}", None),
+    ("Updates per Application", "updates_per_app", "{:g}", None),
+    ("Hours per Update (Manual)", "hours_per_update", "{}", None),
+    ("Technician Hourly Rate", "hourly_rate", "{}", None),
+    ("Selected Edition", "edition", "{}", None),
+    ("Automation Efficiency", "automation_efficiency", "{}%", None),
+    ("Annual License Cost", "license_cost", "${:,.2f}", None),
+    ("Implementation Cost", "implementation_cost", "${:,.2f}", None),
+    ("Total Manual Hours", "total_manual_hours", "{:,.2f}", None),
+    ("Total Automated Hours", "total_automated_hours", "{:,.2f}", None),
+    ("Hours Saved", "hours_saved", "{:,.2f}", None),
+    ("Total Manual Cost", "total_manual_cost", "${:,.2f}", None),
+    ("Total Automated Cost", "total_automated_cost", "${:,.2f}", None),
+    ("Direct Labor Savings", "annual_labor_savings", "${:,.2f}", None),
+    ("Compliance Reporting Savings", "annual_compliance_savings", "${:,.2f}", None),
+    ("Bandwidth Cost Savings", "bandwidth_savings_adjusted", "${:,.2f}", None),
+    ("Security Incident Reduction Value", "security_incidents_reduction_value", "${:,.2f}", None),
+    ("Downtime Cost Savings", "downtime_cost_saved", "${:,.2f}", None),
+    ("Total Annual Savings", "adjusted_annual_savings", "${:,.2f}", None),
+    ("First Year ROI", "first_year_roi", "{:.2f}%", "∞"),
+    ("Subsequent Years ROI", "subsequent_roi", "{:.2f}%", "∞"),
+    ("Payback Period (Months)", "payback_months", "{:.2f}", "N/A"),
+    ("Internal Rate of Return", "irr", "{:.2f}%", "∞"),
+    ("IRR Status", "irr_status", "{}", None),
+    ("Projection Horizon (Years)", "years", "{}", None),
+    ("Discount Rate", "discount_rate", "{}%", None),
+    ("Annual License Price Escalation", "license_escalation", "{}%", None),
+    ("Cumulative Net Savings", "cumulative_net_savings", "${:,.2f}", None),
+    ("Net Present Value", "npv", "${:,.2f}", None),
+)
+
+EDITION_CONCLUSIONS = {
+    "Free": "The Free Edition provides basic endpoint management capabilities suitable for small environments up to 50 devices.",
+    "Professional": "The Professional Edition offers strong ROI for LAN environments with significant automation benefits.",
+    "Enterprise": "The Enterprise Edition provides enhanced value for multi-location environments with centralized management needs.",
+    "UEM": "The UEM Edition delivers comprehensive device management across all platforms with advanced deployment capabilities.",
+    "Security": "The Security Edition offers maximum protection and management capabilities, ideal for security-conscious organizations.",
+}
+
+
+def report_rows(row):
+    # Metric labels and formatted values for one scenario; row holds the
+    # calculator inputs and the roi_engine.scenario view of its results
+    values = dict(row, hours_saved=row["total_manual_hours"] - row["total_automated_hours"],
+                  irr_status=roi_engine.irr_status(row["irr"]).item())
+    metrics, formatted = [], []
+    for label, key, fmt, infinite_text in REPORT_METRICS:
+        metrics.append(label)
+        if infinite_text is not None and values[key] == float('inf'):
+            formatted.append(infinite_text)
+        elif values[key] != values[key]:
+            formatted.append("Undefined" if key == "irr" else "N/A")
+        else:
+            formatted.append(fmt.format(values[key]))
+    if row["edition"] != "Free":
+        for feature, value in row["edition_specific_features"].items():
+            metrics.append(f"{feature} Value")
+            formatted.append(f"${value:,.2f}")
+    return metrics, formatted
+
+
+def report_frame(inputs, results, catalog=None):
+    # One row per scenario with a column per report metric, as plain numbers,
+    # followed by every edition-specific feature value of the catalog (zero
+    # where the scenario's edition does not include the feature)
+    import pandas as pd
+
+    catalog = catalog or roi_catalog.current()
+    values = dict(inputs, **results)
+    values["hours_saved"] = results["total_manual_hours"] - results["total_automated_hours"]
+    values["irr_status"] = roi_engine.irr_status(results["irr"])
+    values["edition"] = np.asarray(roi_engine.EDITIONS)[results["edition_code"]]
+    rows = len(results["edition_code"])
+    frame = pd.DataFrame({label: np.broadcast_to(values[key], rows) for label, key, _, _ in REPORT_METRICS})
+    for i, (feature, _, _) in enumerate(catalog.edition_features):
+        frame[f"{feature} Value"] = results["feature_values"][:, i]
+    return frame
+
+
+def csv_report(row):
+    # The single-scenario CSV export as bytes
+    import pandas as pd
+
+    metrics, values = report_rows(row)
+    return pd.DataFrame({'Metric': metrics, 'Value': values}).to_csv(index=False).encode("utf-8")
+
+
+def pdf_report(row):
+    # The single-scenario PDF report as bytes, built in memory; row is as for
+    # report_rows and also needs the projection horizon under "years"
+    from fpdf import FPDF
+
+    edition = row["edition"]
+    pdf = FPDF()
+    pdf.add_page()
+    pdf.set_font("Arial", "B", 16)
+    pdf.cell(0, 10, "Endpoint Central ROI Calculator", ln=True, align="C")
+    pdf.set_font("Arial", "", 12)
+    pdf.cell(0, 10, f"Report for {edition} Edition", ln=True, align="C")
+    pdf.line(10, 30, 200, 30)
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Input Parameters", ln=True)
+    pdf.set_font("Arial", "", 10)
+    params = [
+        ["Number of Devices", f"{row['devices']}"],
+        ["Number of Applications", f"{row['applications']}"],
+        ["Updates per Application", f"{row['updates_per_app']:g}"],
+        ["Hours per Update (Manual)", f"{row['hours_per_update']}"],
+        ["Technician Hourly Rate", f"${row['hourly_rate']}"],
+        ["Automation Efficiency", f"{row['automation_efficiency']}%"],
+        ["Annual License Cost", f"${row['license_cost']:,.2f}"],
+        ["Implementation Cost", f"${row['implementation_cost']:,.2f}"]
+    ]
+    for param in params:
+        pdf.cell(90, 7, param[0], border=1)
+        pdf.cell(90, 7, param[1], border=1, ln=True)
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Key Results", ln=True)
+    pdf.set_font("Arial", "", 10)
+    # The PDF core fonts are Latin-1, which has no infinity sign
+    first_year_roi, subsequent_roi = row["first_year_roi"], row["subsequent_roi"]
+    payback_months, irr = row["payback_months"], row["irr"]
+    results = [
+        ["Annual Savings", f"${row['adjusted_annual_savings']:,.2f}"],
+        ["First Year ROI", f"{first_year_roi:.1f}%" if first_year_roi != float('inf') else "Infinite"],
+        ["Subsequent Years ROI", f"{subsequent_roi:.1f}%" if subsequent_roi != float('inf') else "Infinite"],
+        ["Payback Period", f"{payback_months:.1f} months" if payback_months != float('inf') else "N/A"],
+        [f"{row['years']}-Year IRR", f"{irr:.1f}%" if np.isfinite(irr) else "Infinite" if irr == float('inf') else "Undefined"]
+    ]
+    for result in results:
+        pdf.cell(90, 7, result[0], border=1)
+        pdf.cell(90, 7, result[1], border=1, ln=True)
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Time and Cost Comparison", ln=True)
+    pdf.set_font("Arial", "", 10)
+    total_manual_hours, total_automated_hours = row["total_manual_hours"], row["total_automated_hours"]
+    comparisons = [
+        ["Total Manual Hours", f"{total_manual_hours:,.0f} hours"],
+        ["Total Automated Hours", f"{total_automated_hours:,.0f} hours"],
+        ["Hours Saved", f"{total_manual_hours - total_automated_hours:,.0f} hours"],
+        ["Manual Process Cost", f"${row['total_manual_cost']:,.2f}"],
+        ["Automated Process Cost", f"${row['total_automated_cost']:,.2f}"],
+        ["Direct Labor Savings", f"${row['annual_labor_savings']:,.2f}"]
+    ]
+    for comp in comparisons:
+        pdf.cell(90, 7, comp[0], border=1)
+        pdf.cell(90, 7, comp[1], border=1, ln=True)
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Benefits Breakdown", ln=True)
+    pdf.set_font("Arial", "", 10)
+    for benefit, value in row["total_benefits"].items():
+        pdf.cell(120, 7, benefit, border=1)
+        pdf.cell(60, 7, f"${value:,.2f}", border=1, ln=True)
+    pdf.ln(10)
+    if edition != "Free" and len(row["edition_specific_features"]) > 0:
+        pdf.set_font("Arial", "B", 14)
+        pdf.cell(0, 10, f"{edition} Edition Specific Features", ln=True)
+        pdf.set_font("Arial", "", 10)
+        for feature, value in row["edition_specific_features"].items():
+            pdf.cell(120, 7, feature, border=1)
+            pdf.cell(60, 7, f"${value:,.2f}", border=1, ln=True)
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, f"{row['years']}-Year Projection Summary", ln=True)
+    pdf.set_font("Arial", "", 10)
+    pdf.cell(40, 7, "Year", border=1)
+    pdf.cell(50, 7, "Manual Cost", border=1)
+    pdf.cell(50, 7, "Automated Cost", border=1)
+    pdf.cell(50, 7, "Cumulative Savings", border=1, ln=True)
+    for i in range(row["years"]):
+        pdf.cell(40, 7, f"Year {i + 1}", border=1)
+        pdf.cell(50, 7, f"${row['costs_manual'][i]:,.2f}", border=1)
+        pdf.cell(50, 7, f"${row['costs_automated'][i]:,.2f}", border=1)
+        pdf.cell(50, 7, f"${row['cumulative_savings'][i]:,.2f}", border=1, ln=True)
+    pdf.cell(140, 7, f"Net Present Value ({row['discount_rate']:g}% discount rate, "
+                     f"{row['license_escalation']:g}% annual license escalation)", border=1)
+    pdf.cell(50, 7, f"${row['npv']:,.2f}", border=1, ln=True)
+    pdf.ln(10)
+    pdf.set_font("Arial", "B", 14)
+    pdf.cell(0, 10, "Conclusion", ln=True)
+    pdf.set_font("Arial", "", 10)
+    pdf.multi_cell(0, 7, EDITION_CONCLUSIONS[edition])
+    pdf.ln(10)
+    pdf.set_font("Arial", "I", 8)
+    pdf.cell(0, 10, "© 2025 ManageEngine | This report is for informational purposes only.",
+             ln=True, align="C")
+    pdf.cell(0, 10,
+             "Contact our technicians for a detailed assessment tailored to your specific environment.",
+             ln=True, align="C")
+    return pdf.output(dest="S").encode("latin-1")
@@ -0,0 +1,306 @@
+import argparse
+import contextlib
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+import roi_catalog
+import roi_engine
+
+# Scenario results shared by every roi-tool.py server process on a host, in a
+# local SQLite database, result_cache.db next to this module or the file named
+# by ROI_RESULT_CACHE. Results are keyed by a hash of the calculator state
+# fields they depend on (the save_calculator_state fields without the theme
+# and the override flag, with numbers normalized) and the pricing catalog
+# version and fingerprint, so a changed catalog never serves old prices.
+#
+# The cache holds at most MAX_ENTRIES results and evicts the least recently
+# used beyond that. Identical computations are coalesced: within a process the
+# threads asking for a key wait for the first one, and across processes the
+# first to miss claims the key with a lease row while the others poll for its
+# result, taking over only if the lease runs out. The hits, misses, coalesced
+# waits and evictions of all processes are counted in the database. A cache
+# that cannot be read or written is logged and bypassed.
+#
+# Each process opens one connection per database, set up on first use, and
+# its threads take turns on it; only the lookups and writes hold it, never a
+# computation or a wait for another process.
+#
+# roi-tool.py keeps its own in-process cache in front of this one (see
+# roi_memo.py), so the database counters only see the lookups that cache
+# missed. The lookups it answered are counted per process in memory, with
+# count_memory_hit, and reported by stats as memory_hits.
+
+ENV_VAR = "ROI_RESULT_CACHE"
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "result_cache.db")
+MAX_ENTRIES = 10_000
+
+# How long a claimed computation may take before another process redoes it,
+# and how often a waiting process checks for its result
+LEASE_SECONDS = 30.0
+POLL_INTERVAL = 0.005
+
+# State fields that do not change the results
+IGNORED_FIELDS = ("theme", "override_license")
+
+COUNTERS = ("hits", "misses", "coalesced", "evictions")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    catalog_version TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0,
+    value BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS pending (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+logger = logging.getLogger("roi_result_cache")
+
+_connections_lock = threading.Lock()
+_connections = {}
+_owner = uuid.uuid4().hex
+_inflight_lock = threading.Lock()
+_inflight = {}
+_memory_hits = 0
+
+
+def cache_path():
+    return os.environ.get(ENV_VAR) or DEFAULT_PATH
+
+
+@contextlib.contextmanager
+def connect(path=None):
+    # The process's connection to the cache at path, held by the calling
+    # thread for the with block. It is opened and the schema created once per
+    # process; WAL mode lets processes read while one writes.
+    path = path or cache_path()
+    with _connections_lock:
+        if path not in _connections:
+            connection = sqlite3.connect(path, timeout=10, isolation_level=None, check_same_thread=False)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                connection.executescript(SCHEMA)
+                connection.executemany("INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)",
+                                       [(name,) for name in COUNTERS])
+            except sqlite3.Error:
+                connection.close()
+                raise
+            _connections[path] = (connection, threading.Lock())
+        connection, lock = _connections[path]
+    with lock:
+        yield connection
+
+
+def count_memory_hit():
+    # Counts a lookup answered by an in-process cache in front of this one
+    global _memory_hits
+    with _inflight_lock:
+        _memory_hits += 1
+
+
+def _canonical(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if hasattr(value, "item"):
+        return _canonical(value.item())
+    return value
+
+
+def state_key(state, catalog):
+    # Cache key of a calculator state (a save_calculator_state dict or the
+    # engine inputs) under a catalog
+    fields = {name: _canonical(value) for name, value in state.items() if name not in IGNORED_FIELDS}
+    document = {"catalog": [catalog.version, catalog.fingerprint], "state": fields}
+    return hashlib.sha256(json.dumps(document, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+def _count(connection, name, amount=1):
+    connection.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+
+def _lookup(connection, key, counter="hits"):
+    # The stored result for key, marked as used and counted, or None
+    row = connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    with connection:
+        connection.execute("BEGIN")
+        connection.execute("UPDATE results SET last_used = ?, hits = hits + 1 WHERE key = ?", (time.time(), key))
+        _count(connection, counter)
+    return json.loads(zlib.decompress(row[0]))
+
+
+def _claim(connection, key):
+    # "claimed" when this process may compute key, "stored" when another
+    # process has stored it since the lookup, or "pending" while another
+    # process holds an unexpired lease on it
+    now = time.time()
+    with connection:
+        connection.execute("BEGIN IMMEDIATE")
+        if connection.execute("SELECT 1 FROM results WHERE key = ?", (key,)).fetchone():
+            return "stored"
+        claimed = connection.execute(
+            "INSERT INTO pending (key, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT (key) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE pending.expires < ?",
+            (key, _owner, now + LEASE_SECONDS, now),
+        ).rowcount == 1
+    return "claimed" if claimed else "pending"
+
+
+def _release(connection, key):
+    with connection:
+        connection.execute("DELETE FROM pending WHERE key = ? AND owner = ?", (key, _owner))
+
+
+def _store(connection, key, catalog_version, result, max_entries):
+    now = time.time()
+    value = zlib.compress(json.dumps(result).encode())
+    with connection:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute(
+            "INSERT OR REPLACE INTO results (key, catalog_version, created_at, last_used, value) VALUES (?, ?, ?, ?, ?)",
+            (key, catalog_version, now, now, value))
+        connection.execute("DELETE FROM pending WHERE key = ?", (key,))
+        _count(connection, "misses")
+        excess = connection.execute("SELECT count(*) FROM results").fetchone()[0] - max_entries
+        if excess > 0:
+            connection.execute("DELETE FROM results WHERE key IN "
+                               "(SELECT key FROM results ORDER BY last_used LIMIT ?)", (excess,))
+            _count(connection, "evictions", excess)
+
+
+def _shared(key, catalog_version, compute, max_entries, path):
+    # The result for key from the database, computing and storing it unless
+    # another process already is
+    waited = False
+    while True:
+        with connect(path) as connection:
+            result = _lookup(connection, key, "coalesced" if waited else "hits")
+            if result is not None:
+                return result
+            claim = _claim(connection, key)
+        if claim == "claimed":
+            break
+        if claim == "pending":
+            waited = True
+            time.sleep(POLL_INTERVAL)
+    try:
+        result = compute()
+    except BaseException:
+        with connect(path) as connection:
+            _release(connection, key)
+        raise
+    try:
+        with connect(path) as connection:
+            _store(connection, key, catalog_version, result, max_entries)
+    except sqlite3.Error as e:
+        logger.warning("Could not store a result in %s: %s", path or cache_path(), e)
+    return result
+
+
+def get_or_compute(key, compute, catalog_version="", max_entries=MAX_ENTRIES, path=None):
+    # compute()'s JSON-serializable result, shared through the cache under
+    # key. Threads asking for a key that is already being computed in this
+    # process wait for that computation instead of starting their own.
+    with _inflight_lock:
+        entry = _inflight.get(key)
+        leader = entry is None
+        if leader:
+            entry = _inflight[key] = {"done": threading.Event()}
+    if not leader:
+        entry["done"].wait()
+        if "error" in entry:
+            raise entry["error"]
+        try:
+            with connect(path) as connection:
+                _count(connection, "coalesced")
+        except sqlite3.Error:
+            pass
+        return entry["result"]
+    try:
+        try:
+            result = _shared(key, catalog_version, compute, max_entries, path)
+        except sqlite3.Error as e:
+            logger.warning("Result cache %s is unavailable, computing without it: %s", path or cache_path(), e)
+            result = compute()
+        entry["result"] = result
+        return result
+    except BaseException as e:
+        entry["error"] = e
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        entry["done"].set()
+
+
+def calculate_scenario(catalog=None, **inputs):
+    # roi_engine.calculate_scenario through the shared cache
+    catalog = catalog or roi_catalog.current()
+    return get_or_compute(state_key(inputs, catalog),
+                          lambda: roi_engine.calculate_scenario(catalog=catalog, **inputs),
+                          catalog_version=catalog.version)
+
+
+def stats(path=None):
+    # Counters of every process sharing the cache, with the number of results
+    # it holds, the hit rate of those counters and this process's
+    # memory_hits
+    with connect(path) as connection:
+        counters = dict(connection.execute("SELECT name, value FROM counters").fetchall())
+        counters["entries"] = connection.execute("SELECT count(*) FROM results").fetchone()[0]
+    lookups = counters["hits"] + counters["misses"] + counters["coalesced"]
+    counters["hit_rate"] = (counters["hits"] + counters["coalesced"]) / lookups if lookups else 0.0
+    counters["memory_hits"] = _memory_hits
+    return counters
+
+
+def clear(path=None):
+    # Removes every result and resets the counters
+    with connect(path) as connection, connection:
+        connection.execute("BEGIN IMMEDIATE")
+        connection.execute("DELETE FROM results")
+        connection.execute("DELETE FROM pending")
+        connection.execute("UPDATE counters SET value = 0")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Show the counters of the shared ROI result cache.")
+    parser.add_argument("--clear", action="store_true", help="remove every cached result and reset the counters")
+    args = parser.parse_args(argv)
+    try:
+        if args.clear:
+            clear()
+        counters = stats()
+        # Only meaningful inside a server process
+        del counters["memory_hits"]
+        print(json.dumps(counters, indent=2))
+    except sqlite3.Error as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+import numpy as np
+
+import roi_catalog
+import roi_engine
+
+# Uncertainty analysis on top of roi_engine: every scenario variant is built
+# as one stacked set of input arrays and scored in a single engine call.
+
+# Inputs that can be given a distribution in Monte Carlo mode, with the range
+# their samples are clipped to
+UNCERTAIN_INPUTS = {
+    "automation_efficiency": (0.0, 100.0),
+    "security_benefit": (0.0, 100.0),
+    "downtime_reduction": (0.0, 100.0),
+    "hours_per_update": (0.0, np.inf),
+    "incident_rate": (0.0, 1.0),
+}
+
+DISTRIBUTIONS = ("Fixed", "Uniform", "Triangular", "Normal")
+
+MONTE_CARLO_PERCENTILES = (10, 50, 90)
+
+# Inputs perturbed by the tornado sensitivity analysis, with display labels
+SENSITIVITY_INPUTS = {
+    "hourly_rate": "Technician Hourly Rate",
+    "automation_efficiency": "Automation Efficiency",
+    "devices": "Number of Devices",
+    "applications": "Number of Applications",
+    "updates_per_app": "Updates per Application",
+    "hours_per_update": "Hours per Update",
+    "implementation_cost": "Implementation Cost",
+    "security_benefit": "Security Incident Reduction",
+    "downtime_reduction": "Downtime Reduction",
+    "compliance_time_saved": "Compliance Hours Saved",
+    "bandwidth_savings": "Bandwidth Cost Savings",
+    "incident_rate": "Security Incident Rate",
+    "avg_incident_cost": "Average Incident Cost",
+    "downtime_hours_per_device": "Downtime Hours per Device",
+    "efficiency_factor": "Downtime Efficiency Factor",
+    "edition_value_factor": "Edition Value Factor",
+    "discount_rate": "Discount Rate",
+    "license_escalation": "License Price Escalation",
+}
+
+SENSITIVITY_METRICS = {
+    "adjusted_annual_savings": "Annual Savings",
+    "first_year_roi": "First Year ROI",
+    "payback_months": "Payback Period",
+    "npv": "Net Present Value",
+}
+
+PERCENT_INPUTS = ("automation_efficiency", "security_benefit", "downtime_reduction")
+
+# Inputs goal_seek can solve for and run_sweep can vary, as (lowest, highest,
+# step): the widest range and the resolution, matching the calculator's input
+# widgets
+INPUT_RANGES = {
+    "devices": (1, 1_000_000, 1),
+    "applications": (1, 100_000, 1),
+    "updates_per_app": (0.01, 365, 0.01),
+    "hours_per_update": (0.1, 100.0, 0.01),
+    "hourly_rate": (1.0, 1_000.0, 0.01),
+    "automation_efficiency": (50, 99, 1),
+    "implementation_cost": (0, 10_000_000, 1),
+    "security_benefit": (0, 100, 1),
+    "compliance_time_saved": (0, 10_000, 1),
+    "downtime_reduction": (0, 100, 1),
+    "bandwidth_savings": (0, 10_000_000, 1),
+}
+
+# Metrics goal_seek can target and run_sweep can map, with whether a value
+# meets a target when it is at most ("max") or at least ("min") the target
+TARGET_METRICS = {
+    "payback_months": ("Payback Period (Months)", "max"),
+    "first_year_roi": ("First Year ROI (%)", "min"),
+}
+
+GOAL_SEEK_CANDIDATES = 64
+GOAL_SEEK_MAX_ITERATIONS = 20
+
+SWEEP_MAX_POINTS = 1000
+
+
+def sample_distribution(rng, kind, low, mode, high, samples):
+    # Normal draws are centred on the most likely value with low/high at ±3 sigma
+    if kind == "Fixed" or low == high:
+        return np.full(samples, float(mode))
+    if kind == "Uniform":
+        return rng.uniform(low, high, samples)
+    if kind == "Triangular":
+        return rng.triangular(low, min(max(mode, low), high), high, samples)
+    if kind == "Normal":
+        return np.clip(rng.normal(mode, (high - low) / 6, samples), low, high)
+    raise ValueError(f"Unknown distribution: {kind}")
+
+
+def run_monte_carlo(inputs, distributions, samples=100_000, seed=42, percentiles=MONTE_CARLO_PERCENTILES,
+                    catalog=None):
+    # distributions maps input names to (kind, low, high); the value in inputs
+    # is used as the most likely value
+    catalog = catalog or roi_catalog.current()
+    rng = np.random.default_rng(seed)
+    sampled = dict(inputs)
+    for name, (kind, low, high) in distributions.items():
+        if name not in UNCERTAIN_INPUTS:
+            raise ValueError(f"{name} cannot be given a distribution")
+        floor, ceiling = UNCERTAIN_INPUTS[name]
+        mode = inputs.get(name, catalog.security_incident_rate)
+        sampled[name] = np.clip(sample_distribution(rng, kind, low, mode, high, samples), floor, ceiling)
+    results = roi_engine.calculate_roi(catalog=catalog, **sampled)
+    results = {key: np.broadcast_to(values, (samples,) + values.shape[1:]) for key, values in results.items()}
+    return {
+        "samples": samples,
+        "seed": seed,
+        "percentiles": tuple(percentiles),
+        "results": results,
+        "cumulative_savings_bands": np.percentile(results["cumulative_savings"], percentiles, axis=0),
+        "annual_savings_bands": np.percentile(results["adjusted_annual_savings"], percentiles),
+    }
+
+
+def run_sensitivity(inputs, delta_pct=10, parameters=None, reprice_license=True, catalog=None):
+    # Perturbs each parameter by -delta_pct% and +delta_pct% around the base
+    # scenario. Row 0 of the stacked batch is the base case and rows 2i+1 and
+    # 2i+2 are the low and high cases of parameter i. When reprice_license is
+    # set the license cost follows the perturbed device count.
+    catalog = catalog or roi_catalog.current()
+    parameters = list(parameters or SENSITIVITY_INPUTS)
+    codes = roi_engine.edition_codes(inputs["edition"])
+    base = {
+        "incident_rate": catalog.security_incident_rate,
+        "avg_incident_cost": catalog.avg_incident_cost[codes],
+        "downtime_hours_per_device": catalog.downtime_hours_per_device[codes],
+        "efficiency_factor": catalog.efficiency_factor[codes],
+        "edition_value_factor": catalog.edition_value_factors[codes],
+        "discount_rate": roi_engine.DEFAULT_DISCOUNT_RATE,
+        "license_escalation": roi_engine.DEFAULT_LICENSE_ESCALATION,
+    }
+    base.update(inputs)
+    rows = 2 * len(parameters) + 1
+    stacked = {name: np.full(rows, float(value)) for name, value in base.items() if name not in ("edition", "years")}
+    stacked["edition"] = codes
+    stacked["years"] = base.get("years", roi_engine.PROJECTION_YEARS)
+    for i, name in enumerate(parameters):
+        stacked[name][2 * i + 1] *= 1 - delta_pct / 100
+        stacked[name][2 * i + 2] *= 1 + delta_pct / 100
+    for name in PERCENT_INPUTS:
+        np.clip(stacked[name], 0, 100, out=stacked[name])
+    if reprice_license and "devices" in parameters:
+        stacked["license_cost"] = roi_engine.license_cost(stacked["devices"], codes, catalog=catalog)
+
+    results = roi_engine.calculate_roi(catalog=catalog, **stacked)
+    sensitivity = {"delta_pct": delta_pct, "parameters": parameters, "metrics": {}}
+    for metric in SENSITIVITY_METRICS:
+        values = results[metric]
+        low, high = values[1::2], values[2::2]
+        with np.errstate(invalid="ignore"):
+            swing = np.abs(high - low)
+        # Parameters that push the metric to or from infinity rank first
+        swing = np.where(np.isnan(swing), np.inf, swing)
+        order = np.argsort(-swing, kind="stable")
+        sensitivity["metrics"][metric] = {
+            "base": float(values[0]),
+            "low": low,
+            "high": high,
+            "swing": swing,
+            "order": order,
+        }
+    return sensitivity
+
+
+def summarize_monte_carlo(inputs, distributions, samples=100_000, seed=42, bins=50, catalog=None):
+    # Compact view of a Monte Carlo run for display: the percentile bands and
+    # a pre-binned payback histogram instead of the per-sample arrays
+    monte_carlo = run_monte_carlo(inputs, distributions, samples=samples, seed=seed, catalog=catalog)
+    payback = monte_carlo["results"]["payback_months"]
+    finite_payback = payback[np.isfinite(payback)]
+    counts, edges = np.histogram(finite_payback, bins=bins)
+    return {
+        "samples": samples,
+        "seed": seed,
+        "percentiles": monte_carlo["percentiles"],
+        "cumulative_savings_bands": monte_carlo["cumulative_savings_bands"],
+        "annual_savings_bands": monte_carlo["annual_savings_bands"],
+        "payback_bands": np.percentile(payback, monte_carlo["percentiles"]),
+        "payback_counts": counts,
+        "payback_edges": edges,
+        "no_payback_share": 1 - len(finite_payback) / len(payback),
+    }
+
+
+def goal_seek(inputs, parameter, metric, target, reprice_license=True, candidates=GOAL_SEEK_CANDIDATES,
+              catalog=None):
+    # Finds the value of one input at which metric reaches target, all other
+    # inputs staying as they are. Payback jumps to infinity and the license
+    # cost changes slope at the tier breakpoints, so rather than solving
+    # metric == target the search brackets the point where "meets the target"
+    # flips: each iteration scores a batch of candidates on the input's step
+    # lattice in one engine call and narrows to the flip nearest the current
+    # value, until the bracket is one step wide. The answer is the value on the
+    # meeting side of that flip: the least the input can change to meet the
+    # target, or, if it is met already, the most before it no longer is.
+    catalog = catalog or roi_catalog.current()
+    if parameter not in INPUT_RANGES:
+        raise ValueError(f"Cannot goal-seek {parameter}")
+    if metric not in TARGET_METRICS:
+        raise ValueError(f"Cannot goal-seek on {metric}")
+    low, high, step = INPUT_RANGES[parameter]
+    at_most = TARGET_METRICS[metric][1] == "max"
+    codes = roi_engine.edition_codes(inputs["edition"])
+    current = min(max(float(inputs[parameter]), low), high)
+
+    def lattice(values):
+        return np.unique(np.clip(low + np.round((np.asarray(values, dtype=float) - low) / step) * step, low, high))
+
+    def evaluate(values):
+        batch = dict(inputs, catalog=catalog)
+        batch[parameter] = values
+        if reprice_license and parameter == "devices":
+            batch["license_cost"] = roi_engine.license_cost(values, codes, catalog=catalog)
+        results = roi_engine.calculate_roi(projections=False, **batch)
+        met = results[metric] <= target if at_most else results[metric] >= target
+        return results, met
+
+    # The first batch covers the range on a linear and a geometric grid, plus
+    # the current value and, for devices, both sides of every tier breakpoint
+    start = [np.linspace(low, high, candidates), np.geomspace(max(low, step), high, candidates), [current]]
+    if parameter == "devices":
+        start += [catalog.tier_starts, catalog.tier_starts + 1]
+    values = lattice(np.concatenate(start))
+    seek = {"parameter": parameter, "metric": metric, "target": target, "current": current,
+            "iterations": 0, "evaluations": 0}
+    for iteration in range(GOAL_SEEK_MAX_ITERATIONS):
+        results, met = evaluate(values)
+        seek["iterations"] += 1
+        seek["evaluations"] += len(values)
+        if iteration == 0:
+            seek["met_at_current"] = bool(met[np.searchsorted(values, lattice([current])[0])])
+        flips = np.flatnonzero(met[:-1] != met[1:])
+        if not flips.size:
+            # Only possible on the first batch: the target is met over the
+            # whole range or nowhere in it. The best candidate is reported.
+            best = np.nanargmin(results[metric]) if at_most else np.nanargmax(results[metric])
+            seek.update(status="always" if met.all() else "never", value=float(values[best]),
+                        achieved=float(results[metric][best]))
+            return seek
+        distance = np.maximum(values[flips] - current, 0) + np.maximum(current - values[flips + 1], 0)
+        flip = flips[np.argmin(distance)]
+        side = flip if met[flip] else flip + 1
+        seek.update(status="found", value=float(values[side]), achieved=float(results[metric][side]),
+                    license_cost=float(results["license_cost"][side]))
+        if values[flip + 1] - values[flip] <= step * 1.5:
+            break
+        values = lattice(np.linspace(values[flip], values[flip + 1], candidates))
+    return seek
+
+
+def sweep_range(parameter, value):
+    # Default (low, high) to sweep an input over: its whole range for inputs
+    # capped at 100, otherwise a tenth to ten times the current value
+    low, high, step = INPUT_RANGES[parameter]
+    if high <= 100:
+        return low, high
+    value = max(value, step * 10)
+    return max(low, value / 10), min(high, value * 10)
+
+
+def run_sweep(inputs, x_parameter, x_range, y_parameter, y_range, metric, points=(200, 200),
+              reprice_license=True, catalog=None):
+    # Scores every combination of two inputs in one engine call, without the
+    # yearly projections. x_range and y_range are (low, high); each is sampled
+    # at up to points values on the input's step lattice, so a short integer
+    # range gives fewer. values has shape (y, x) and is float32, which is
+    # plenty for display and halves the chart payload; breakpoints lists the
+    # device counts inside the range at which a license tier starts.
+    catalog = catalog or roi_catalog.current()
+    if x_parameter == y_parameter:
+        raise ValueError("The two swept inputs must differ")
+    if metric not in TARGET_METRICS:
+        raise ValueError(f"Cannot sweep {metric}")
+    axes = []
+    for parameter, (start, stop), count in ((x_parameter, x_range, points[0]), (y_parameter, y_range, points[1])):
+        if parameter not in INPUT_RANGES:
+            raise ValueError(f"Cannot sweep {parameter}")
+        if not 2 <= count <= SWEEP_MAX_POINTS:
+            raise ValueError(f"A sweep takes 2 to {SWEEP_MAX_POINTS} points per input")
+        low, high, step = INPUT_RANGES[parameter]
+        start, stop = max(min(start, stop), low), min(max(start, stop), high)
+        values = np.unique(np.clip(low + np.round((np.linspace(start, stop, count) - low) / step) * step, low, high))
+        breakpoints = catalog.tier_starts[(catalog.tier_starts > start) & (catalog.tier_starts < stop)]
+        axes.append((values, breakpoints if parameter == "devices" else np.array([])))
+    (x_values, x_breakpoints), (y_values, y_breakpoints) = axes
+
+    grid_x, grid_y = np.meshgrid(x_values, y_values)
+    batch = dict(inputs, catalog=catalog, projections=False)
+    batch[x_parameter] = grid_x.ravel()
+    batch[y_parameter] = grid_y.ravel()
+    if reprice_license and "devices" in (x_parameter, y_parameter):
+        batch["license_cost"] = roi_engine.license_cost(batch["devices"], roi_engine.edition_codes(inputs["edition"]),
+                                                        catalog=catalog)
+    results = roi_engine.calculate_roi(**batch)
+    return {
+        "x_parameter": x_parameter,
+        "y_parameter": y_parameter,
+        "metric": metric,
+        "x": x_values,
+        "y": y_values,
+        "values": results[metric].astype(np.float32).reshape(grid_x.shape),
+        "x_breakpoints": x_breakpoints,
+        "y_breakpoints": y_breakpoints,
+    }
@@ -0,0 +1,210 @@
+import argparse
+import collections
+import json
+import sys
+import time
+
+import numpy as np
+
+import roi_catalog
+import roi_fleet
+
+# Per-application patch workload from a software inventory or patch history
+# export, with rows of application, version and install count. Each distinct
+# version of an application counts as one update to roll out over the period
+# the file covers, and the hours an update takes scale with the
+# application's installed base by the catalog's effort tiers. The file is
+# read in chunks of categorical columns and grouped by (application, version)
+# as it streams, so reading a file from disk takes memory for a chunk and the
+# distinct versions, not for the whole file.
+#
+# The workload goes into calculate_roi as the application count, the mean
+# updates per application and patch_effort_factor, the update-weighted mean
+# effort factor, so total_manual_hours is the sum over applications of
+# updates times effort times the hours per update.
+#
+# As with fleet inventories, an export too large to upload to the calculator
+# is summarized where it lives: the summary file written with -o also holds
+# the per-application counts, which read_aggregate loads back for the
+# calculator to summarize for its own period and catalog.
+#
+#     python roi_software.py installs.csv
+#     python roi_software.py patch_history.csv --period-years 3 -o workload.json
+
+REQUIRED_COLUMNS = ("app", "version")
+OPTIONAL_COLUMNS = ("installs",)
+
+# Header names exports commonly use for the software inventory columns
+COLUMN_ALIASES = {
+    "application": "app",
+    "application_name": "app",
+    "app_name": "app",
+    "software": "app",
+    "software_name": "app",
+    "product": "app",
+    "name": "app",
+    "app_version": "version",
+    "software_version": "version",
+    "product_version": "version",
+    "install_count": "installs",
+    "installations": "installs",
+    "installed_on": "installs",
+    "count": "installs",
+}
+
+# calculate_roi input of the effort mix, which a saved scenario keeps
+MIX_INPUTS = ("patch_effort_factor",)
+
+DEFAULT_CHUNK_SIZE = 500_000
+DEFAULT_PERIOD_YEARS = 1.0
+MAX_PERIOD_YEARS = 100.0
+
+# Applications listed by summarize, by yearly workload
+TOP_APPLICATIONS = 20
+
+
+def _install_counts(column, rows):
+    # Install counts of a categorical column as floats, converting each
+    # distinct value once; a blank count is one install
+    import pandas as pd
+
+    if column is None:
+        return np.ones(rows)
+    text = pd.Series(column.cat.categories.astype(str)).str.strip()
+    values = pd.to_numeric(text.where(text != "", "1"), errors="coerce").to_numpy(dtype=float)
+    invalid = np.isnan(values) | (values < 0)
+    if invalid.any():
+        raise ValueError(f"Invalid install count: {text[invalid].iloc[0]!r}")
+    return values[column.cat.codes.to_numpy()]
+
+
+def aggregate_software(source, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Distinct versions and total installs per application of a software
+    # inventory (a path or file object), as a dict of parallel lists with the
+    # number of rows read. Blank versions add installs but no update.
+    import pandas as pd
+
+    installs_by_version = collections.Counter()
+    rows = 0
+    for chunk in roi_fleet.read_inventory(source, chunk_size, required=REQUIRED_COLUMNS, optional=OPTIONAL_COLUMNS,
+                                          aliases=COLUMN_ALIASES):
+        frame = pd.DataFrame({"app": chunk["app"], "version": chunk["version"],
+                              "installs": _install_counts(chunk.get("installs"), len(chunk))})
+        totals = frame.groupby(["app", "version"], observed=True, sort=False)["installs"].sum()
+        for (app, version), installs in totals.items():
+            installs_by_version[str(app).strip() or roi_fleet.UNKNOWN, str(version).strip()] += installs
+        rows += len(chunk)
+    if not installs_by_version:
+        raise ValueError("The software inventory has no applications")
+    versions, installs = collections.Counter(), collections.Counter()
+    for (app, version), count in installs_by_version.items():
+        versions[app] += bool(version)
+        installs[app] += count
+    apps = sorted(installs)
+    return {
+        "rows": rows,
+        "apps": apps,
+        "versions": [versions[app] for app in apps],
+        "installs": [installs[app] for app in apps],
+    }
+
+
+def read_aggregate(source):
+    # The aggregate_software result saved in a summary file written with -o
+    # (a path or file object)
+    try:
+        if hasattr(source, "read"):
+            document = json.load(source)
+        else:
+            with open(source) as f:
+                document = json.load(f)
+        inventory = document["inventory"]
+        aggregate = {
+            "rows": int(inventory["rows"]),
+            "apps": [str(app) for app in inventory["apps"]],
+            "versions": [int(count) for count in inventory["versions"]],
+            "installs": [float(count) for count in inventory["installs"]],
+        }
+    except (UnicodeDecodeError, KeyError, TypeError, ValueError, AttributeError):
+        raise ValueError("Not a software workload written by roi_software.py -o")
+    if not aggregate["apps"] or not len(aggregate["apps"]) == len(aggregate["versions"]) == len(aggregate["installs"]):
+        raise ValueError("The software workload's application lists do not match")
+    return aggregate
+
+
+def effort_factors(installs, catalog):
+    # Effort factor of the catalog tier of each installed base
+    tiers = np.searchsorted(catalog.effort_tier_limits, installs, side="left")
+    return catalog.effort_tier_factors[np.minimum(tiers, len(catalog.effort_tier_factors) - 1)]
+
+
+def summarize(aggregate, period_years=DEFAULT_PERIOD_YEARS, catalog=None):
+    # The patch workload of an aggregate_software result for a file covering
+    # period_years, with the applications of the largest yearly workload
+    # (updates per year times effort factor) for display
+    if not 0 < period_years <= MAX_PERIOD_YEARS:
+        raise ValueError(f"The inventory period must be above 0 and at most {MAX_PERIOD_YEARS:g} years")
+    catalog = catalog or roi_catalog.current()
+    installs = np.asarray(aggregate["installs"], dtype=float)
+    updates = np.asarray(aggregate["versions"], dtype=float) / period_years
+    effort = effort_factors(installs, catalog)
+    workload = updates * effort
+    total_updates = updates.sum()
+    top = np.argsort(-workload, kind="stable")[:TOP_APPLICATIONS]
+    return {
+        "rows": aggregate["rows"],
+        "applications": len(aggregate["apps"]),
+        "updates_per_app": float(total_updates / len(aggregate["apps"])),
+        "patch_effort_factor": float(workload.sum() / total_updates) if total_updates else 1.0,
+        "total_updates": float(total_updates),
+        "top_applications": [(aggregate["apps"][i], aggregate["versions"][i], float(installs[i]), float(updates[i]),
+                              float(effort[i]), float(workload[i])) for i in top],
+    }
+
+
+def engine_inputs(summary):
+    # calculate_roi inputs for a software workload summary
+    return {
+        "applications": summary["applications"],
+        "updates_per_app": summary["updates_per_app"],
+        "patch_effort_factor": summary["patch_effort_factor"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Summarize the patch workload of a software inventory for the ROI calculator.")
+    parser.add_argument("input", help="software inventory or patch history CSV with application and version columns")
+    parser.add_argument("-o", "--output",
+                        help="also write the summary to this JSON file, which the calculator can load")
+    parser.add_argument("--period-years", type=float, default=DEFAULT_PERIOD_YEARS,
+                        help=f"years the file covers (default {DEFAULT_PERIOD_YEARS:g})")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows read at a time (default {DEFAULT_CHUNK_SIZE:,})")
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    if not 0 < args.period_years <= MAX_PERIOD_YEARS:
+        parser.error(f"--period-years must be above 0 and at most {MAX_PERIOD_YEARS:g}")
+
+    try:
+        start = time.perf_counter()
+        aggregate = aggregate_software(args.input, chunk_size=args.chunk_size)
+        summary = summarize(aggregate, period_years=args.period_years)
+        elapsed = time.perf_counter() - start
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(dict(summary, inventory=aggregate), f, indent=2)
+                f.write("\n")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"Read {summary['rows']:,} rows for {summary['applications']:,} applications in {elapsed:.1f}s"
+          f" ({summary['rows'] / max(elapsed, 1e-9):,.0f} rows/s)", file=sys.stderr)
+    print(json.dumps(engine_inputs(summary), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
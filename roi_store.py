@@ -0,0 +1,123 @@
+import datetime
+import json
+import os
+import sqlite3
+import threading
+import zlib
+
+# Saved scenarios of roi-tool.py in a local SQLite database, scenarios.db next
+# to this module or the file named by ROI_STORE. Each row holds the calculator
+# state as saved by save_calculator_state, its results as computed when it was
+# saved (zlib-compressed JSON, so they load without recomputing) and a few
+# summary columns for listing. Rows are indexed by customer, edition and save
+# time, so searches and listings read only the rows they return, however many
+# scenarios are stored.
+
+ENV_VAR = "ROI_STORE"
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scenarios.db")
+LIST_LIMIT = 50
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    id INTEGER PRIMARY KEY,
+    customer TEXT NOT NULL COLLATE NOCASE,
+    edition TEXT NOT NULL,
+    saved_at TEXT NOT NULL,
+    catalog_version TEXT,
+    devices INTEGER,
+    annual_savings REAL,
+    first_year_roi REAL,
+    payback_months REAL,
+    npv REAL,
+    state TEXT NOT NULL,
+    results BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scenarios_customer ON scenarios (customer, saved_at);
+CREATE INDEX IF NOT EXISTS scenarios_edition ON scenarios (edition, saved_at);
+CREATE INDEX IF NOT EXISTS scenarios_saved_at ON scenarios (saved_at);
+"""
+
+# Columns returned by list_scenarios, in order
+SUMMARY_COLUMNS = ("id", "customer", "edition", "saved_at", "catalog_version", "devices",
+                   "annual_savings", "first_year_roi", "payback_months", "npv")
+
+_connections = threading.local()
+
+
+def store_path():
+    return os.environ.get(ENV_VAR) or DEFAULT_PATH
+
+
+def connect(path=None):
+    # The calling thread's connection to the store at path, created with the
+    # schema on first use. WAL mode lets other sessions and processes read
+    # while one of them saves.
+    path = path or store_path()
+    connections = _connections.__dict__
+    if path not in connections:
+        connection = sqlite3.connect(path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.executescript(SCHEMA)
+        connections[path] = connection
+    return connections[path]
+
+
+def save_scenario(customer, state_json, results, catalog_version=None, path=None):
+    # Stores a calculator state and its roi_engine.calculate_scenario results;
+    # returns the new scenario id
+    customer = customer.strip()
+    if not customer:
+        raise ValueError("a customer name is needed to save a scenario")
+    state = json.loads(state_json)
+    saved_at = datetime.datetime.now(datetime.timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+    connection = connect(path)
+    with connection:
+        cursor = connection.execute(
+            "INSERT INTO scenarios (customer, edition, saved_at, catalog_version, devices, annual_savings, "
+            "first_year_roi, payback_months, npv, state, results) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (customer, state["edition"], saved_at, catalog_version, state["devices"],
+             results["adjusted_annual_savings"], results["first_year_roi"], results["payback_months"],
+             results["npv"], state_json, zlib.compress(json.dumps(results).encode())),
+        )
+    return cursor.lastrowid
+
+
+def list_scenarios(customer=None, edition=None, saved_from=None, saved_to=None, limit=LIST_LIMIT, path=None):
+    # Summary rows (SUMMARY_COLUMNS) of the most recently saved scenarios,
+    # newest first. customer matches the start of the customer name, ignoring
+    # case; saved_from and saved_to are inclusive datetime.date bounds (UTC).
+    conditions, params = [], []
+    if customer:
+        escaped = customer.strip().replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        conditions.append("customer LIKE ? ESCAPE '\\'")
+        params.append(escaped + "%")
+    if edition:
+        conditions.append("edition = ?")
+        params.append(edition)
+    if saved_from:
+        conditions.append("saved_at >= ?")
+        params.append(saved_from.isoformat())
+    if saved_to:
+        conditions.append("saved_at < ?")
+        params.append((saved_to + datetime.timedelta(days=1)).isoformat())
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    return connect(path).execute(
+        f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM scenarios {where} ORDER BY saved_at DESC, id DESC LIMIT ?",
+        params + [limit],
+    ).fetchall()
+
+
+def load_scenario(scenario_id, path=None):
+    # (state JSON, results) of a saved scenario, or None when there is no
+    # scenario with that id
+    row = connect(path).execute("SELECT state, results FROM scenarios WHERE id = ?", (scenario_id,)).fetchone()
+    if row is None:
+        return None
+    return row[0], json.loads(zlib.decompress(row[1]))
+
+
+def delete_scenario(scenario_id, path=None):
+    connection = connect(path)
+    with connection:
+        connection.execute("DELETE FROM scenarios WHERE id = ?", (scenario_id,))
@@ -0,0 +1,149 @@
+import json
+import logging
+import os
+import sys
+import time
+
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# Opt-in timing of the phases of a roi-tool.py rerun. Set ROI_TIMINGS=1 in the
+# environment or open the app with ?timings=1 to show the timings of every
+# rerun in a sidebar panel and log them to stderr as one JSON line, e.g.
+#
+#     {"event": "rerun_timings", "edition": "UEM", "total_ms": 61.2,
+#      "sections_ms": {"css": 0.4, "inputs": 12.9, ...},
+#      "sent_bytes": 48211, "sections_sent_bytes": {"css": 1630, ...}}
+#
+# The bytes are the size of the messages the rerun queued for the browser,
+# charged to the section that produced them; messages the browser already
+# holds go out as short references and count as such. The sizes come from
+# a private hook of Streamlit's; where it is missing they are logged as null
+# and shown as unavailable. Reruns of a single st.fragment are logged as
+# "fragment_timings" lines.
+
+ENV_VAR = "ROI_TIMINGS"
+QUERY_PARAM = "timings"
+
+logger = logging.getLogger("roi_timing")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+def timings_requested(query_params):
+    # True when the environment variable or the query flag is set to
+    # anything but an empty string or 0
+    return (os.environ.get(ENV_VAR, "0") not in ("", "0")
+            or query_params.get(QUERY_PARAM, "0") not in ("", "0"))
+
+
+class RerunTimer:
+    # Splits a rerun into consecutive sections: lap(name) charges the time
+    # since the previous lap to name, and a name used more than once adds up.
+    # A disabled timer only checks its flag, so the calls can stay in the
+    # script at no measurable cost.
+
+    def __init__(self, enabled, fragment=None):
+        self.enabled = enabled
+        self.fragment = fragment
+        self.finished = False
+        self.sections = {}
+        self.sent = {}
+        self.unsent = 0
+        self.start = self.last = time.perf_counter() if enabled else 0.0
+        self.counting = _count_sent_bytes(self if enabled else None)
+
+    def add_sent(self, size):
+        # Bytes queued for the browser since the last lap
+        self.unsent += size
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.sections[name] = self.sections.get(name, 0.0) + now - self.last
+        self.sent[name] = self.sent.get(name, 0) + self.unsent
+        self.last = now
+        self.unsent = 0
+
+    def total(self):
+        return self.last - self.start
+
+    def total_sent(self):
+        # None when the sizes of the messages could not be counted
+        return sum(self.sent.values()) if self.counting else None
+
+    def rows(self):
+        # (section, milliseconds, share of the total, KB sent or None) in
+        # script order
+        total = self.total() or 1.0
+        return [(name, seconds * 1000, seconds / total,
+                 self.sent.get(name, 0) / 1024 if self.counting else None)
+                for name, seconds in self.sections.items()]
+
+    def finish(self, **fields):
+        # Ends the rerun and logs it as one structured line; fields adds
+        # context such as the selected edition
+        self.finished = True
+        if not self.enabled:
+            return
+        try:
+            logger.info(json.dumps({
+                "event": "fragment_timings" if self.fragment else "rerun_timings",
+                **({"fragment": self.fragment} if self.fragment else {}),
+                **fields,
+                "total_ms": round(self.total() * 1000, 3),
+                "sections_ms": {name: round(seconds * 1000, 3) for name, seconds in self.sections.items()},
+                "sent_bytes": self.total_sent(),
+                "sections_sent_bytes": ({name: size for name, size in self.sent.items() if size}
+                                        if self.counting else None),
+            }))
+        finally:
+            if self.counting:
+                _count_sent_bytes(None)
+                self.counting = False
+
+    def for_fragment(self, name):
+        # The timer for the body of an st.fragment: this timer while the full
+        # rerun is in progress, or a new one once it has finished, which is
+        # when the fragment reruns on its own
+        return RerunTimer(self.enabled, fragment=name) if self.finished else self
+
+    def end_fragment(self, **fields):
+        # Logs a fragment's own rerun; a no-op for the full rerun's timer
+        if self.fragment:
+            self.finish(**fields)
+
+
+def _count_sent_bytes(timer):
+    # Routes the size of every message the current script run queues for the
+    # browser to timer, or restores the original enqueue function when timer
+    # is None. Wraps the run context's enqueue function, which Streamlit keeps
+    # private; returns False, and counts nothing, without one (outside a
+    # script run, or in another Streamlit version). The wrapper is removed
+    # when the timer finishes, and otherwise, after a rerun that stopped
+    # early, by the wrapper itself on the next message after the timer has
+    # finished or by the next rerun's timer.
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or not callable(getattr(ctx, "_enqueue", None)):
+        return False
+    enqueue = getattr(ctx._enqueue, "__wrapped__", ctx._enqueue)
+    if timer is None:
+        ctx._enqueue = enqueue
+        return False
+
+    def counting_enqueue(msg):
+        try:
+            if timer.finished:
+                ctx._enqueue = enqueue
+            else:
+                timer.add_sent(msg.ByteSize())
+        finally:
+            enqueue(msg)
+
+    counting_enqueue.__wrapped__ = enqueue
+    ctx._enqueue = counting_enqueue
+    return True
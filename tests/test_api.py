@@ -0,0 +1,126 @@
+import asyncio
+import concurrent.futures
+import http.client
+import json
+import threading
+
+import pytest
+
+import roi_api
+import roi_engine
+
+SCENARIO = {"devices": 3000, "applications": 1500, "updates_per_app": 4, "hours_per_update": 4, "hourly_rate": 50,
+            "automation_efficiency": 90, "edition": "UEM", "implementation_cost": 20000, "bandwidth_savings": 5000}
+
+
+@pytest.fixture(scope="module")
+def port():
+    # The API on a free port, served from a thread for the module's tests
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    ports = []
+
+    def on_ready(server):
+        ports.append(server.sockets[0].getsockname()[1])
+        ready.set()
+
+    task = loop.create_task(roi_api.serve(port=0, ready=on_ready))
+    thread = threading.Thread(target=lambda: loop.run_until_complete(asyncio.gather(task, return_exceptions=True)))
+    thread.start()
+    assert ready.wait(10)
+    yield ports[0]
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+    loop.close()
+
+
+def request(port, method, path, document=None):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    try:
+        body = None if document is None else json.dumps(document)
+        connection.request(method, path, body=body)
+        reply = connection.getresponse()
+        return reply.status, json.loads(reply.read())
+    finally:
+        connection.close()
+
+
+def engine_result(scenario):
+    # The engine's figures for a scenario with the calculator's defaults
+    inputs = dict(scenario)
+    inputs.update({name: values[0] for name, values in roi_engine.default_benefits(scenario["edition"]).items()})
+    inputs.setdefault("license_cost", roi_engine.license_cost(scenario["devices"], scenario["edition"]))
+    return roi_engine.scenario(roi_engine.calculate_roi(**inputs))
+
+
+def test_scenario_round_trip(port):
+    status, document = request(port, "POST", "/v1/scenario", SCENARIO)
+    assert status == 200
+    result = document["result"]
+    expected = engine_result(SCENARIO)
+    for key in ("license_cost", "adjusted_annual_savings", "first_year_roi", "payback_months", "npv", "irr"):
+        assert result[key] == pytest.approx(expected[key])
+    assert result["security_incidents_reduction_value"] == pytest.approx(540000)
+    assert result["irr_status"] == "defined"
+    assert (result["fleet_incident_factor"], result["fleet_downtime_factor"], result["patch_effort_factor"]) \
+        == (1, 1, 1)
+    assert result["edition_specific_features"] == pytest.approx(expected["edition_specific_features"])
+
+
+def test_mix_factors_are_applied(port):
+    mixed = dict(SCENARIO, fleet_incident_factor=2.0, fleet_downtime_factor=0.5, patch_effort_factor=1.5)
+    status, document = request(port, "POST", "/v1/scenario", mixed)
+    assert status == 200
+    result, expected = document["result"], engine_result(mixed)
+    assert result["security_incidents_reduction_value"] == pytest.approx(1080000)
+    for key in ("security_incidents_reduction_value", "downtime_cost_saved", "annual_labor_savings",
+                "adjusted_annual_savings"):
+        assert result[key] == pytest.approx(expected[key])
+    assert result["patch_effort_factor"] == 1.5
+
+
+def test_saved_state_is_repriced(port):
+    state = dict(SCENARIO, theme="Dark", override_license=False, license_cost=1.0, patch_effort_factor=1.25)
+    status, document = request(port, "POST", "/v1/scenario", state)
+    assert status == 200
+    assert document["result"]["license_cost"] == pytest.approx(engine_result(SCENARIO)["license_cost"])
+    assert document["result"]["patch_effort_factor"] == 1.25
+
+
+def test_batch_matches_single_requests(port):
+    scenarios = [dict(SCENARIO, devices=devices, edition=edition, years=years)
+                 for devices, edition, years in [(40, "Free", 3), (500, "Professional", 5), (3000, "Security", 3),
+                                                 (12000, "Enterprise", 10)]]
+    scenarios[1]["fleet_downtime_factor"] = 3.0
+    status, document = request(port, "POST", "/v1/scenarios", {"scenarios": scenarios})
+    assert status == 200
+    # Concurrent single requests are scored in shared batches
+    with concurrent.futures.ThreadPoolExecutor(len(scenarios)) as executor:
+        singles = list(executor.map(lambda scenario: request(port, "POST", "/v1/scenario", scenario), scenarios))
+    assert [result for _, result in singles] == [
+        {"catalog_version": document["catalog_version"], "result": result} for result in document["results"]]
+    # Each scenario is projected over its own horizon
+    for scenario, result in zip(scenarios, document["results"]):
+        assert result["years"] == scenario["years"]
+        assert result["npv"] == pytest.approx(engine_result(scenario)["npv"])
+
+
+@pytest.mark.parametrize("scenario, message", [
+    (dict(SCENARIO, fleet_incident_factor=-1), "scenario.fleet_incident_factor must be at least 0"),
+    (dict(SCENARIO, patch_effort_factor="high"), "scenario.patch_effort_factor must be a number"),
+    (dict(SCENARIO, color="blue"), "scenario has unknown fields: color"),
+    (dict(SCENARIO, years=2.5), "scenario.years must be a whole number of at least 1"),
+    ({name: value for name, value in SCENARIO.items() if name != "devices"}, "scenario.devices is required"),
+])
+def test_invalid_scenarios_are_rejected(port, scenario, message):
+    assert request(port, "POST", "/v1/scenario", scenario) == (400, {"error": message})
+
+
+def test_pricing_and_routes(port):
+    status, document = request(port, "GET", "/v1/pricing?devices=3000")
+    assert status == 200
+    assert document["license_cost"]["UEM"] == pytest.approx(engine_result(SCENARIO)["license_cost"])
+    assert request(port, "GET", "/v1/missing")[0] == 404
+    assert request(port, "GET", "/v1/scenario")[0] == 405
+    status, health = request(port, "GET", "/v1/health")
+    assert status == 200 and health["batched_scenarios"] >= health["batches"] >= 1
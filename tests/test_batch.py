@@ -0,0 +1,49 @@
+import io
+
+import pandas as pd
+import pytest
+
+import roi_batch
+import roi_catalog
+import roi_engine
+
+ROWS = """customer,devices,applications,updates_per_app,hours_per_update,hourly_rate,automation_efficiency,edition,implementation_cost,bandwidth_savings,years,fleet_incident_factor,patch_effort_factor
+Acme,3000,1500,4,4,50,90,UEM,20000,5000,,,
+"Beta, Inc.",3000,1500,4,4,50,90,UEM,20000,5000,3,2.0,1.5
+Gamma,40,10,0.5,1,30,70,Free,0,0,10,,
+"""
+
+
+def score(text=ROWS):
+    chunk = pd.read_csv(io.StringIO(text))
+    output = roi_batch.header_row(chunk, roi_catalog.current()) + roi_batch.score_chunk(chunk)
+    return pd.read_csv(io.StringIO(output))
+
+
+def test_rows_are_scored_like_the_engine():
+    scored = score()
+    assert scored["customer"].tolist() == ["Acme", "Beta, Inc.", "Gamma"]
+    # The mix factors are inputs, not passthrough columns
+    assert "fleet_incident_factor" not in scored and "patch_effort_factor" not in scored
+    rows = pd.read_csv(io.StringIO(ROWS))
+    # Blank optional fields take the defaults: a 5-year horizon and 1.0 factors
+    rows = rows.fillna({"years": 5, "fleet_incident_factor": 1.0, "patch_effort_factor": 1.0})
+    for (_, row), (_, result) in zip(rows.iterrows(), scored.iterrows()):
+        inputs = row.drop("customer").to_dict()
+        inputs.update({name: values[0] for name, values in roi_engine.default_benefits(row["edition"]).items()})
+        inputs["license_cost"] = roi_engine.license_cost(row["devices"], row["edition"])
+        expected = roi_engine.scenario(roi_engine.calculate_roi(**inputs))
+        assert result["Security Incident Reduction Value"] == pytest.approx(
+            expected["security_incidents_reduction_value"])
+        assert result["Direct Labor Savings"] == pytest.approx(expected["annual_labor_savings"])
+        assert result["Net Present Value"] == pytest.approx(expected["npv"], abs=0.01)
+
+
+@pytest.mark.parametrize("replace, message", [
+    (("3,2.0,1.5", "3,-2.0,1.5"), "fleet_incident_factor must be at least 0 on data row 2"),
+    (("3,2.0,1.5", "3,2.0,-1"), "patch_effort_factor must be at least 0 on data row 2"),
+    (("Gamma,40,10", "Gamma,40,"), "Invalid or missing applications on data row 3"),
+])
+def test_invalid_rows_are_rejected(replace, message):
+    with pytest.raises(ValueError, match=message):
+        score(ROWS.replace(*replace))
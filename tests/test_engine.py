@@ -0,0 +1,145 @@
+import itertools
+
+import numpy as np
+import pytest
+
+import roi_engine
+
+# The calculations of the original single-script calculator, one scenario at
+# a time, which calculate_roi and license_cost must reproduce under the
+# shipped catalog
+
+BASE_PRICES = {"Free": 0, "Professional": 795, "Enterprise": 945, "UEM": 1095, "Security": 1695}
+TIERS = [(100, 0.9), (500, 0.8), (1000, 0.7), (float("inf"), 0.6)]
+FEATURES = [
+    ("Application Deployment Automation", "labor", 0.1),
+    ("Remote Troubleshooting", "downtime", 0.2),
+    ("Self-Service Portal", "devices", 5),
+    ("USB Device Management", "devices", 2),
+    ("OS Deployment", "devices", 10),
+    ("Mobile Device Management", "devices", 8),
+    ("Vulnerability Remediation", "security", 0.3),
+    ("Endpoint Privilege Management", "devices", 15),
+    ("Ransomware Protection", "devices", 25),
+]
+FEATURE_COUNTS = {"Free": 0, "Professional": 2, "Enterprise": 4, "UEM": 6, "Security": 9}
+VALUE_FACTORS = {"Free": 1.0, "Professional": 1.05, "Enterprise": 1.1, "UEM": 1.15, "Security": 1.25}
+
+
+def baseline_license_cost(devices, edition):
+    if edition == "Free":
+        return 0
+    if devices <= 50:
+        return BASE_PRICES[edition]
+    additional_cost = 0
+    base_cost_per_device = BASE_PRICES[edition] / 50
+    current_devices = 50
+    for tier_limit, discount_factor in TIERS:
+        if current_devices >= devices:
+            break
+        devices_in_tier = min(tier_limit, devices) - current_devices
+        if devices_in_tier > 0:
+            additional_cost += devices_in_tier * base_cost_per_device * discount_factor
+            current_devices += devices_in_tier
+    return BASE_PRICES[edition] + additional_cost
+
+
+def baseline_roi(devices, applications, updates_per_app, hours_per_update, hourly_rate, automation_efficiency,
+                 edition, license_cost, implementation_cost, security_benefit, compliance_time_saved,
+                 downtime_reduction, bandwidth_savings):
+    total_manual_hours = applications * updates_per_app * hours_per_update
+    total_manual_cost = total_manual_hours * hourly_rate
+    total_automated_cost = total_manual_hours * (1 - automation_efficiency / 100) * hourly_rate
+    annual_labor_savings = total_manual_cost - total_automated_cost
+
+    avg_incident_cost = 7500 if edition == "Security" else 6000 if edition in ("UEM", "Enterprise") else 5000
+    security_value = (security_benefit / 100) * (devices * 0.05) * avg_incident_cost
+
+    if edition in ("UEM", "Security"):
+        downtime_hours_per_device, efficiency_factor = 2.5, 1.8
+    elif edition == "Enterprise":
+        downtime_hours_per_device, efficiency_factor = 2.2, 1.5
+    else:
+        downtime_hours_per_device, efficiency_factor = 2.0, 1.5
+    downtime_cost_saved = (downtime_reduction / 100) * (devices * downtime_hours_per_device) * hourly_rate \
+        * efficiency_factor
+
+    bandwidth_adjusted = bandwidth_savings * (1.2 if edition in ("UEM", "Security") else 1.0)
+    total_annual_savings = (annual_labor_savings + compliance_time_saved * hourly_rate + bandwidth_adjusted
+                            + security_value + downtime_cost_saved)
+    adjusted = total_annual_savings * VALUE_FACTORS[edition]
+
+    first_year_cost = license_cost + implementation_cost
+    first_year_roi = (adjusted - first_year_cost) / first_year_cost * 100 if first_year_cost > 0 else float("inf")
+    subsequent_roi = (adjusted - license_cost) / license_cost * 100 if license_cost > 0 else float("inf")
+    if adjusted > first_year_cost and first_year_cost > 0:
+        payback_months = first_year_cost / adjusted * 12
+    else:
+        payback_months = float("inf")
+
+    cumulative = [adjusted - first_year_cost]
+    for _ in range(4):
+        cumulative.append(cumulative[-1] + adjusted - license_cost)
+
+    bases = {"labor": annual_labor_savings, "downtime": downtime_cost_saved, "security": security_value,
+             "devices": devices}
+    features = {name: bases[basis] * multiplier for name, basis, multiplier in FEATURES[:FEATURE_COUNTS[edition]]}
+    return {
+        "annual_labor_savings": annual_labor_savings,
+        "security_incidents_reduction_value": security_value,
+        "downtime_cost_saved": downtime_cost_saved,
+        "bandwidth_savings_adjusted": bandwidth_adjusted,
+        "total_annual_savings": total_annual_savings,
+        "adjusted_annual_savings": adjusted,
+        "first_year_roi": first_year_roi,
+        "subsequent_roi": subsequent_roi,
+        "payback_months": payback_months,
+        "cumulative_savings": cumulative,
+        "edition_specific_features": features,
+    }
+
+
+@pytest.mark.parametrize("edition", roi_engine.EDITIONS)
+def test_license_cost_matches_baseline(edition):
+    devices = [1, 49, 50, 51, 99, 100, 101, 499, 500, 501, 999, 1000, 1001, 3000, 250_000]
+    costs = roi_engine.license_cost(devices, edition)
+    expected = [baseline_license_cost(count, edition) for count in devices]
+    np.testing.assert_allclose(costs, expected, rtol=1e-12)
+
+
+def test_calculate_roi_matches_baseline():
+    scenarios = [
+        dict(devices=devices, applications=applications, updates_per_app=4, hours_per_update=hours,
+             hourly_rate=50.0, automation_efficiency=efficiency, edition=edition,
+             license_cost=float(baseline_license_cost(devices, edition)), implementation_cost=implementation,
+             security_benefit=20, compliance_time_saved=40, downtime_reduction=30, bandwidth_savings=5000)
+        for edition, devices, applications, hours, efficiency, implementation in itertools.product(
+            roi_engine.EDITIONS, (40, 3000), (0, 1500), (0.5, 4.0), (50, 90), (0, 20000))
+    ]
+    # One vectorized call for every scenario, and the first one on its own
+    batch = {name: np.array([row[name] for row in scenarios]) for name in scenarios[0]}
+    results = roi_engine.calculate_roi(**batch)
+    single = roi_engine.scenario(roi_engine.calculate_roi(**scenarios[0]))
+    assert single == roi_engine.scenario(results, 0)
+    for i, row in enumerate(scenarios):
+        actual = roi_engine.scenario(results, i)
+        for key, value in baseline_roi(**row).items():
+            if key == "edition_specific_features":
+                assert actual[key].keys() == value.keys()
+                np.testing.assert_allclose(list(actual[key].values()), list(value.values()), rtol=1e-12)
+            else:
+                np.testing.assert_allclose(actual[key], value, rtol=1e-12, err_msg=f"{key} of {row}")
+
+
+def test_defaults_give_calculator_metrics():
+    # The calculator's opening scenario, with the UEM edition's default
+    # benefits, as shown on its first page
+    defaults = {name: values[0] for name, values in roi_engine.default_benefits("UEM").items()}
+    assert defaults == {"security_benefit": 60, "compliance_time_saved": 250, "downtime_reduction": 40}
+    row = roi_engine.scenario(roi_engine.calculate_roi(
+        devices=3000, applications=1500, updates_per_app=4, hours_per_update=4.0, hourly_rate=50.0,
+        automation_efficiency=90, edition="UEM", license_cost=roi_engine.license_cost(3000, "UEM"),
+        implementation_cost=20000, bandwidth_savings=5000, **defaults))
+    assert round(row["adjusted_annual_savings"], 2) == 2_194_775.00
+    assert round(row["first_year_roi"], 1) == 3381.9
+    assert round(row["payback_months"], 1) == 0.3
@@ -0,0 +1,77 @@
+import io
+import json
+
+import pytest
+
+import roi_fleet
+
+# Export header names and spacing vary; a blank criticality or OS is Unknown,
+# and device type factors match regardless of case
+INVENTORY = """Location,Device Type,Operating System,Criticality
+HQ,Laptop,Windows 11,High
+HQ,Server,Linux,Critical
+HQ,laptop, Windows 11,High
+Branch,Printer,,Low
+Branch,Workstation,Windows 10,
+"""
+
+
+def aggregate(text=INVENTORY, chunk_size=2):
+    return roi_fleet.aggregate_inventory(io.StringIO(text), chunk_size=chunk_size)
+
+
+def test_aggregate_counts_devices_per_class_across_chunks():
+    counts = aggregate()
+    assert counts["devices"] == 5
+    assert counts["groups"] == {
+        ("HQ", "Laptop", "High"): 1,
+        ("HQ", "Server", "Critical"): 1,
+        ("HQ", "laptop", "High"): 1,
+        ("Branch", "Printer", "Low"): 1,
+        ("Branch", "Workstation", "Unknown"): 1,
+    }
+    assert counts["os_counts"] == {"Windows 11": 2, "Linux": 1, "Unknown": 1, "Windows 10": 1}
+    assert aggregate(chunk_size=100) == counts
+
+
+def test_summary_weighs_devices_by_catalog_factors():
+    summary = roi_fleet.summarize(aggregate())
+    # Laptop High 1.3 x 1.5 twice, Server Critical 2.0 x 2.5, Printer Low 1.0 x 0.5,
+    # Workstation Unknown 1.0, and likewise for downtime
+    assert summary["fleet_incident_factor"] == pytest.approx((1.95 + 5.0 + 1.95 + 0.5 + 1.0) / 5)
+    assert summary["fleet_downtime_factor"] == pytest.approx((1.65 + 10.0 + 1.65 + 0.5 + 1.0) / 5)
+    assert summary["sites"] == 2
+    assert [row[:2] for row in summary["site_totals"]] == [("HQ", 3), ("Branch", 2)]
+    assert summary["site_totals"][0][2:] == pytest.approx((8.9, 13.3))
+    assert summary["unmatched"] == ["Printer", "Unknown"]
+    assert roi_fleet.engine_inputs(summary) == {
+        "devices": 5,
+        "fleet_incident_factor": summary["fleet_incident_factor"],
+        "fleet_downtime_factor": summary["fleet_downtime_factor"],
+    }
+
+
+def test_inventory_errors():
+    with pytest.raises(ValueError, match="Missing inventory columns: device_type"):
+        aggregate("site,os\nHQ,Linux\n")
+    with pytest.raises(ValueError, match="no devices"):
+        aggregate("site,device type\n")
+
+
+def test_summary_file_loads_back(tmp_path, capsys):
+    source = tmp_path / "inventory.csv"
+    source.write_text(INVENTORY)
+    output = tmp_path / "fleet.json"
+    assert roi_fleet.main([str(source), "-o", str(output)]) == 0
+    assert json.loads(capsys.readouterr().out)["devices"] == 5
+    assert roi_fleet.read_aggregate(str(output)) == aggregate()
+    with open(output, "rb") as f:
+        assert roi_fleet.summarize(roi_fleet.read_aggregate(f)) == roi_fleet.summarize(aggregate())
+
+
+def test_summary_file_errors():
+    with pytest.raises(ValueError, match="Not a fleet summary"):
+        roi_fleet.read_aggregate(io.BytesIO(b'{"devices": 5}'))
+    with pytest.raises(ValueError, match="do not add up"):
+        roi_fleet.read_aggregate(io.BytesIO(
+            b'{"inventory": {"devices": 5, "groups": [["HQ", "Server", "High", 2]], "os_counts": {}}}'))
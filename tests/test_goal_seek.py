@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+import roi_engine
+import roi_simulation
+
+# A small site whose only benefit is the patching labor, so each input moves
+# the metrics over its range
+INPUTS = dict(devices=100, applications=200, updates_per_app=4.0, hours_per_update=2.0, hourly_rate=50.0,
+              automation_efficiency=90, edition="UEM", license_cost=float(roi_engine.license_cost(100, "UEM")[0]),
+              implementation_cost=20000, security_benefit=0, compliance_time_saved=0, downtime_reduction=0,
+              bandwidth_savings=0)
+
+
+def metric_at(inputs, parameter, value, metric):
+    # metric with one input changed, repricing the license for devices as
+    # goal_seek does
+    scenario = dict(inputs, **{parameter: value})
+    if parameter == "devices":
+        scenario["license_cost"] = roi_engine.license_cost(value, inputs["edition"])
+    return roi_engine.calculate_roi(projections=False, **scenario)[metric][0]
+
+
+def meets(value, metric, target):
+    at_most = roi_simulation.TARGET_METRICS[metric][1] == "max"
+    return value <= target if at_most else value >= target
+
+
+@pytest.mark.parametrize("parameter, metric, target, met_at_current", [
+    ("applications", "payback_months", 6.0, True),
+    ("applications", "payback_months", 2.0, False),
+    # Fractional updates per application
+    ("updates_per_app", "first_year_roi", 150.0, True),
+    ("updates_per_app", "first_year_roi", 400.0, False),
+    ("hourly_rate", "first_year_roi", 500.0, False),
+    ("hours_per_update", "first_year_roi", 100.0, True),
+    # The license is repriced, so the device count crosses tier breakpoints
+    ("devices", "payback_months", 6.0, True),
+])
+def test_goal_seek_brackets_the_target(parameter, metric, target, met_at_current):
+    seek = roi_simulation.goal_seek(INPUTS, parameter, metric, target)
+    step = roi_simulation.INPUT_RANGES[parameter][2]
+    assert seek["status"] == "found"
+    assert seek["met_at_current"] == met_at_current
+    achieved = metric_at(INPUTS, parameter, seek["value"], metric)
+    assert meets(achieved, metric, target)
+    assert np.isclose(seek["achieved"], achieved)
+    # One step further misses the target: back toward the current value when
+    # it has to change, or away from it when it is met already
+    away = 1 if seek["value"] > seek["current"] else -1
+    beyond = seek["value"] + (away if met_at_current else -away) * step
+    assert not meets(metric_at(INPUTS, parameter, beyond, metric), metric, target)
+
+
+def test_goal_seek_reports_unreachable_and_unmissable_targets():
+    never = roi_simulation.goal_seek(INPUTS, "hourly_rate", "payback_months", 0.001)
+    assert never["status"] == "never"
+    always = roi_simulation.goal_seek(INPUTS, "security_benefit", "payback_months", 12.0)
+    assert always["status"] == "always"
+
+
+def test_goal_seek_rejects_unknown_inputs_and_metrics():
+    with pytest.raises(ValueError):
+        roi_simulation.goal_seek(INPUTS, "edition", "payback_months", 6.0)
+    with pytest.raises(ValueError):
+        roi_simulation.goal_seek(INPUTS, "devices", "npv", 6.0)
@@ -0,0 +1,58 @@
+import numpy as np
+
+import roi_engine
+
+
+def npv(flows, rate):
+    return sum(flow / (1 + rate) ** t for t, flow in enumerate(flows))
+
+
+def test_irr_matches_known_rate():
+    # -100 now and 110 in a year is a 10% return
+    assert np.isclose(roi_engine.irr([[-100.0, 110.0]])[0], 10.0)
+
+
+def test_irr_root_has_zero_npv():
+    flows = np.array([[-20000.0, 9000.0, 9000.0, 9000.0], [-1000.0, 50.0, 50.0, 1050.0]])
+    rates = roi_engine.irr(flows) / 100
+    for row, rate in zip(flows, rates):
+        assert abs(npv(row, rate)) < 1e-6 * np.abs(row).sum()
+    assert np.isclose(rates[1], 0.05)
+
+
+def test_irr_without_sign_change_is_undefined():
+    rate = roi_engine.irr([[-100.0, -10.0, -10.0]])
+    assert np.isnan(rate[0])
+    assert roi_engine.irr_status(rate).tolist() == ["undefined"]
+
+
+def test_irr_without_outlay_is_infinite():
+    rate = roi_engine.irr([[0.0, 10.0, 10.0]])
+    assert rate[0] == np.inf
+    assert roi_engine.irr_status(rate).tolist() == ["infinite"]
+
+
+def test_irr_near_minus_100_percent_is_a_root_or_undefined():
+    # Flows whose only sign changes sit within a hair of -100%, where the NPV
+    # cannot be resolved in floating point
+    flows = np.array([
+        [-41.8223, 5.8505, 103.0387, 3.3902, -2475.2095, 0.2839],
+        [-19.1121, 2.358, 0.0354, 0.1218, -823.4637, 0.0009],
+        [-245.2785, 8.8121, -41.8763, 0.1511, -47.1362, 0.022],
+    ])
+    for row, rate in zip(flows, roi_engine.irr(flows) / 100):
+        assert np.isnan(rate) or abs(npv(row, rate)) < 1e-6 * np.abs(row).sum()
+
+
+def test_irr_random_flows_are_roots():
+    rng = np.random.default_rng(1)
+    flows = np.zeros((20000, 6))
+    flows[:, 0] = -rng.lognormal(5, 3, len(flows))
+    flows[:, 1:] = rng.lognormal(0, 3, (len(flows), 5)) * rng.choice([-1, 1], (len(flows), 5), p=[0.3, 0.7])
+    rates = roi_engine.irr(flows) / 100
+    finite = np.isfinite(rates)
+    with np.errstate(all="ignore"):
+        residual = (flows[finite] * (1 + rates[finite])[:, None] ** -np.arange(6)).sum(axis=1)
+    # Looser than the solver's own check, since converting to percent and
+    # back moves a root near -100% enough to matter
+    assert (np.abs(residual) <= 1e-4 * np.abs(flows[finite]).sum(axis=1)).all()
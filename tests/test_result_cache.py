@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+
+import roi_result_cache
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "result_cache.db")
+
+
+def test_threads_share_one_computation(cache_path):
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(threading.get_ident())
+        release.wait(5)
+        return {"value": 42}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        roi_result_cache.get_or_compute("key", compute, path=cache_path))) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert results == [{"value": 42}, {"value": 42}]
+    assert len(calls) == 1
+    stats = roi_result_cache.stats(cache_path)
+    assert (stats["misses"], stats["coalesced"], stats["hits"], stats["entries"]) == (1, 1, 0, 1)
+
+    # Later lookups, from any thread, are hits on the same connection
+    thread = threading.Thread(target=lambda: results.append(
+        roi_result_cache.get_or_compute("key", compute, path=cache_path)))
+    thread.start()
+    thread.join(5)
+    assert results[-1] == {"value": 42} and len(calls) == 1
+    assert roi_result_cache.stats(cache_path)["hits"] == 1
+    assert sum(path == cache_path for path in roi_result_cache._connections) == 1
+
+
+def test_waiting_thread_gets_the_error(cache_path):
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise ValueError("failed")
+
+    errors = []
+
+    def lookup():
+        try:
+            roi_result_cache.get_or_compute("key", compute, path=cache_path)
+        except ValueError as e:
+            errors.append(str(e))
+
+    threads = [threading.Thread(target=lookup) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert errors == ["failed", "failed"]
+    # The lease is released, so the next lookup computes again
+    assert roi_result_cache.get_or_compute("key", lambda: [1], path=cache_path) == [1]
+
+
+def test_waits_for_another_process_lease(cache_path):
+    # Another process holds a lease on the key and stores its result shortly
+    with roi_result_cache.connect(cache_path) as connection, connection:
+        connection.execute("INSERT INTO pending (key, owner, expires) VALUES (?, ?, ?)",
+                           ("key", "other", time.time() + 30))
+
+    def store():
+        time.sleep(0.1)
+        with roi_result_cache.connect(cache_path) as connection:
+            roi_result_cache._store(connection, "key", "", {"from": "other"}, roi_result_cache.MAX_ENTRIES)
+
+    thread = threading.Thread(target=store)
+    thread.start()
+    result = roi_result_cache.get_or_compute("key", lambda: {"from": "this"}, path=cache_path)
+    thread.join(5)
+    assert result == {"from": "other"}
+    assert roi_result_cache.stats(cache_path)["coalesced"] == 1
+
+
+def test_takes_over_an_expired_lease(cache_path):
+    with roi_result_cache.connect(cache_path) as connection, connection:
+        connection.execute("INSERT INTO pending (key, owner, expires) VALUES (?, ?, ?)",
+                           ("key", "other", time.time() - 1))
+    assert roi_result_cache.get_or_compute("key", lambda: {"from": "this"}, path=cache_path) == {"from": "this"}
+
+
+def test_evicts_least_recently_used(cache_path):
+    for key in "abc":
+        roi_result_cache.get_or_compute(key, lambda: key, max_entries=2, path=cache_path)
+    stats = roi_result_cache.stats(cache_path)
+    assert (stats["entries"], stats["evictions"]) == (2, 1)
+    with roi_result_cache.connect(cache_path) as connection:
+        keys = {key for key, in connection.execute("SELECT key FROM results")}
+    assert keys == {"b", "c"}
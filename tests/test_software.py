@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+import roi_software
+
+# Rows of one version can repeat and span chunks; a blank install count is
+# one install, and a blank version adds installs but no update
+INVENTORY = """Software,Version,Install Count
+Chrome,120,3000
+Chrome,121,2500
+Chrome,121,500
+Zoom,5.1,
+Zoom,,20
+Legacy Tool,1.0,10
+"""
+
+
+def aggregate(text=INVENTORY, chunk_size=2):
+    return roi_software.aggregate_software(io.StringIO(text), chunk_size=chunk_size)
+
+
+def test_aggregate_counts_versions_and_installs_across_chunks():
+    counts = aggregate()
+    assert counts == {
+        "rows": 6,
+        "apps": ["Chrome", "Legacy Tool", "Zoom"],
+        "versions": [2, 1, 1],
+        "installs": [6000.0, 10.0, 21.0],
+    }
+    assert aggregate(chunk_size=100) == counts
+
+
+def test_summary_weighs_updates_by_installed_base():
+    summary = roi_software.summarize(aggregate(), period_years=2)
+    # Over two years Chrome has 1 update a year at the 2.0 effort tier above
+    # 5,000 installs, and the others half an update at the 0.5 tier
+    assert summary["applications"] == 3
+    assert summary["total_updates"] == pytest.approx(2.0)
+    assert summary["updates_per_app"] == pytest.approx(2.0 / 3)
+    assert summary["patch_effort_factor"] == pytest.approx((2.0 + 0.25 + 0.25) / 2.0)
+    assert summary["top_applications"][0] == ("Chrome", 2, 6000.0, 1.0, 2.0, 2.0)
+    assert roi_software.engine_inputs(summary) == {
+        "applications": 3,
+        "updates_per_app": summary["updates_per_app"],
+        "patch_effort_factor": summary["patch_effort_factor"],
+    }
+    with pytest.raises(ValueError):
+        roi_software.summarize(aggregate(), period_years=0)
+
+
+def test_inventory_errors():
+    with pytest.raises(ValueError, match="Invalid install count"):
+        aggregate("app,version,installs\nChrome,120,many\n")
+    with pytest.raises(ValueError, match="Missing inventory columns: version"):
+        aggregate("app,installs\nChrome,3\n")
+
+
+def test_workload_file_loads_back(tmp_path, capsys):
+    source = tmp_path / "installs.csv"
+    source.write_text(INVENTORY)
+    output = tmp_path / "workload.json"
+    assert roi_software.main([str(source), "--period-years", "2", "-o", str(output)]) == 0
+    assert json.loads(capsys.readouterr().out)["applications"] == 3
+    assert roi_software.read_aggregate(str(output)) == aggregate()
+    with pytest.raises(ValueError, match="Not a software workload"):
+        roi_software.read_aggregate(io.BytesIO(b"[]"))
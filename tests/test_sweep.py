@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+import roi_catalog
+import roi_engine
+import roi_simulation
+
+INPUTS = dict(devices=3000, applications=1500, updates_per_app=4.0, hours_per_update=4.0, hourly_rate=50.0,
+              automation_efficiency=90, edition="UEM", license_cost=float(roi_engine.license_cost(3000, "UEM")[0]),
+              implementation_cost=20000, security_benefit=60, compliance_time_saved=250, downtime_reduction=40,
+              bandwidth_savings=5000)
+
+
+def test_sweep_matches_single_scenarios():
+    sweep = roi_simulation.run_sweep(INPUTS, "devices", (10, 2000), "hourly_rate", (20.0, 120.0), "payback_months",
+                                     points=(40, 30))
+    assert sweep["values"].shape == (len(sweep["y"]), len(sweep["x"]))
+    assert sweep["values"].dtype == np.float32
+    for j in (0, 7, len(sweep["y"]) - 1):
+        for i in (0, 13, len(sweep["x"]) - 1):
+            devices, rate = sweep["x"][i], sweep["y"][j]
+            expected = roi_engine.calculate_roi(projections=False, **dict(
+                INPUTS, devices=devices, hourly_rate=rate,
+                license_cost=roi_engine.license_cost(devices, "UEM")))["payback_months"][0]
+            assert np.isclose(sweep["values"][j, i], expected, rtol=1e-6)
+
+
+def test_sweep_stays_on_the_input_lattice_and_range():
+    # The range is put in order and clipped to the input's limits, and an
+    # integer range shorter than the points gives one value per step
+    sweep = roi_simulation.run_sweep(INPUTS, "applications", (30, -5), "updates_per_app", (0.0, 2.0),
+                                     "first_year_roi", points=(200, 11))
+    assert sweep["x"].tolist() == list(range(1, 31))
+    low, high, step = roi_simulation.INPUT_RANGES["updates_per_app"]
+    assert sweep["y"][0] == low and sweep["y"][-1] == 2.0
+    assert np.allclose(np.round(sweep["y"] / step) * step, sweep["y"])
+
+
+def test_sweep_lists_tier_breakpoints_inside_the_range():
+    catalog = roi_catalog.current()
+    sweep = roi_simulation.run_sweep(INPUTS, "devices", (60, 800), "hourly_rate", (20.0, 120.0), "payback_months")
+    starts = catalog.tier_starts
+    assert sweep["x_breakpoints"].tolist() == starts[(starts > 60) & (starts < 800)].tolist()
+    assert sweep["y_breakpoints"].size == 0
+
+
+def test_sweep_rejects_invalid_arguments():
+    with pytest.raises(ValueError):
+        roi_simulation.run_sweep(INPUTS, "devices", (1, 10), "devices", (1, 10), "payback_months")
+    with pytest.raises(ValueError):
+        roi_simulation.run_sweep(INPUTS, "devices", (1, 10), "hourly_rate", (1, 10), "npv")
+    with pytest.raises(ValueError):
+        roi_simulation.run_sweep(INPUTS, "devices", (1, 10), "hourly_rate", (1, 10), "payback_months",
+                                 points=(1, 10))